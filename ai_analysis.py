@@ -1,31 +1,263 @@
 import os
+import asyncio
 import logging
-from openai import OpenAI
+import random
+import threading
+import time
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APITimeoutError
 from config_manager import ConfigManager
+from llm_cache import ResponseCache
+from metrics import registry
+from rate_limiter import RateLimitScheduler
+from token_counter import count_message_tokens
+
+# 可以重试的 HTTP 状态码：超时、冲突、限流和服务端错误
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class AnalysisError(Exception):
+    """AI 分析失败（重试耗尽或不可重试的错误）"""
+
 
 class AINewsAnalyzer:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, client=None, async_client=None):
         self.model = config_manager.config.get("openai_model", "gpt-4")
-        self.client = OpenAI()
+        self.client = client or OpenAI()
+        self._async_client = async_client  # 未注入时按事件循环分别创建
+        self._async_clients = {}
+        self._client_lock = threading.Lock()
+        self.cache = ResponseCache(config_manager)
+
+        limits = config_manager.config.get("openai_limits", {})
+        self.scheduler = RateLimitScheduler(
+            limits.get("requests_per_minute", 500),
+            limits.get("tokens_per_minute", 30000)
+        )
+        self.max_retries = limits.get("max_retries", 5)
+        self.backoff_base = limits.get("backoff_base", 1.0)
+        self.backoff_max = limits.get("backoff_max", 60.0)
+        self.completion_token_estimate = limits.get("completion_token_estimate", 1000)
+        self.max_concurrency = limits.get("max_concurrency", 4)
         logging.info(f"AINewsAnalyzer initialized with model: {self.model}")
 
-    def analyse_news(self, prompt, content):
-        """调用 OpenAI Chat API 进行新闻内容分析"""
+    @property
+    def async_client(self):
+        """异步客户端绑定在创建它的事件循环上，每个事件循环使用各自的客户端"""
+        if self._async_client is not None:
+            return self._async_client
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            if loop not in self._async_clients:
+                self._async_clients[loop] = AsyncOpenAI()
+            return self._async_clients[loop]
+
+    async def aclose(self):
+        """关闭当前事件循环上创建的异步客户端，应在事件循环结束前调用"""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+    def build_messages(self, prompt, content):
+        """固定的 system prompt 在前、变化的新闻内容在后，使各次请求共享相同前缀，命中服务端的 prompt 前缀缓存"""
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": content}
+        ]
+
+    def _estimate_tokens(self, messages):
+        """估算一次请求的输入 token 数；TPM 限流时再加上预计的输出 token 数"""
+        return count_message_tokens(messages, self.model)
+
+    def _is_retryable(self, error):
+        if isinstance(error, (APITimeoutError, APIConnectionError)):
+            return True
+        return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+    def _retry_delay(self, error, attempt):
+        """指数退避加随机抖动；服务端给出 Retry-After 时以其为准，并暂停调度器"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, delay)  # full jitter
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if getattr(error, "status_code", None) == 429:
+            self.scheduler.pause(delay)
+        return delay
+
+    def _retry_or_raise(self, error, attempt, labels):
+        """请求失败后的统一处理：可重试且未用尽重试次数时记录指标并返回应等待的秒数，否则抛出 AnalysisError"""
+        if not self._is_retryable(error) or attempt == self.max_retries:
+            self._record_request(labels, "error")
+            logging.error(f"Error in AI analysis: {error}")
+            raise AnalysisError(f"Error in AI analysis: {error}") from error
+        self._record_request(labels, "retry")
+        delay = self._retry_delay(error, attempt)
+        logging.warning(f"Retryable error in AI analysis ({error}), retrying in {delay:.1f}s")
+        return delay
+
+    def _lookup_cache(self, prompt, content, use_cache, labels):
+        """返回 (cache_key, 缓存结果)；不使用缓存时 cache_key 为 None"""
+        if not (use_cache and self.cache.enabled):
+            return None, None
+        cache_key = self.cache.make_key(self.model, prompt, content)
+        cached = self.cache.get(cache_key)
+        registry.inc("llm_cache_lookups_total", result="miss" if cached is None else "hit", **labels)
+        return cache_key, cached
+
+    def _metric_labels(self, labels):
+        """请求指标的标签：模型名加调用方传入的标签（如党派）"""
+        return {"model": self.model, **(labels or {})}
+
+    def _record_request(self, labels, outcome, usage=None, estimated_tokens=None):
+        """记录一次 API 请求的结果，以及请求前估算的和 OpenAI 返回的实际 token 用量"""
+        registry.inc("openai_requests_total", outcome=outcome, **labels)
+        if usage is None:
+            return
+        registry.inc("openai_tokens_total", usage.prompt_tokens or 0, kind="prompt", **labels)
+        registry.inc("openai_tokens_total", usage.completion_tokens or 0, kind="completion", **labels)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) if details is not None else None
+        if cached_tokens:
+            registry.inc("openai_tokens_total", cached_tokens, kind="cached_prompt", **labels)
+        if estimated_tokens is not None:
+            registry.inc("openai_estimated_prompt_tokens_total", estimated_tokens, **labels)
+        logging.debug(f"Prompt tokens: estimated {estimated_tokens}, actual {usage.prompt_tokens}")
+
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        """调用 OpenAI Chat API 进行新闻内容分析，相同输入直接返回缓存结果；use_cache=False 时跳过缓存。
+        labels 为附加到指标上的标签，如 {"party": "democrat"}"""
+        labels = self._metric_labels(labels)
+        cache_key, cached = self._lookup_cache(prompt, content, use_cache, labels)
+        if cached is not None:
+            logging.info("AI analysis served from cache.")
+            return cached
+
+        messages = self.build_messages(prompt, content)
+        estimated_tokens = self._estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire(estimated_tokens + self.completion_token_estimate)
+            try:
+                with registry.timer("openai_request_seconds", **labels):
+                    completion = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages
+                    )
+                break
+            except Exception as e:
+                time.sleep(self._retry_or_raise(e, attempt, labels))
+
+        self._record_request(labels, "ok", completion.usage, estimated_tokens)
+        analysis = completion.choices[0].message.content
+        logging.info("AI analysis completed successfully.")
+        if cache_key:
+            self.cache.set(cache_key, self.model, analysis)
+        return analysis
+
+    def analyse_news_stream(self, prompt, content, use_cache=True, labels=None):
+        """流式调用 OpenAI Chat API，逐段产出生成的文本；仅在收到首个 token 之前重试"""
+        labels = self._metric_labels(labels)
+        cache_key, cached = self._lookup_cache(prompt, content, use_cache, labels)
+        if cached is not None:
+            logging.info("AI analysis served from cache.")
+            yield cached
+            return
+
+        messages = self.build_messages(prompt, content)
+        estimated_tokens = self._estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            self.scheduler.acquire(estimated_tokens + self.completion_token_estimate)
+            started = time.perf_counter()
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True}  # 最后一个分片携带 token 用量
+                )
+                break
+            except Exception as e:
+                time.sleep(self._retry_or_raise(e, attempt, labels))
+
+        parts = []
+        usage = None
         try:
-            messages = [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": content}
-            ]
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
-            )
-            analysis = completion.choices[0].message.content
-            logging.info("AI analysis completed successfully.")
-            return analysis
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
         except Exception as e:
-            logging.error(f"Error in AI analysis: {e}")
-            return f"Error in AI analysis: {e}"
+            self._record_request(labels, "error")
+            logging.error(f"Error in AI analysis stream: {e}")
+            raise AnalysisError(f"Error in AI analysis stream: {e}") from e
+
+        registry.observe("openai_request_seconds", time.perf_counter() - started, **labels)
+        self._record_request(labels, "ok", usage, estimated_tokens)
+        logging.info("AI analysis stream completed successfully.")
+        if cache_key:
+            self.cache.set(cache_key, self.model, "".join(parts))
+
+    async def analyse_news_async(self, prompt, content, use_cache=True, labels=None):
+        """analyse_news 的异步版本，基于 AsyncOpenAI"""
+        labels = self._metric_labels(labels)
+        cache_key, cached = self._lookup_cache(prompt, content, use_cache, labels)
+        if cached is not None:
+            logging.info("AI analysis served from cache.")
+            return cached
+
+        messages = self.build_messages(prompt, content)
+        estimated_tokens = self._estimate_tokens(messages)
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire_async(estimated_tokens + self.completion_token_estimate)
+            try:
+                with registry.timer("openai_request_seconds", **labels):
+                    completion = await self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages
+                    )
+                break
+            except Exception as e:
+                await asyncio.sleep(self._retry_or_raise(e, attempt, labels))
+
+        self._record_request(labels, "ok", completion.usage, estimated_tokens)
+        analysis = completion.choices[0].message.content
+        logging.info("AI analysis completed successfully.")
+        if cache_key:
+            self.cache.set(cache_key, self.model, analysis)
+        return analysis
+
+    async def analyse_batch_async(self, prompt, contents, max_concurrency=None, return_exceptions=False, labels=None):
+        """并发分析多段内容，结果按输入顺序返回；return_exceptions=True 时失败项以 AnalysisError 返回"""
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(content):
+            async with semaphore:
+                return await self.analyse_news_async(prompt, content, labels=labels)
+
+        return await asyncio.gather(*(run(content) for content in contents), return_exceptions=return_exceptions)
+
+    def analyse_batch(self, prompt, contents, max_concurrency=None, return_exceptions=False, labels=None):
+        """analyse_batch_async 的同步入口，在当前线程中运行一个事件循环"""
+        if not contents:
+            return []
+
+        async def run():
+            try:
+                return await self.analyse_batch_async(prompt, contents, max_concurrency, return_exceptions, labels)
+            finally:
+                await self.aclose()
+
+        return asyncio.run(run())
 
 # 用于测试的 __init__ 方法
 if __name__ == "__main__":
@@ -48,5 +280,10 @@ if __name__ == "__main__":
     for news_file in news_files:
         with open(news_file, 'r') as f:
             content = f.read().strip()
-            analysis_result = analyser.analyse_news(prompt, content)
+            try:
+                analysis_result = analyser.analyse_news(prompt, content)
+            except AnalysisError as e:
+                analysis_result = str(e)
             print(f"Analysis for {news_file}:\n{analysis_result}\n")
+
+    print(f"Cache stats: {analyser.cache.stats()}")
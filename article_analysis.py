@@ -0,0 +1,202 @@
+import copy
+import datetime
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# 结构化分析的取值范围，与 prompt/structured_prompt.txt 保持一致
+TOPICS = ("经济", "移民", "医疗", "堕胎与生育权", "枪支", "外交", "中国", "气候与能源", "犯罪与治安", "民主与选举", "教育", "其他")
+STANCES = ("attack", "defend", "policy", "mobilize", "other")
+CHINA_RELEVANCE = ("none", "indirect", "direct")
+CHINA_IMPACT = ("positive", "negative", "neutral")
+
+
+def parse_structured(text):
+    """解析模型返回的 JSON（允许包裹在 ``` 代码块中），规范化各字段；无法解析时抛出 ValueError"""
+    match = re.search(r"\{.*\}", text or "", re.S)
+    if not match:
+        raise ValueError(f"No JSON object in response: {text[:100]!r}")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("Structured analysis is not a JSON object")
+
+    topics = data.get("topics") or []
+    if isinstance(topics, str):
+        topics = [topics]
+    topics = list(dict.fromkeys(topic if topic in TOPICS else "其他" for topic in map(str, topics))) or ["其他"]
+    stance = data.get("stance") if data.get("stance") in STANCES else "other"
+    relevance = data.get("china_relevance") if data.get("china_relevance") in CHINA_RELEVANCE else "none"
+    impact = data.get("china_impact") if data.get("china_impact") in CHINA_IMPACT else "neutral"
+    if relevance == "none":
+        impact = "neutral"
+    return {
+        "topics": topics[:3],
+        "stance": stance,
+        "china_relevance": relevance,
+        "china_impact": impact,
+        "summary": str(data.get("summary") or "").strip(),
+    }
+
+
+def period_key(period, news_date):
+    """日期所在的周期：week 为 ISO 周（如 2024-W36），month 为月份（如 2024-09）"""
+    if period == "week":
+        year, week, _ = datetime.date.fromisoformat(news_date).isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "month":
+        return news_date[:7]
+    raise ValueError(f"Unknown period {period!r}")
+
+
+def previous_period_key(period, key):
+    """上一个周期的键"""
+    if period == "week":
+        year, week = key.split("-W")
+        monday = datetime.date.fromisocalendar(int(year), int(week), 1)
+        return period_key("week", (monday - datetime.timedelta(days=7)).isoformat())
+    if period == "month":
+        first = datetime.date.fromisoformat(f"{key}-01")
+        return (first - datetime.timedelta(days=1)).strftime("%Y-%m")
+    raise ValueError(f"Unknown period {period!r}")
+
+
+def _empty_rollup():
+    return {"articles": 0, "topics": {}, "stance": {}, "china_relevance": {}, "china_impact": {}}
+
+
+def _apply(rollup, delta, sign=1):
+    """把 delta 按 sign（1 加、-1 减）累加到 rollup 上，并去掉计数为 0 的项"""
+    rollup["articles"] += sign * delta["articles"]
+    for field in ("topics", "stance", "china_relevance", "china_impact"):
+        counts = Counter(rollup[field])
+        counts.update({name: sign * count for name, count in delta[field].items()})
+        rollup[field] = {name: count for name, count in counts.items() if count}
+    return rollup
+
+
+class ArticleAnalysisStore:
+    """逐篇结构化分析结果的持久化存储，以文章内容摘要为键，只分析新出现或 prompt 变化后的文章。
+
+    同时维护按党派的日汇总和周、月汇总：每登记一天的文章，只把该日汇总的变化量累加到所在周和月，
+    趋势报告直接读取汇总，不再把原文发送给模型。
+    """
+
+    def __init__(self, db_path="data/article_analysis.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS article_analyses (
+                    content_hash TEXT PRIMARY KEY,
+                    prompt_hash TEXT NOT NULL,
+                    party TEXT NOT NULL,
+                    news_date TEXT NOT NULL,
+                    md_path TEXT NOT NULL,
+                    topics TEXT NOT NULL,
+                    stance TEXT NOT NULL,
+                    china_relevance TEXT NOT NULL,
+                    china_impact TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analyses_party_date ON article_analyses (party, news_date)"
+            )
+            # period 为 day、week 或 month，period_key 分别为日期、ISO 周和月份
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollups (
+                    party TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    period_key TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (party, period, period_key)
+                )
+            """)
+        logging.info(f"ArticleAnalysisStore opened at {db_path}")
+
+    def known_hashes(self, digests, prompt_hash):
+        """返回已用当前 prompt 分析过的内容摘要集合"""
+        digests = list(dict.fromkeys(digests))
+        if not digests:
+            return set()
+        placeholders = ", ".join("?" * len(digests))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT content_hash FROM article_analyses WHERE prompt_hash = ? AND content_hash IN ({placeholders})",
+                [prompt_hash, *digests]
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, digest, prompt_hash, party, news_date, md_path, result):
+        """保存一篇文章的结构化分析结果（result 为 parse_structured 的返回值）。
+        同一内容再次分析（如 prompt 变化）时只更新分析字段，保留首次登记的党派和日期；返回该文章所属的 (党派, 日期)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO article_analyses "
+                "(content_hash, prompt_hash, party, news_date, md_path, topics, stance, china_relevance, "
+                "china_impact, summary, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(content_hash) DO UPDATE SET "
+                "prompt_hash = excluded.prompt_hash, topics = excluded.topics, stance = excluded.stance, "
+                "china_relevance = excluded.china_relevance, china_impact = excluded.china_impact, "
+                "summary = excluded.summary, created_at = excluded.created_at",
+                (
+                    digest, prompt_hash, party, news_date, md_path, json.dumps(result["topics"], ensure_ascii=False),
+                    result["stance"], result["china_relevance"], result["china_impact"], result["summary"], time.time()
+                )
+            )
+            return self._conn.execute(
+                "SELECT party, news_date FROM article_analyses WHERE content_hash = ?", (digest,)
+            ).fetchone()
+
+    def update_rollups(self, party, news_date):
+        """重新统计某党派某一天的日汇总，并把与旧日汇总的差值累加到所在的周汇总和月汇总"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT topics, stance, china_relevance, china_impact FROM article_analyses "
+                "WHERE party = ? AND news_date = ?",
+                (party, news_date)
+            ).fetchall()
+            day = _empty_rollup()
+            for topics, stance, relevance, impact in rows:
+                day["articles"] += 1
+                for field, values in (
+                    ("topics", json.loads(topics)), ("stance", [stance]),
+                    ("china_relevance", [relevance]), ("china_impact", [impact] if relevance != "none" else [])
+                ):
+                    for value in values:
+                        day[field][value] = day[field].get(value, 0) + 1
+
+            delta = _apply(copy.deepcopy(day), self._load(party, "day", news_date), -1)
+            self._save(party, "day", news_date, day)
+            for period in ("week", "month"):
+                key = period_key(period, news_date)
+                self._save(party, period, key, _apply(self._load(party, period, key), delta))
+
+    def _load(self, party, period, key):
+        row = self._conn.execute(
+            "SELECT data FROM rollups WHERE party = ? AND period = ? AND period_key = ?", (party, period, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else _empty_rollup()
+
+    def _save(self, party, period, key, rollup):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rollups (party, period, period_key, data) VALUES (?, ?, ?, ?)",
+            (party, period, key, json.dumps(rollup, ensure_ascii=False))
+        )
+
+    def rollup(self, party, period, key):
+        """读取汇总：period 为 day、week 或 month；没有数据时返回空汇总"""
+        with self._lock:
+            return self._load(party, period, key)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
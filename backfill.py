@@ -0,0 +1,125 @@
+import datetime
+import json
+import logging
+import os
+import threading
+
+
+class BackfillRunner:
+    """按日期范围回填历史新闻：单次遍历列表页并按日期分组，并发抓取全文，再逐日生成报告。
+    进度写入 data/backfill 下的检查点文件，中断后以相同参数重新运行即可从断点继续"""
+
+    def __init__(self, config_manager, crawlers, report_gens):
+        self.crawlers = crawlers
+        self.report_gens = report_gens
+        backfill_config = config_manager.config.get("backfill", {})
+        self.checkpoint_dir = backfill_config.get("checkpoint_dir", "data/backfill")
+        self.checkpoint_every = backfill_config.get("checkpoint_every", 10)  # 每抓取多少篇保存一次检查点
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+    def run(self, party, start_date, end_date):
+        """回填 start_date 到 end_date（YYYY-MM-DD，含）之间的新闻和报告，返回 {日期: 报告路径}"""
+        for date_str in (start_date, end_date):
+            datetime.datetime.strptime(date_str, "%Y-%m-%d")  # 格式错误时抛出 ValueError
+        if start_date > end_date:
+            raise ValueError(f"start date {start_date} is after end date {end_date}")
+
+        checkpoint_file = os.path.join(self.checkpoint_dir, f"{party}_{start_date}_{end_date}.json")
+        state = self._load_checkpoint(checkpoint_file)
+        logging.info(f"Backfill {party} {start_date}..{end_date} using checkpoint {checkpoint_file}")
+
+        crawler = self.crawlers[party]
+        if not state["listing_done"]:
+            self._collect_links(crawler, state, start_date, end_date, checkpoint_file)
+        self._fetch_articles(crawler, state, checkpoint_file)
+        self._generate_reports(party, state, checkpoint_file)
+        return dict(state["reports"])
+
+    def _load_checkpoint(self, checkpoint_file):
+        if os.path.exists(checkpoint_file):
+            with open(checkpoint_file, "r") as f:
+                state = json.load(f)
+            if not isinstance(state["next_page"], dict):
+                # 旧版检查点只记录单一来源的页码，重新遍历列表页（已收集的链接会去重）
+                state["next_page"] = {}
+            logging.info(
+                f"Resuming backfill: pages {state['next_page']}, {len(state['fetched'])} articles fetched, "
+                f"{len(state['reports'])} reports done"
+            )
+            return state
+        # next_page: {来源名: 下一页，遍历完为 None}；buckets: {日期: [链接]}；fetched: {链接: md 文件}；reports: {日期: 报告路径}
+        return {"next_page": {}, "listing_done": False, "buckets": {}, "fetched": {}, "reports": {}}
+
+    def _save_checkpoint(self, checkpoint_file, state):
+        """先写临时文件再原子替换，避免中断时留下损坏的检查点"""
+        tmp_path = f"{checkpoint_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, checkpoint_file)
+
+    def _collect_links(self, crawler, state, start_date, end_date, checkpoint_file):
+        """各来源从上次完成的页之后继续遍历列表页，每页处理完保存一次检查点；任一来源出错时本次不标记完成"""
+        lock = threading.Lock()  # 各来源并发遍历，回调可能来自多个线程
+
+        def on_page(source_name, page, buckets, done):
+            with lock:
+                for news_date, links in buckets.items():
+                    known = state["buckets"].setdefault(news_date, [])
+                    known.extend(link for link in links if link not in known)
+                state["next_page"][source_name] = None if done else page + 1
+                self._save_checkpoint(checkpoint_file, state)
+
+        crawler.collect_news_range(
+            start_date, end_date, start_pages=dict(state["next_page"]), on_page=on_page, strict=True
+        )
+        state["listing_done"] = True
+        self._save_checkpoint(checkpoint_file, state)
+        total = sum(len(links) for links in state["buckets"].values())
+        logging.info(f"Backfill listing done: {total} articles over {len(state['buckets'])} days")
+
+    def _fetch_articles(self, crawler, state, checkpoint_file):
+        """并发抓取尚未成功保存的文章；失败的文章不记入检查点，下次运行时重试"""
+        items = [
+            (news_link, news_date)
+            for news_date, links in sorted(state["buckets"].items())
+            for news_link in links if news_link not in state["fetched"]
+        ]
+        if not items:
+            return
+
+        done = 0
+        for (news_link, _), md_file in crawler.iter_articles(items):
+            if md_file:
+                state["fetched"][news_link] = md_file
+            done += 1
+            if done % self.checkpoint_every == 0:
+                self._save_checkpoint(checkpoint_file, state)
+                logging.info(f"Backfill fetched {done}/{len(items)} articles")
+        self._save_checkpoint(checkpoint_file, state)
+
+    def _generate_reports(self, party, state, checkpoint_file):
+        """按日期先后逐日生成报告，使近似重复检测能引用更早日期的新闻"""
+        report_gen = self.report_gens[party]
+        for news_date, links in sorted(state["buckets"].items()):
+            if news_date in state["reports"]:
+                continue
+            news_files = [state["fetched"][link] for link in links if state["fetched"].get(link)]
+            if not news_files:
+                logging.info(f"No news fetched for {party} on {news_date}, skipping report")
+                continue
+            report_file = report_gen.generate(news_files, news_date)
+            if not os.path.isfile(report_file):
+                # ReportGenerator 出错时返回错误信息，保留该日期以便下次重试
+                logging.error(f"Error generating {party} report for {news_date}: {report_file}")
+                continue
+            state["reports"][news_date] = report_file
+            self._save_checkpoint(checkpoint_file, state)
+
+
+
+if __name__ == "__main__":
+    # 与 `python bipartisan_insight.py backfill` 相同，参数和运行逻辑只在主程序中维护一份
+    import sys
+    from bipartisan_insight import main
+
+    main(["backfill"] + sys.argv[1:])
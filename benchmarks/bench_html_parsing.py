@@ -0,0 +1,135 @@
+"""HTML 解析微基准：原 BeautifulSoup(html.parser) 实现 vs html_extract 中基于 lxml 的解析器
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_html_parsing --repeat 200
+
+页面来自 benchmarks/fixtures 中录制的模板；也可以用 --pages-dir 指定保存的真实页面目录，
+文件名需为 <party>_listing*.html 或 <party>_article*.html。
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import requests
+from bs4 import BeautifulSoup
+
+from benchmarks.fixture_server import FixtureSite
+from html_extract import DemocratExtractor, RepublicanExtractor
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+def make_response(html_bytes):
+    """构造不带 charset 的响应，与真实抓取时一样由 requests 探测编码后生成 .text"""
+    response = requests.Response()
+    response._content = html_bytes
+    response.status_code = 200
+    response.headers["Content-Type"] = "text/html"
+    return response
+
+
+def baseline_democrat_listing(html_bytes):
+    soup = BeautifulSoup(make_response(html_bytes).text, 'html.parser')
+    items = []
+    for article in soup.find_all('li', class_='posts-list__item'):
+        date_tag = article.find('span', class_='posts-list__date')
+        link_tag = article.find('a')
+        news_date = datetime.datetime.strptime(date_tag.text.strip(), "%m/%d/%Y").strftime("%Y-%m-%d")
+        items.append((link_tag['href'], news_date))
+    return items
+
+
+def baseline_republican_listing(html_bytes):
+    soup = BeautifulSoup(make_response(html_bytes).text, 'html.parser')
+    items = []
+    for article in soup.find_all('div', class_='c-blog-item'):
+        link_tag = article.find('h5', class_='c-blog-title').find('a')
+        date_tag = article.find('span', class_='c-publish-date')
+        news_date = datetime.datetime.strptime(date_tag.text.strip(), "%b %d, %Y").strftime("%Y-%m-%d")
+        items.append((link_tag['href'], news_date))
+    return items
+
+
+def baseline_republican_article(html_bytes):
+    soup = BeautifulSoup(make_response(html_bytes).text, 'html.parser')
+    title = soup.find('div', class_='c-title').get_text(strip=True)
+    content = soup.find('div', class_='c-blog-description').get_text(strip=True)
+    return title, content
+
+
+def load_pages(pages_dir):
+    """返回 {页面类型: [html 字节]}"""
+    if pages_dir:
+        pages = {}
+        for kind in ("democrat_listing", "republican_listing", "republican_article"):
+            paths = sorted(glob.glob(os.path.join(pages_dir, f"{kind}*.html")))
+            pages[kind] = [open(path, "rb").read() for path in paths]
+        return pages
+
+    democrat = FixtureSite("democrat", articles_today=10)
+    republican = FixtureSite("republican", articles_today=10, paragraphs=12)
+    return {
+        "democrat_listing": [democrat.listing_page("https://democrats.org/news", 1).encode("utf-8")],
+        "republican_listing": [republican.listing_page("https://gop.com/press-releases", 1).encode("utf-8")],
+        "republican_article": [republican.article_page(i).encode("utf-8") for i in range(5)],
+    }
+
+
+def measure(func, pages, repeat):
+    """返回每个页面的平均解析耗时（秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark for listing/article HTML parsing")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--pages-dir", help="directory of saved pages to use instead of the fixtures")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/html-parsing-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    democrat, republican = DemocratExtractor(), RepublicanExtractor()
+    cases = {
+        "democrat_listing": (baseline_democrat_listing, democrat.parse_listing),
+        "republican_listing": (baseline_republican_listing, republican.parse_listing),
+        "republican_article": (baseline_republican_article, lambda page: republican.parse_article("", page)),
+    }
+
+    pages = load_pages(args.pages_dir)
+    results = {}
+    for kind, (baseline, extractor) in cases.items():
+        if not pages.get(kind):
+            continue
+        baseline_s = measure(baseline, pages[kind], args.repeat)
+        extractor_s = measure(extractor, pages[kind], args.repeat)
+        results[kind] = {
+            "pages": len(pages[kind]),
+            "bs4_html_parser_ms": baseline_s * 1000,
+            "lxml_extractor_ms": extractor_s * 1000,
+            "speedup": baseline_s / extractor_s if extractor_s else None,
+        }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"html-parsing-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"benchmark": "html_parsing", "params": vars(args), "results": results}, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
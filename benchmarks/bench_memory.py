@@ -0,0 +1,157 @@
+"""内存基准：报告生成的峰值内存随新闻篇数的变化
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_memory --articles 100,400,1600
+
+每个规模在临时工作目录中向新闻存档写入若干篇合成新闻（正文各不相同），OpenAI 接口由 FakeOpenAIServer 模拟，
+用 tracemalloc 记录 ReportGenerator.generate 期间的峰值内存（含分析线程）。
+eager_read 为一次读入全部正文的峰值（即改动前 generate 的读取方式），作为对照：
+它随篇数线性增长，而流式生成的峰值应基本持平。
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)  # 运行期间会切换工作目录，确保仍能导入仓库根目录下的模块
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+WORDS = (
+    "economy border health care tariffs inflation jobs climate energy election voters senate house "
+    "governor campaign families veterans education security budget taxes manufacturing china trade"
+).split()
+
+
+def synthetic_article(rng, index, chars):
+    """生成一篇约 chars 个字符的合成新闻，段落由随机词组成，避免各篇内容相同"""
+    paragraphs = []
+    size = 0
+    while size < chars:
+        paragraph = " ".join(rng.choice(WORDS) for _ in range(60)).capitalize() + "."
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return f"Statement {index}", "\n\n".join(paragraphs)
+
+
+def write_corpus(config_manager, count, chars, seed=0):
+    """把 count 篇合成新闻写入新闻存档（不写 Markdown 文件），返回按列表页顺序排列的路径"""
+    from news_archive import NewsArchive, markdown_file_name
+    from news_index import content_hash
+
+    archive = NewsArchive(config_manager.config["archive"]["path"])
+    rng = random.Random(seed)
+    news_date = datetime.date.today().isoformat()
+    paths = []
+    for i in range(count):
+        title, body = synthetic_article(rng, i, chars)
+        url = f"https://example.org/news/{i}"
+        path = os.path.join("data/news/democrat", markdown_file_name(news_date, title, url))
+        archive.append(url, "democrat", news_date, title, body, content_hash(f"{title}\n{body}"), path)
+        paths.append(path)
+    archive.close()
+    return paths
+
+
+def measure_peak(func, *args):
+    """运行 func 并返回 (结果, 峰值内存 MiB, 耗时秒)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+        return result, tracemalloc.get_traced_memory()[1] / 2 ** 20, time.perf_counter() - start
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(root, count, args):
+    """在独立工作目录中测量一个规模下各分析模式的峰值内存"""
+    from config_manager import ConfigManager
+    from report_generation import ReportGenerator
+
+    path = os.path.join(root, f"articles-{count}")
+    os.makedirs(path)
+    shutil.copytree(os.path.join(REPO_DIR, "prompt"), os.path.join(path, "prompt"))
+    config = {
+        "openai_model": "gpt-4",
+        "analysis": {"mode": "single", "max_concurrency": args.concurrency, "read_batch_size": args.batch_size},
+        "openai_limits": {"requests_per_minute": 100000, "tokens_per_minute": 100000000, "max_concurrency": 8},
+        "llm_cache": {"enabled": False},
+        "dedup": {"enabled": False},
+        "structured_analysis": {"enabled": False},
+        "archive": {"path": "data/news_archive.db", "write_markdown": False},
+    }
+    with open(os.path.join(path, "config.json"), "w") as f:
+        json.dump(config, f, indent=4)
+
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        config_manager = ConfigManager(os.path.join(path, "config.json"))
+        news_files = write_corpus(config_manager, count, args.article_chars)
+        result = {"articles": count, "corpus_mib": count * args.article_chars / 2 ** 20}
+
+        report_gen = ReportGenerator(config_manager, "democrat")
+        report_gen.generate(news_files[:5], "2000-01-01")  # 预热：初始化 OpenAI 客户端和 prompt 缓存，不计入结果
+        _, result["eager_read_peak_mib"], _ = measure_peak(report_gen.read_news, news_files)
+        for mode in args.modes.split(","):
+            report_gen.mode = mode
+            report_file, peak, seconds = measure_peak(report_gen.generate, news_files)
+            if not os.path.isfile(report_file):
+                raise RuntimeError(report_file)
+            result[f"{mode}_peak_mib"] = peak
+            result[f"{mode}_s"] = seconds
+        return result
+    finally:
+        os.chdir(cwd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak-memory benchmark for report generation")
+    parser.add_argument("--articles", default="100,400,1600", help="comma-separated corpus sizes")
+    parser.add_argument("--article-chars", type=int, default=6000, help="approximate characters per article")
+    parser.add_argument("--modes", default="single,map_reduce", help="comma-separated analysis modes")
+    parser.add_argument("--batch-size", type=int, default=50, help="analysis.read_batch_size")
+    parser.add_argument("--concurrency", type=int, default=8, help="analysis.max_concurrency")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/memory-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    llm = FakeOpenAIServer(latency=0, reply_chars=400).start()
+    saved_env = {key: os.environ.get(key) for key in ("OPENAI_BASE_URL", "OPENAI_API_KEY")}
+    os.environ["OPENAI_BASE_URL"] = llm.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    root = tempfile.mkdtemp(prefix="bench-memory-")
+    try:
+        results = [bench_size(root, int(count), args) for count in args.articles.split(",")]
+    finally:
+        llm.stop()
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(root, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"memory-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"benchmark": "memory", "params": vars(args), "results": results}, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
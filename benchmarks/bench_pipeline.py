@@ -0,0 +1,350 @@
+"""离线基准测试：抓取 → 分析 → 报告 → 邮件
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_pipeline --articles 30 --repeat 3
+
+列表页和文章页由本地 FixtureServer 回放，OpenAI 接口由 FakeOpenAIServer 模拟，
+邮件由 FakeSMTPServer 接收。结果以 JSON 写入 benchmarks/results/，便于跟踪性能回归。
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)  # 运行期间会切换工作目录，确保仍能导入仓库根目录下的模块
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fake_smtp import FakeSMTPServer
+from benchmarks.fixture_server import FixtureServer, FixtureSite
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+PARTIES = ("democrat", "republican")
+
+
+def percentile(samples, pct):
+    """最近秩法计算百分位数"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(run_seconds, item_seconds, items_per_run):
+    """汇总一个策略的多次运行：整体耗时、单项延迟分位数和吞吐量"""
+    median_run = statistics.median(run_seconds)
+    return {
+        "runs": len(run_seconds),
+        "items_per_run": items_per_run,
+        "run_p50_s": median_run,
+        "run_p95_s": percentile(run_seconds, 95),
+        "item_p50_s": percentile(item_seconds, 50),
+        "item_p95_s": percentile(item_seconds, 95),
+        "throughput_items_per_s": items_per_run / median_run if median_run else None,
+    }
+
+
+def timed(func, samples):
+    """包装函数，记录每次调用的耗时"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+def timed_async(func, samples):
+    """包装协程函数，记录每次调用的耗时"""
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+class BenchEnvironment:
+    """启动本地替身服务，并为每次运行准备独立的工作目录和 config.json"""
+
+    def __init__(self, args):
+        self.args = args
+        self.root = tempfile.mkdtemp(prefix="bipartisan-bench-")
+        sites = {party: FixtureSite(party, args.articles) for party in PARTIES}
+        self.fixtures = FixtureServer(sites, latency=args.http_latency).start()
+        self.llm = FakeOpenAIServer(latency=args.llm_latency, per_1k_chars=args.llm_latency_per_1k_chars).start()
+        self.smtp = FakeSMTPServer(connect_latency=args.smtp_latency).start()
+        self._saved_env = {key: os.environ.get(key) for key in ("OPENAI_BASE_URL", "OPENAI_API_KEY", "SENDER_EMAIL_PASSWORD")}
+        os.environ["OPENAI_BASE_URL"] = self.llm.base_url
+        os.environ["OPENAI_API_KEY"] = "sk-bench"
+        os.environ["SENDER_EMAIL_PASSWORD"] = "bench"
+        self._cwd = os.getcwd()
+        self._runs = 0
+
+    def config(self, crawler=None, analysis=None):
+        smtp_host, smtp_port = self.smtp.address
+        return {
+            "schedule_time": "21:00",
+            "urls": self.fixtures.url_templates(),
+            "crawler": dict({"max_concurrency_per_host": 8, "max_workers": 8}, **(crawler or {})),
+            "openai_model": "gpt-4",
+            "analysis": dict({"mode": "single", "max_concurrency": 8}, **(analysis or {})),
+            "openai_limits": {"requests_per_minute": 100000, "tokens_per_minute": 100000000, "max_concurrency": 8},
+            "llm_cache": {"enabled": False},
+            # 夹具文章由同一模板生成，开启近似重复过滤会跳过大部分分析请求
+            "dedup": {"enabled": False},
+            "email": {
+                "smtp_server": smtp_host,
+                "smtp_port": smtp_port,
+                "use_ssl": False,
+                "sender_email": "bench@localhost",
+                "recipient_email": "reader@localhost",
+            },
+        }
+
+    @contextlib.contextmanager
+    def workdir(self, config):
+        """切换到新的工作目录（空的 data/ 与新闻索引），写入配置，返回 ConfigManager"""
+        from config_manager import ConfigManager
+
+        self._runs += 1
+        path = os.path.join(self.root, f"run-{self._runs}")
+        os.makedirs(path)
+        shutil.copytree(os.path.join(REPO_DIR, "prompt"), os.path.join(path, "prompt"))
+        with open(os.path.join(path, "config.json"), "w") as f:
+            json.dump(config, f, indent=4)
+        os.chdir(path)
+        try:
+            yield ConfigManager(os.path.join(path, "config.json"))
+        finally:
+            os.chdir(self._cwd)
+
+    def close(self):
+        os.chdir(self._cwd)
+        for server in (self.fixtures, self.llm, self.smtp):
+            server.stop()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def legacy_save(news_dir, today_str, title, content):
+    """原实现的 _save_news_to_md"""
+    file_name = f"{news_dir}/{today_str}_{title.replace(' ', '_')}.md"
+    with open(file_name, "w") as f:
+        f.write(f"# {title}\n\n")
+        f.write(content)
+    return file_name
+
+
+def legacy_fetch_news(party, url_template, today_str, item_seconds):
+    """改造前的抓取路径：每个请求单独 requests.get，BeautifulSoup(html.parser) 解析列表页，
+    逐篇下载正文（民主党用 newspaper.Article，共和党用 BeautifulSoup），不复用连接、不限速、无索引"""
+    import requests
+    from bs4 import BeautifulSoup
+    from newspaper import Article
+
+    news_dir = f"data/news/{party}"
+    os.makedirs(news_dir, exist_ok=True)
+    if party == "democrat":
+        item_selector, date_format = ("li", "posts-list__item"), "%m/%d/%Y"
+    else:
+        item_selector, date_format = ("div", "c-blog-item"), "%b %d, %Y"
+
+    page, news_list = 1, []
+    while True:
+        response = requests.get(url_template.format(page))
+        soup = BeautifulSoup(response.text, 'html.parser')
+        articles = soup.find_all(*item_selector)
+        if not articles:
+            break
+        for article in articles:
+            if party == "democrat":
+                date_tag = article.find('span', class_='posts-list__date')
+                link_tag = article.find('a')
+            else:
+                date_tag = article.find('span', class_='c-publish-date')
+                title_tag = article.find('h5', class_='c-blog-title')
+                link_tag = title_tag.find('a') if title_tag else None
+            if not (date_tag and link_tag and 'href' in link_tag.attrs):
+                continue
+            news_date = datetime.datetime.strptime(date_tag.text.strip(), date_format).strftime("%Y-%m-%d")
+            if news_date == today_str:
+                news_list.append(link_tag['href'])
+        if not news_list or len(news_list) < len(articles):
+            break
+        page += 1
+
+    def fetch_article(news_link):
+        if party == "democrat":
+            article = Article(news_link)
+            article.download()
+            article.parse()
+            title, content = article.title, article.text
+        else:
+            soup = BeautifulSoup(requests.get(news_link).text, 'html.parser')
+            title = soup.find('div', class_='c-title').get_text(strip=True)
+            content = soup.find('div', class_='c-blog-description').get_text(strip=True)
+        return legacy_save(news_dir, today_str, title, content) if title and content else None
+
+    fetch_article = timed(fetch_article, item_seconds)
+    return [md_file for md_file in map(fetch_article, news_list) if md_file]
+
+
+def bench_fetch(env, strategy):
+    """抓取阶段：legacy 为改造前的 requests + BeautifulSoup + newspaper 逐篇抓取；
+    single_worker 为现在的 HttpFetcher 单线程抓取；concurrent 为连接池并发抓取"""
+    from data_acquisition import DemocratNewsCrawler, RepublicanNewsCrawler
+
+    workers = 1 if strategy == "single_worker" else env.args.workers
+    today_str = datetime.date.today().strftime("%Y-%m-%d")
+    run_seconds, item_seconds, items = [], [], 0
+    for _ in range(env.args.repeat):
+        config = env.config(crawler={"max_workers": workers, "max_concurrency_per_host": workers})
+        with env.workdir(config) as config_manager:
+            start = time.perf_counter()
+            if strategy == "legacy":
+                items = sum(
+                    len(legacy_fetch_news(party, url_template, today_str, item_seconds))
+                    for party, url_template in env.fixtures.url_templates().items()
+                )
+            else:
+                crawlers = [DemocratNewsCrawler(config_manager), RepublicanNewsCrawler(config_manager)]
+                for crawler in crawlers:
+                    crawler._fetch_and_save_full_news = timed(crawler._fetch_and_save_full_news, item_seconds)
+                items = sum(len(crawler.fetch_news()) for crawler in crawlers)
+            run_seconds.append(time.perf_counter() - start)
+    return summarize(run_seconds, item_seconds, items)
+
+
+def prepare_news(env):
+    """抓取一次新闻作为分析阶段的输入，返回 {party: 新闻文件绝对路径列表}"""
+    from data_acquisition import DemocratNewsCrawler, RepublicanNewsCrawler
+
+    news = {}
+    with env.workdir(env.config()) as config_manager:
+        for party, crawler_class in (("democrat", DemocratNewsCrawler), ("republican", RepublicanNewsCrawler)):
+            news[party] = [os.path.abspath(path) for path in crawler_class(config_manager).fetch_news()]
+    return news
+
+
+def bench_analysis(env, mode, news):
+    """分析阶段：single 为合并后一次调用，map_reduce 为逐篇并发分析后汇总"""
+    from report_generation import ReportGenerator
+
+    run_seconds, item_seconds = [], []
+    items = sum(len(files) for files in news.values())
+    for _ in range(env.args.repeat):
+        with env.workdir(env.config(analysis={"mode": mode})) as config_manager:
+            start = time.perf_counter()
+            for party in PARTIES:
+                report_gen = ReportGenerator(config_manager, party)
+                analyzer = report_gen.analyzer
+                analyzer.analyse_news = timed(analyzer.analyse_news, item_seconds)
+                analyzer.analyse_news_async = timed_async(analyzer.analyse_news_async, item_seconds)
+                report_file = report_gen.generate(news[party])
+                if not os.path.isfile(report_file):
+                    raise RuntimeError(report_file)
+            run_seconds.append(time.perf_counter() - start)
+    return summarize(run_seconds, item_seconds, items)
+
+
+def bench_email(env, strategy):
+    """邮件阶段：per_report 为每份报告单独建连发送，batch 为复用一个连接，digest 为合并为一封摘要"""
+    from email_notification import EmailNotifier
+
+    run_seconds, item_seconds = [], []
+    config = env.config()
+    config["email"]["recipient_emails"] = [f"reader{i}@localhost" for i in range(env.args.recipients)]
+    with env.workdir(config) as config_manager:
+        report_files = []
+        for party in PARTIES:
+            os.makedirs(f"data/reports/{party}", exist_ok=True)
+            report_file = os.path.abspath(f"data/reports/{party}/bench.md")
+            with open(report_file, "w") as f:
+                f.write("### AI Analysis Report\n\n" + "模拟分析结果。\n\n" * 200)
+            report_files.append(report_file)
+
+        notifier = EmailNotifier(config_manager)
+        for _ in range(env.args.repeat):
+            start = time.perf_counter()
+            if strategy == "per_report":
+                errors = [timed(notifier.send, item_seconds)(report_file) for report_file in report_files]
+            elif strategy == "batch":
+                errors = [timed(notifier.send_batch, item_seconds)(report_files)]
+            else:
+                errors = [timed(notifier.send_digest, item_seconds)(report_files)]
+            run_seconds.append(time.perf_counter() - start)
+            if any(errors):
+                raise RuntimeError(errors)
+    return summarize(run_seconds, item_seconds, len(report_files))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for the crawl → analyze → report pipeline")
+    parser.add_argument("--articles", type=int, default=20, help="articles dated today per party")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per strategy")
+    parser.add_argument("--workers", type=int, default=8, help="fetch concurrency for the concurrent strategy")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="seconds added to every fixture response")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds added to every fake OpenAI response")
+    parser.add_argument("--llm-latency-per-1k-chars", type=float, default=0.01, help="extra seconds per 1k prompt chars")
+    parser.add_argument("--smtp-latency", type=float, default=0.1, help="seconds added to every SMTP connection")
+    parser.add_argument("--recipients", type=int, default=3, help="recipients per email")
+    parser.add_argument("--stages", default="fetch,analysis,email", help="comma-separated stages to run")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/pipeline-<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = set(args.stages.split(","))
+    env = BenchEnvironment(args)
+    results = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": vars(args),
+        "stages": {},
+    }
+    try:
+        if "fetch" in stages:
+            results["stages"]["fetch"] = {
+                strategy: bench_fetch(env, strategy) for strategy in ("legacy", "single_worker", "concurrent")
+            }
+        if "analysis" in stages:
+            news = prepare_news(env)
+            results["stages"]["analysis"] = {
+                mode: bench_analysis(env, mode, news) for mode in ("single", "map_reduce")
+            }
+        if "email" in stages:
+            results["stages"]["email"] = {
+                strategy: bench_email(env, strategy) for strategy in ("per_report", "batch", "digest")
+            }
+    finally:
+        env.close()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results["stages"], indent=2))
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""启动耗时基准：在全新的解释器中测量各入口的导入和初始化耗时，以及加载了哪些重量级依赖
+
+在仓库根目录运行：
+
+    python -m benchmarks.bench_startup --repeat 5
+
+场景：
+    eager     模拟改动前的入口：启动时即导入 gradio、newspaper3k、markdown2 等全部依赖
+    headless  `bipartisan_insight.py run` 的路径：只导入抓取、分析和邮件所需的模块
+    ui        `bipartisan_insight.py serve-ui` 的路径：在 headless 基础上导入 report_viewer（gradio）
+
+每个场景在临时工作目录中运行（复制 config.json，数据库写在临时目录下），并构造一次 BipartisanInsight。
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+HEAVY_MODULES = ["gradio", "newspaper", "nltk", "PIL", "bs4", "markdown2", "openai"]
+
+SCENARIOS = {
+    "eager": ["gradio", "newspaper", "markdown2", "bipartisan_insight"],
+    "headless": ["bipartisan_insight"],
+    "ui": ["bipartisan_insight", "report_viewer"],
+}
+
+# 子进程中执行：依次导入模块并构造 BipartisanInsight，以 JSON 输出耗时和已加载的重量级模块
+CHILD_SCRIPT = """
+import importlib, json, sys, time
+sys.path.insert(0, {repo_dir!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+imported = time.perf_counter()
+bipartisan_insight = sys.modules["bipartisan_insight"]
+app = bipartisan_insight.BipartisanInsight()
+ready = time.perf_counter()
+print(json.dumps({{
+    "import_s": imported - start,
+    "init_s": ready - imported,
+    "analyzers": len({{id(gen.analyzer) for gen in app.pipeline.report_gens.values()}} | {{id(app.analyzer)}}),
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_scenario(modules, workdir):
+    """在全新的解释器中运行一次场景，返回子进程输出的测量结果和总耗时"""
+    script = CHILD_SCRIPT.format(repo_dir=REPO_DIR, modules=modules, heavy=HEAVY_MODULES)
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "bench"))
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the service entry points")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/startup-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    root = tempfile.mkdtemp(prefix="bench-startup-")
+    try:
+        for name, modules in SCENARIOS.items():
+            workdir = os.path.join(root, name)
+            os.makedirs(workdir)
+            shutil.copy(os.path.join(REPO_DIR, "config.json"), workdir)
+            run_scenario(modules, workdir)  # 预热：生成 .pyc、创建数据库文件，不计入结果
+            runs = [run_scenario(modules, workdir) for _ in range(args.repeat)]
+            results[name] = {
+                "import_median_s": statistics.median(run["import_s"] for run in runs),
+                "init_median_s": statistics.median(run["init_s"] for run in runs),
+                "process_median_s": statistics.median(run["process_s"] for run in runs),
+                "analyzers": runs[0]["analyzers"],
+                "heavy_modules": runs[0]["heavy_modules"],
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if "eager" in results and "headless" in results:
+        results["headless_speedup"] = results["eager"]["process_median_s"] / results["headless"]["process_median_s"]
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"benchmark": "startup", "params": vars(args), "results": results}, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
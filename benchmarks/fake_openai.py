@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    """模拟 OpenAI Chat Completions 接口的本地服务：固定延迟加按输入长度计的延迟，支持流式输出"""
+
+    def __init__(self, latency=0.5, per_1k_chars=0.0, reply_chars=1500, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.per_1k_chars = per_1k_chars
+        self.reply_chars = reply_chars
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _reply(self, messages):
+        prompt_chars = sum(len(message.get("content", "")) for message in messages)
+        reply = ("模拟分析结果。" * (self.reply_chars // 7 + 1))[:self.reply_chars]
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(reply),
+            "total_tokens": prompt_chars // 4 + len(reply),
+        }
+        return prompt_chars, reply, usage
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                    request_id = server.request_count
+
+                prompt_chars, reply, usage = server._reply(request.get("messages", []))
+                time.sleep(server.latency + server.per_1k_chars * prompt_chars / 1000)
+
+                base = {
+                    "id": f"chatcmpl-fake-{request_id}",
+                    "created": int(time.time()),
+                    "model": request.get("model", "gpt-4"),
+                }
+                if request.get("stream"):
+                    self._send_stream(base, reply)
+                    return
+
+                payload = dict(base, object="chat.completion", usage=usage, choices=[{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }])
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, base, reply):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for start in range(0, len(reply), 50):
+                    chunk = dict(base, object="chat.completion.chunk", choices=[{
+                        "index": 0,
+                        "delta": {"content": reply[start:start + 50]},
+                        "finish_reason": None,
+                    }])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,80 @@
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer:
+    """最小化的本地 SMTP 服务（明文，无 TLS），接受任意登录，记录收到的邮件，可配置握手延迟"""
+
+    def __init__(self, connect_latency=0.0, host="127.0.0.1", port=0):
+        self.connect_latency = connect_latency
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def _make_handler(self):
+        smtp = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+            def handle(self):
+                with smtp._lock:
+                    smtp.connections += 1
+                if smtp.connect_latency:
+                    time.sleep(smtp.connect_latency)  # 模拟 TLS 握手和登录的往返开销
+                self.reply("220 localhost fake SMTP ready")
+                sender, recipients = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250-localhost")
+                        self.reply("250 AUTH PLAIN LOGIN")
+                    elif verb == "AUTH":
+                        with smtp._lock:
+                            smtp.logins += 1
+                        self.reply("235 Authentication successful")
+                    elif verb == "MAIL":
+                        sender, recipients = command[10:].strip("<> "), []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command[8:].strip("<> "))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = []
+                        for data_line in self.rfile:
+                            if data_line in (b".\r\n", b".\n"):
+                                break
+                            data.append(data_line)
+                        with smtp._lock:
+                            smtp.messages.append((sender, recipients, b"".join(data)))
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:  # RSET / NOOP 等
+                        self.reply("250 OK")
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
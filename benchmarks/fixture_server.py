@@ -0,0 +1,143 @@
+import datetime
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 各站点列表页的日期格式，与爬虫解析时使用的格式一致
+DATE_FORMATS = {
+    "democrat": "%m/%d/%Y",
+    "republican": "%b %d, %Y",
+}
+
+PARAGRAPH = (
+    "The campaign released a statement on {topic} today, arguing that voters deserve a clear choice "
+    "on the economy, health care and national security. Officials pointed to recent polling and "
+    "said the contrast with the other side could not be sharper as the election approaches."
+)
+TOPICS = ["the economy", "border security", "health care", "trade with China", "energy prices", "the Supreme Court"]
+
+
+def load_fixture(name):
+    """读取录制的 HTML 模板"""
+    with open(os.path.join(FIXTURE_DIR, name), "r") as f:
+        return Template(f.read())
+
+
+class FixtureSite:
+    """按录制模板生成两党列表页和文章页：前 articles_today 篇日期为今天，其余逐日递减"""
+
+    def __init__(self, party, articles_today, articles_older=10, page_size=10, paragraphs=8, today=None):
+        self.party = party
+        self.page_size = page_size
+        self.paragraphs = paragraphs
+        self.listing = load_fixture(f"{party}_listing.html")
+        self.listing_item = load_fixture(f"{party}_listing_item.html")
+        self.article = load_fixture(f"{party}_article.html")
+
+        today = today or datetime.date.today()
+        self.dates = [today] * articles_today
+        self.dates += [today - datetime.timedelta(days=1 + i // 3) for i in range(articles_older)]
+
+    def _title(self, i):
+        return f"{self.party.capitalize()} statement {i} on {TOPICS[i % len(TOPICS)]}"
+
+    def listing_page(self, base_url, page):
+        start = (page - 1) * self.page_size
+        items = []
+        for i in range(start, min(start + self.page_size, len(self.dates))):
+            items.append(self.listing_item.substitute(
+                date=self.dates[i].strftime(DATE_FORMATS[self.party]),
+                url=f"{base_url}/article-{i}",
+                title=self._title(i),
+                excerpt=PARAGRAPH.format(topic=TOPICS[i % len(TOPICS)])[:120]
+            ))
+        return self.listing.substitute(items="\n".join(items), next_page=page + 1)
+
+    def article_page(self, i):
+        if not 0 <= i < len(self.dates):
+            return None
+        body = "\n".join(
+            f"<p>{PARAGRAPH.format(topic=TOPICS[(i + n) % len(TOPICS)])}</p>" for n in range(self.paragraphs)
+        )
+        return self.article.substitute(
+            title=self._title(i),
+            date=self.dates[i].strftime(DATE_FORMATS[self.party]),
+            iso_date=self.dates[i].isoformat(),
+            body=body
+        )
+
+
+class FixtureServer:
+    """本地 HTTP 服务，回放两党网站的列表页和文章页，可配置每个请求的延迟"""
+
+    def __init__(self, sites, latency=0.0, host="127.0.0.1", port=0):
+        self.sites = sites
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_templates(self):
+        """返回可直接写入 config.json 的列表页 URL 模板"""
+        return {
+            "democrat": f"{self.base_url}/democrat/news/page/{{}}/",
+            "republican": f"{self.base_url}/republican/press-releases/?page={{}}",
+        }
+
+    def _render(self, path, query):
+        match = re.fullmatch(r"/democrat/news/page/(\d+)/", path)
+        if match and "democrat" in self.sites:
+            return self.sites["democrat"].listing_page(f"{self.base_url}/democrat/news", int(match.group(1)))
+        if path == "/republican/press-releases/" and "republican" in self.sites:
+            page = int(query.get("page", ["1"])[0])
+            return self.sites["republican"].listing_page(f"{self.base_url}/republican/press-releases", page)
+        match = re.fullmatch(r"/(democrat|republican)/(?:news|press-releases)/article-(\d+)", path)
+        if match and match.group(1) in self.sites:
+            return self.sites[match.group(1)].article_page(int(match.group(2)))
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持 keep-alive，便于测量连接复用效果
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = urlsplit(self.path)
+                html = server._render(parts.path, parse_qs(parts.query))
+                body = (html or "Not Found").encode("utf-8")
+                self.send_response(200 if html else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
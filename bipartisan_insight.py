@@ -1,12 +1,19 @@
+import argparse
 import schedule
+import threading
 import time
 import logging
+from datetime import datetime
 from config_manager import ConfigManager
+from crawl_scheduler import CrawlScheduler
 from data_acquisition import DemocratNewsCrawler, RepublicanNewsCrawler
 from ai_analysis import AINewsAnalyzer
 from report_generation import ReportGenerator
 from email_notification import EmailNotifier
-from report_viewer import ReportViewerUI
+from job_queue import JobQueue
+import metrics
+from pipeline import PipelineRunner
+# report_viewer（gradio）和 backfill 只在对应子命令中导入，定时运行时不加载界面依赖
 
 # 初始化日志配置
 logging.basicConfig(
@@ -20,68 +27,180 @@ config_manager = ConfigManager()
 
 class BipartisanInsight:
     def __init__(self):
-        self.democrat_crawler = DemocratNewsCrawler(config_manager)
-        self.republican_crawler = RepublicanNewsCrawler(config_manager)
+        # 两党的抓取器共享同一个调度器，按域名统一限速和缓存 robots.txt
+        self.crawl_scheduler = CrawlScheduler(config_manager)
+        self.democrat_crawler = DemocratNewsCrawler(config_manager, scheduler=self.crawl_scheduler)
+        self.republican_crawler = RepublicanNewsCrawler(config_manager, scheduler=self.crawl_scheduler)
         self.analyzer = AINewsAnalyzer(config_manager)
         self.email_notifier = EmailNotifier(config_manager)
         
-        # 为两个党派创建独立的报告生成器对象
-        self.democrat_report_gen = ReportGenerator(config_manager, "democrat")
-        self.republican_report_gen = ReportGenerator(config_manager, "republican")
+        # 为两个党派创建独立的报告生成器对象，共享同一个分析器（OpenAI 客户端和限流器）
+        self.democrat_report_gen = ReportGenerator(config_manager, "democrat", analyzer=self.analyzer)
+        self.republican_report_gen = ReportGenerator(config_manager, "republican", analyzer=self.analyzer)
+
+        # 抓取、分析、邮件的流水线，两党可并行运行
+        self.pipeline = PipelineRunner(
+            config_manager,
+            crawlers={"democrat": self.democrat_crawler, "republican": self.republican_crawler},
+            report_gens={"democrat": self.democrat_report_gen, "republican": self.republican_report_gen},
+            email_notifier=self.email_notifier
+        )
+        # 界面和定时任务都通过后台任务队列运行，同一党派同一天的任务同时只运行一个
+        self.jobs = JobQueue(config_manager)
         logging.info("BipartisanInsight initialized successfully.")
 
     def job(self, party):
-        logging.info(f"Starting {party.capitalize()} data acquisition job.")
-        try:
-            if party == "democrat":
-                news = self.democrat_crawler.fetch_news()
-                report_gen = self.democrat_report_gen
-            else:
-                news = self.republican_crawler.fetch_news()
-                report_gen = self.republican_report_gen
-
-            if not news:
-                logging.info(f"No news available for {party.capitalize()} today.")
-                return f"No news available for {party.capitalize()} today."
-
-            # 生成报告
-            report_file = report_gen.generate(news)
-            logging.info(f"Report generated for {party.capitalize()}: {report_file}")
-
-            # 发送报告邮件
-            email_result = self.email_notifier.send(report_file)
-            if email_result:
-                logging.error(f"Error in sending email: {email_result}")
-            else:
-                logging.info(f"Email sent successfully for {party.capitalize()}.")
-
-            return f"{party.capitalize()} report generated and emailed."
-
-        except Exception as e:
-            logging.error(f"Error during job execution for {party.capitalize()}: {e}")
-            return f"Error during job execution for {party.capitalize()}: {e}"
+        """运行单个党派的完整流程，返回结果信息"""
+        return self.pipeline.run_party(party)
+
+    def job_stream(self, party):
+        """流式运行单个党派的完整流程，逐步产出进度和报告内容"""
+        return self.pipeline.run_party_stream(party)
+
+    def job_all(self):
+        """并行运行两党的完整流程"""
+        return self.pipeline.run_all()
+
+    def job_all_summary(self):
+        """并行运行两党的完整流程，返回供界面展示的结果信息"""
+        return "\n\n".join(f"{party}: {message}" for party, message in self.job_all().items())
+
+    def submit_job(self, party):
+        """提交单个党派当天的后台任务，返回 Job；已有同党派当天的任务在运行时直接返回该任务"""
+        today_str = datetime.today().strftime('%Y-%m-%d')
+        return self.jobs.submit((party, today_str), self.job_stream, party)
+
+    def submit_all(self):
+        """定时任务入口：提交两党合并任务（报告在同一个 SMTP 连接内发送），任务同时占用两党当天的 key，
+        与界面提交的单党派任务互斥；某党派的任务已在运行时改为按党派提交，已在运行的任务直接复用"""
+        today_str = datetime.today().strftime('%Y-%m-%d')
+        parties = ("democrat", "republican")
+        job = self.jobs.submit(
+            ("all", today_str), self.job_all_summary, claims=[(party, today_str) for party in parties]
+        )
+        if job.key == ("all", today_str):
+            return [job]
+        return [self.submit_job(party) for party in parties]
+
+    def start_scheduler(self, interval=60):
+        """在后台守护线程中运行定时任务检查，不阻塞界面"""
+        def run():
+            while True:
+                schedule.run_pending()  # 检查并运行定时任务
+                time.sleep(interval)  # 每分钟检查一次定时任务
+
+        thread = threading.Thread(target=run, name="scheduler", daemon=True)
+        thread.start()
+        return thread
+
+def start_metrics_server():
+    """按配置启动本地 Prometheus 指标接口（/metrics）"""
+    metrics_config = config_manager.config.get("metrics", {})
+    if metrics_config.get("enabled", False):
+        metrics.start_http_server(metrics_config.get("port", 9108), metrics_config.get("host", "127.0.0.1"))
+
+
+def run_command(args):
+    """立即运行一次指定党派的流程；--daily 时改为每天在配置的时间运行，不启动界面"""
+    bipartisan_insight = BipartisanInsight()
+    if not args.daily:
+        if args.party == "all":
+            results = bipartisan_insight.job_all()
+        else:
+            results = {args.party: bipartisan_insight.job(args.party)}
+        for party, message in results.items():
+            print(f"{party}: {message}")
+        return
+
+    start_metrics_server()
+    schedule_time = config_manager.get_schedule_time()
+    logging.info(f"Scheduled job will run at {schedule_time}.")
+    if args.party == "all":
+        schedule.every().day.at(schedule_time).do(bipartisan_insight.submit_all)
+    else:
+        schedule.every().day.at(schedule_time).do(bipartisan_insight.submit_job, args.party)
+    while True:
+        schedule.run_pending()
+        time.sleep(60)
+
+
+def serve_ui_command(args):
+    """启动报告浏览界面，定时任务在后台线程中检查"""
+    from report_viewer import ReportViewerUI
 
-if __name__ == "__main__":
-    logging.info("Starting Bipartisan Insight service.")
     bipartisan_insight = BipartisanInsight()
 
     # 从配置文件获取定时任务执行时间
     schedule_time = config_manager.get_schedule_time()
     logging.info(f"Scheduled job will run at {schedule_time}.")
 
-    # 立即执行定时任务
-    #bipartisan_insight.job("democrat")
-    #bipartisan_insight.job("republican")
+    # 每天执行一次定时任务（两党并行）
+    schedule.every().day.at(schedule_time).do(bipartisan_insight.submit_all)
 
-    # 每天执行一次定时任务
-    #schedule.every().day.at(schedule_time).do(bipartisan_insight.job, "democrat")
-    #schedule.every().day.at(schedule_time).do(bipartisan_insight.job, "republican")
+    start_metrics_server()
+
+    # 定时任务在后台线程中检查，界面在主线程中运行
+    bipartisan_insight.start_scheduler()
 
     # 启动报告浏览 UI
-    report_viewer_ui = ReportViewerUI(bipartisan_insight)
+    report_viewer_ui = ReportViewerUI(config_manager, bipartisan_insight)
     report_viewer_ui.launch()
 
-    # 保持定时任务的运行
-    while True:
-        schedule.run_pending()  # 检查并运行定时任务
-        time.sleep(60)  # 每分钟检查一次定时任务
+
+def backfill_command(args):
+    """回填日期范围内的新闻和报告，复用主程序的抓取器和报告生成器"""
+    from backfill import BackfillRunner
+
+    bipartisan_insight = BipartisanInsight()
+    parties = ["democrat", "republican"] if args.party == "all" else [args.party]
+    runner = BackfillRunner(
+        config_manager,
+        crawlers=bipartisan_insight.pipeline.crawlers,
+        report_gens=bipartisan_insight.pipeline.report_gens
+    )
+    for party in parties:
+        reports = runner.run(party, args.start, args.end)
+        print(f"{party}: {len(reports)} reports")
+        for news_date, report_file in sorted(reports.items()):
+            print(f"  {news_date}: {report_file}")
+
+
+def trend_command(args):
+    """根据已存储的逐篇结构化分析汇总生成周/月趋势报告"""
+    from trend_report import TrendReportGenerator
+
+    trend_report_gen = TrendReportGenerator(config_manager, analyzer=AINewsAnalyzer(config_manager))
+    print(trend_report_gen.generate(args.period, args.key))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bipartisan Insight: crawl, analyse and report party news")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run the crawl/analysis/email pipeline without the UI")
+    run_parser.add_argument("--party", choices=["democrat", "republican", "all"], default="all")
+    run_parser.add_argument("--daily", action="store_true", help="run every day at schedule_time instead of once")
+    run_parser.set_defaults(func=run_command)
+
+    ui_parser = subparsers.add_parser("serve-ui", help="start the report viewer UI and the background scheduler")
+    ui_parser.set_defaults(func=serve_ui_command)
+
+    backfill_parser = subparsers.add_parser("backfill", help="backfill news and daily reports for a date range")
+    backfill_parser.add_argument("--start", required=True, help="first day, YYYY-MM-DD")
+    backfill_parser.add_argument("--end", required=True, help="last day, YYYY-MM-DD")
+    backfill_parser.add_argument("--party", choices=["democrat", "republican", "all"], default="all")
+    backfill_parser.set_defaults(func=backfill_command)
+
+    trend_parser = subparsers.add_parser("trend", help="weekly/monthly trend report from stored per-article rollups")
+    trend_parser.add_argument("--period", choices=["week", "month"], default="week")
+    trend_parser.add_argument("--key", help="period key, e.g. 2024-W36 or 2024-09 (default: current period)")
+    trend_parser.set_defaults(func=trend_command)
+
+    args = parser.parse_args(argv)
+    logging.info("Starting Bipartisan Insight service.")
+    # 不带子命令时与之前一样启动界面
+    return getattr(args, "func", serve_ui_command)(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,10 +24,6 @@ class ConfigManager:
         """获取定时任务的执行时间"""
         return self.config.get("schedule_time", "10:00")
 
-    def get_party_url(self, party):
-        """获取指定党派的新闻 URL 模板"""
-        return self.config["urls"].get(party)
-
     def set_schedule_time(self, time_str):
         """设置定时任务的执行时间并保存配置"""
         self.config["schedule_time"] = time_str
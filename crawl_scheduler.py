@@ -0,0 +1,146 @@
+import logging
+import random
+import threading
+import time
+import urllib.robotparser
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import registry
+
+# 默认重试的状态码：限流和服务端错误；个别站点（如偶发 403 的 gop.com）可在 domains 中单独配置
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CrawlError(Exception):
+    """抓取失败：robots.txt 禁止访问，或重试耗尽后仍未得到可用的响应"""
+
+
+class CrawlScheduler:
+    """所有抓取器共享的礼貌抓取调度：按域名限速、有限次重试退避、缓存 robots.txt。
+
+    某个域名限流或退避时只推迟该域名的请求，不影响其他站点。配置见 config.json 的 crawler：
+    min_interval（同一域名两次请求的最小间隔秒数）、max_retries、backoff_base、backoff_max、
+    respect_robots、robots_ttl，以及按域名覆盖上述间隔和重试状态码的 domains。
+    """
+
+    def __init__(self, config_manager):
+        crawler_config = config_manager.config.get("crawler", {})
+        self.min_interval = crawler_config.get("min_interval", 0.0)
+        self.max_retries = crawler_config.get("max_retries", 3)
+        self.backoff_base = crawler_config.get("backoff_base", 2.0)
+        self.backoff_max = crawler_config.get("backoff_max", 30.0)
+        self.respect_robots = crawler_config.get("respect_robots", True)
+        self.robots_ttl = crawler_config.get("robots_ttl", 3600)
+        self.domains = crawler_config.get("domains", {})
+
+        self._next_slot = {}  # host -> 下一次允许请求的时间（time.monotonic）
+        self._robots = {}  # scheme://host -> (RobotFileParser, 获取时间)
+        self._robots_locks = {}
+        self._lock = threading.Lock()
+        logging.info(
+            f"CrawlScheduler initialized: min interval {self.min_interval}s, {self.max_retries} retries, "
+            f"robots.txt {'on' if self.respect_robots else 'off'}"
+        )
+
+    def _domain_setting(self, host, key, default):
+        """按域名读取配置，host 为 gop.com 或其子域名（如 www.gop.com）时都匹配 gop.com 的配置"""
+        hostname = host.split(":", 1)[0]
+        for domain, settings in self.domains.items():
+            if hostname == domain or hostname.endswith("." + domain):
+                return settings.get(key, default)
+        return default
+
+    def _wait_turn(self, host):
+        """预约该域名的下一个请求时间并等待到点；预约在锁内完成，等待在锁外进行"""
+        interval = self._domain_setting(host, "min_interval", self.min_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _defer(self, host, delay):
+        """退避期间推迟该域名的所有后续请求"""
+        with self._lock:
+            self._next_slot[host] = max(self._next_slot.get(host, 0.0), time.monotonic() + delay)
+
+    def _retry_delay(self, response, attempt):
+        """指数退避加随机抖动；服务端给出 Retry-After（秒）时以其为准"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = min(self.backoff_max, max(delay, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    def allowed(self, url, send, user_agent="*", headers=None):
+        """按 robots.txt 判断是否允许抓取 url；robots.txt 按站点缓存 robots_ttl 秒，获取时带上来源的请求头"""
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        site = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            site_lock = self._robots_locks.setdefault(site, threading.Lock())
+        # 同一站点只获取一次，其他线程等待结果
+        with site_lock:
+            cached = self._robots.get(site)
+            if cached is None or time.monotonic() - cached[1] > self.robots_ttl:
+                cached = (self._fetch_robots(site, send, headers), time.monotonic())
+                self._robots[site] = cached
+        return cached[0].can_fetch(user_agent, url)
+
+    def _fetch_robots(self, site, send, headers=None):
+        """获取并解析 robots.txt，与页面请求使用相同的请求头和按域名配置的重试状态码。
+        重试后仍失败（含 401/403、404、网络错误）时按 RFC 9309 视为不限制：
+        部分站点（如 gop.com）会对不像浏览器的请求返回 403，不能据此停止抓取整个站点"""
+        parser = urllib.robotparser.RobotFileParser(f"{site}/robots.txt")
+        try:
+            response = self._send_with_retries(f"{site}/robots.txt", send, headers)
+        except requests.RequestException as e:
+            logging.warning(f"Could not fetch {site}/robots.txt, assuming allowed: {e}")
+            parser.parse([])
+            return parser
+        if response.status_code == 200:
+            parser.parse(response.text.splitlines())
+        else:
+            if response.status_code in (401, 403):
+                logging.warning(f"{site}/robots.txt returned HTTP {response.status_code}, assuming allowed")
+            parser.parse([])
+        logging.info(f"Loaded {site}/robots.txt (HTTP {response.status_code})")
+        return parser
+
+    def request(self, url, send, headers=None, user_agent="*"):
+        """遵守 robots.txt 和域名限速发起请求，失败时有限次退避重试。
+        send(url, headers) 实际发出请求；返回最后一次的响应，重试耗尽时仍可能是错误状态码"""
+        host = urlsplit(url).netloc
+        if not self.allowed(url, send, user_agent, headers):
+            registry.inc("crawl_blocked_total", host=host)
+            raise CrawlError(f"Disallowed by robots.txt: {url}")
+        return self._send_with_retries(url, send, headers)
+
+    def _send_with_retries(self, url, send, headers):
+        """按域名限速发出请求，遇到网络错误或该域名的重试状态码时退避重试；返回最后一次的响应"""
+        host = urlsplit(url).netloc
+        retry_statuses = set(self._domain_setting(host, "retry_statuses", DEFAULT_RETRY_STATUSES))
+        for attempt in range(self.max_retries + 1):
+            self._wait_turn(host)
+            try:
+                response = send(url, headers)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                response, reason = None, type(e).__name__
+            else:
+                if response.status_code not in retry_statuses or attempt == self.max_retries:
+                    return response
+                reason = response.status_code
+            delay = self._retry_delay(response, attempt)
+            registry.inc("crawl_retries_total", host=host, reason=reason)
+            logging.warning(f"Retrying {url} in {delay:.1f}s ({reason}, attempt {attempt + 1}/{self.max_retries})")
+            self._defer(host, delay)
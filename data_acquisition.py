@@ -1,179 +1,274 @@
-import requests
-from bs4 import BeautifulSoup
 import os
 import datetime
-from newspaper import Article
-import time
-import random
 import logging
+from urllib.parse import urljoin, urlsplit
 from config_manager import ConfigManager
+from crawl_scheduler import CrawlError, CrawlScheduler
+from http_fetcher import HttpFetcher
+from metrics import registry
+from news_archive import NewsArchive, markdown_file_name
+from news_index import NewsIndex, content_hash
+from news_sources import SourceRegistry
+from search_index import SearchIndex
 
-class NewsCrawlerBase:
-    def __init__(self, config_manager, party):
+class NewsCrawler:
+    """抓取一个党派的全部新闻来源（见 news_sources.py），同一党派的新闻保存在同一目录并生成同一份报告。
+    多个抓取器可共享同一个 CrawlScheduler，按域名统一限速"""
+
+    def __init__(self, config_manager, party, sources=None, scheduler=None):
+        self.party = party
+        self.sources = sources if sources is not None else SourceRegistry(config_manager).for_party(party)
+        if not self.sources:
+            raise ValueError(f"No news sources configured for {party}")
         self.news_dir = f"data/news/{party}"
         os.makedirs(self.news_dir, exist_ok=True)
-        self.today_str = datetime.date.today().strftime("%Y-%m-%d")
-        self.url_template = config_manager.get_party_url(party)
-        logging.info(f"Initialized {party} news crawler with directory: {self.news_dir}")
-
-    def fetch_news(self):
-        """子类实现特定网站的新闻抓取"""
-        raise NotImplementedError("Subclasses must implement this method")
-
-    def _save_news_to_md(self, title, content):
-        """将新闻保存为 Markdown 文件，并返回文件路径，文件名格式为 日期_新闻稿标题.md"""
-        file_name = f"{self.news_dir}/{self.today_str}_{title.replace(' ', '_')}.md"
-        with open(file_name, "w") as f:
-            f.write(f"# {title}\n\n")
-            f.write(content)
-        logging.info(f"Saved news to {file_name}")
-        return file_name  # 返回生成的 Markdown 文件路径
-
-class DemocratNewsCrawler(NewsCrawlerBase):
-    def __init__(self, config_manager):
-        super().__init__(config_manager, "democrat")
-
-    def fetch_news(self):
-        print("Fetching Democrat news...")
-        page = 1
-        news_list = []
-        saved_files = []  # 存储生成的 md 文件路径
-        while True:
-            url = self.url_template.format(page)
-            response = requests.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
+        self.scheduler = scheduler or CrawlScheduler(config_manager)
+        self.fetcher = HttpFetcher(config_manager, metric_labels={"party": party}, scheduler=self.scheduler)
+        self._sources_by_host = {}
+        for source in self.sources:
+            self._sources_by_host.setdefault(source.host, source)
+        self.index = NewsIndex(config_manager.config.get("news_index_path", "data/news_index.db"))
+        # 抓取失败的文章在之后的运行中重试，超过该次数后放弃
+        self.max_fetch_attempts = config_manager.config.get("crawler", {}).get("max_fetch_attempts", 5)
+        self.search_index = SearchIndex(config_manager.config.get("search_index_path", "data/search_index.db"))
+        # 新闻正文写入只追加的存档；write_markdown 为 False 时不再逐篇写 Markdown 文件，需要时用存档导出
+        archive_config = config_manager.config.get("archive", {})
+        self.archive = NewsArchive(archive_config.get("path", "data/news_archive.db"))
+        self.write_markdown = archive_config.get("write_markdown", True)
+        logging.info(
+            f"Initialized {party} news crawler with {len(self.sources)} sources, directory: {self.news_dir}"
+        )
+
+    @staticmethod
+    def _today():
+        return datetime.date.today().strftime("%Y-%m-%d")
+
+    def fetch_news(self, news_date=None):
+        """抓取指定日期（默认当天，YYYY-MM-DD）的新闻并保存为 Markdown 文件，返回按列表页顺序排列的文件路径"""
+        news_date = news_date or self._today()
+        # 并发获取新闻的标题和正文并保存为 Markdown 文件
+        return self._fetch_all_news(self._collect_news_items(news_date))
+
+    def iter_news(self, news_date=None):
+        """流式抓取指定日期（默认当天）的新闻，每保存一篇立即产出其文件路径（按完成顺序）"""
+        news_date = news_date or self._today()
+        items = self._interleave_by_host(self._collect_news_items(news_date))
+        for md_file in self.fetcher.imap_unordered(self._safe_fetch_and_save, items):
+            if md_file:
+                yield md_file
+
+    def iter_articles(self, items):
+        """并发抓取 [(链接, 日期)]，按完成顺序产出 ((链接, 日期), md 文件路径)，失败时路径为 None"""
+        items = self._interleave_by_host(items)
+        return self.fetcher.imap_unordered(lambda item: (item, self._safe_fetch_and_save(item)), items)
 
-            # 查找所有 class 为 "posts-list__item" 的 <li> 标签
-            articles = soup.find_all('li', class_='posts-list__item')
+    @staticmethod
+    def _interleave_by_host(items):
+        """按主机轮流排列 [(链接, 日期)]，避免一个限速较慢的站点占满全部抓取线程"""
+        by_host = {}
+        for item in items:
+            by_host.setdefault(urlsplit(item[0]).netloc, []).append(item)
+        queues = list(by_host.values())
+        return [queue[i] for i in range(max(map(len, queues), default=0)) for queue in queues if i < len(queue)]
+
+    def _collect_news_items(self, news_date):
+        """遍历列表页，返回需要抓取的 [(链接, 日期)]；遇到已成功抓取的文章即停止翻页"""
+        print(f"Fetching {self.party.capitalize()} news...")
+        with registry.timer("crawl_listing_seconds", party=self.party):
+            buckets = self.collect_news_range(news_date, news_date, stop_at_indexed=True)
+        return self._merge_indexed_news(buckets.get(news_date, []), news_date)
+
+    def collect_news_range(self, start_date, end_date, start_pages=None, stop_at_indexed=False, on_page=None,
+                           strict=False):
+        """并发遍历各来源的列表页，把 start_date 到 end_date（含）之间的新闻链接按日期分组，返回 {日期: [链接]}。
+
+        start_pages 为 {来源名: 起始页}，值为 None 的来源已遍历完、直接跳过；
+        on_page(来源名, 页码, 该来源的 {日期: [链接]}, 是否遍历完) 在每页处理完后调用（可能来自多个线程），用于断点续传。
+        单个来源出错时记录日志并继续其他来源；strict=True 时在其他来源完成后抛出第一个错误。
+        """
+        start_pages = start_pages or {}
+        sources = [source for source in self.sources if start_pages.get(source.name, source.start_page) is not None]
+
+        def collect(source):
+            try:
+                buckets = self._collect_source(
+                    source, start_date, end_date, start_pages.get(source.name, source.start_page),
+                    stop_at_indexed, on_page
+                )
+                return buckets, None
+            except Exception as e:
+                logging.error(f"Error collecting news links from {source.name}: {e}")
+                return {}, e
+
+        merged = {}
+        errors = []
+        for buckets, error in self.fetcher.map(collect, sources):
+            if error is not None:
+                errors.append(error)
+            for news_date, links in buckets.items():
+                known = merged.setdefault(news_date, [])
+                known.extend(link for link in links if link not in known)
+        if strict and errors:
+            raise errors[0]
+        return merged
+
+    def _collect_source(self, source, start_date, end_date, page, stop_at_indexed, on_page):
+        """遍历一个来源的列表页。分页列表按时间倒序，遇到早于 start_date 或已索引的文章即停止翻页；
+        单页来源（如 RSS）不保证顺序，只跳过这些文章"""
+        buckets = {}
+        while True:
+            page_url = source.page_url(page)
+            response = self.fetcher.get(page_url, headers=source.headers or None)
+            if response.status_code == 404 and page > source.start_page:
+                break  # 超出最后一页
+            if response.status_code != 200:
+                raise CrawlError(f"Failed to fetch listing {page_url}: HTTP {response.status_code}")
+            articles = source.extractor.parse_listing(response.content)
             if not articles:
                 break
 
-            for article in articles:
-                # 查找 class 为 "posts-list__data" 的 <span> 标签，获取发布日期
-                date_tag = article.find('span', class_='posts-list__date')
-                if date_tag:
-                    news_date_str = date_tag.text.strip()
-                    # 日期格式为 mm/dd/yyyy，转换为 yyyy-mm-dd
-                    news_date = datetime.datetime.strptime(news_date_str, "%m/%d/%Y").strftime("%Y-%m-%d")
-
-                    # 检查新闻日期是否为今天
-                    if news_date == self.today_str:
-                        # 获取新闻链接
-                        link_tag = article.find('a')
-                        if link_tag and 'href' in link_tag.attrs:
-                            news_link = link_tag['href']
-                            news_list.append(news_link)
-
-            # 如果当天没有新闻，说明已经获取完当天的所有新闻
-            if not news_list or len(news_list) < len(articles):
+            finished = False
+            discovered = []
+            for news_link, news_date in articles:
+                if not (news_link and news_date) or news_date > end_date:
+                    continue
+                news_link = urljoin(page_url, news_link)
+                # 增量抓取时，遇到已索引的文章说明之后的都已抓取过
+                if news_date < start_date or (stop_at_indexed and self._is_indexed(news_link)):
+                    finished = True
+                    if source.paginated:
+                        break
+                    continue
+                links = buckets.setdefault(news_date, [])
+                if news_link not in links:
+                    links.append(news_link)
+                    discovered.append((news_link, news_date))
+            # 抓取前先登记为 pending，抓取失败的文章不会因为之后的翻页提前停止而丢失
+            self.index.add_pending(self.party, discovered)
+
+            last_page = not source.paginated or page - source.start_page + 1 >= source.max_pages
+            if source.paginated and last_page and not finished:
+                logging.warning(f"Stopped {source.name} listing at max_pages ({source.max_pages})")
+            if on_page is not None:
+                on_page(source.name, page, buckets, finished or last_page)
+            if finished or last_page:
                 break
             page += 1
 
-        # 遍历当天的新闻链接，获取标题和正文并保存为 Markdown 文件
-        for link in news_list:
-            md_file = self._fetch_and_save_full_news(link)
-            if md_file:
-                saved_files.append(md_file)
-
-        return saved_files  # 返回保存的 md 文件路径列表
-
-    def _fetch_and_save_full_news(self, news_link):
-        """使用 newspaper3k 获取新闻的标题和正文并保存，返回生成的文件路径"""
-        article = Article(news_link)
-        article.download()
-        article.parse()
-
-        title = article.title
-        content = article.text
-
-        # 保存为 Markdown 文件，并返回文件路径
-        return self._save_news_to_md(title, content) if title and content else None
-
-class RepublicanNewsCrawler(NewsCrawlerBase):
-    def __init__(self, config_manager):
-        super().__init__(config_manager, "republican")
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }  # 模拟浏览器请求头
-
-    def fetch_news(self):
-        print("Fetching Republican news...")
-        page = 1
-        news_list = []
-        saved_files = []  # 存储生成的 md 文件路径
-        while True:
-            url = self.url_template.format(page)
-            response = requests.get(url, headers=self.headers)  # 添加请求头
-            if response.status_code == 403:
-                print("Access Forbidden. Trying again with a delay...")
-                time.sleep(random.uniform(3, 6))  # 随机延迟以避免被屏蔽
-                continue
+        return buckets
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+    def _source_for(self, news_link):
+        """文章所属的来源（按主机匹配），用于选择文章页解析器和请求头；匹配不到时使用第一个来源"""
+        return self._sources_by_host.get(urlsplit(news_link).netloc, self.sources[0])
 
-            # 查找所有新闻稿，标题在 class="c-blog-title" 的 h5 内的 <a> 标签，日期在 class="c-publish-date" 的 <span> 标签
-            articles = soup.find_all('div', class_='c-blog-item')
-            if not articles:
-                break
+    def _is_indexed(self, news_link):
+        """判断文章是否已成功抓取，列表页遇到已抓取的文章即可停止翻页"""
+        return self.index.is_fetched(news_link)
 
-            for article in articles:
-                # 获取新闻链接
-                title_tag = article.find('h5', class_='c-blog-title')
-                link_tag = title_tag.find('a') if title_tag else None
-                if link_tag and 'href' in link_tag.attrs:
-                    news_link = link_tag['href']
+    def _merge_indexed_news(self, news_list, news_date):
+        """返回需要抓取的 [(链接, 日期)]：列表页的新链接，加上索引中该日期已登记的文章（保证重复运行时报告内容完整），
+        其中包括该日期尚未抓取成功（pending 或 failed）的文章。只取该日期的记录：其他日期（如回填时列表页登记的）
+        的文章不能进入当天的报告，往日抓取失败的文章由 backfill 按日期补抓"""
+        items = [(news_link, news_date) for news_link in news_list]
+        for news_link in self.index.urls_for_date(self.party, news_date, self.max_fetch_attempts):
+            if news_link not in news_list:
+                items.append((news_link, news_date))
+        return items
 
-                    # 获取新闻发布日期
-                    date_tag = article.find('span', class_='c-publish-date')
-                    if date_tag:
-                        news_date_str = date_tag.text.strip()
+    def _fetch_and_save_full_news(self, news_link, news_date):
+        """抓取单篇新闻并保存，已索引的文章使用条件请求，未变化时直接复用已保存的文件"""
+        record = self.index.get(news_link)
+        if record and not (record["md_path"] and self._news_file_exists(record["md_path"])):
+            record = None  # 文件已被删除，需要重新抓取
 
-                        # 日期格式为 "sep 05, 2024"，转换为 "yyyy-mm-dd"
-                        news_date = datetime.datetime.strptime(news_date_str, "%b %d, %Y").strftime("%Y-%m-%d")
+        headers = {}
+        if record:
+            if record["etag"]:
+                headers["If-None-Match"] = record["etag"]
+            if record["last_modified"]:
+                headers["If-Modified-Since"] = record["last_modified"]
 
-                        # 检查新闻日期是否为今天
-                        if news_date == self.today_str:
-                            news_list.append(news_link)
+        source = self._source_for(news_link)
+        response = self.fetcher.get(news_link, headers=dict(source.headers, **headers) or None)
+        if response.status_code == 304 and record:
+            logging.info(f"Not modified, reusing {record['md_path']}")
+            registry.inc("news_articles_total", party=self.party, outcome="not_modified")
+            return record["md_path"]
+        if response.status_code != 200:
+            logging.warning(f"Failed to fetch {news_link}: HTTP {response.status_code}")
+            registry.inc("news_articles_total", party=self.party, outcome="failed")
+            self.index.mark_failed(news_link)
+            return None
 
-            # 如果没有新的新闻，或者已经获取完当天新闻，则退出循环
-            if not news_list or len(news_list) < len(articles):
-                break
-            page += 1
+        title, content = source.extractor.parse_article(news_link, response.content)
+        if not (title and content):
+            logging.warning(f"No title or content extracted from {news_link}")
+            self.index.mark_failed(news_link)
+            return None
 
-        # 遍历当天的新闻链接，获取标题和正文并保存为 Markdown 文件
-        for link in news_list:
-            md_file = self._fetch_and_save_full_news(link)
-            if md_file:
-                saved_files.append(md_file)
+        news_date = record["news_date"] if record else news_date
+        digest = content_hash(f"{title}\n{content}")
+        if record and record["content_hash"] == digest:
+            md_file = record["md_path"]
+            logging.info(f"Content unchanged, reusing {md_file}")
+            registry.inc("news_articles_total", party=self.party, outcome="unchanged")
+        else:
+            md_file = self._save_news(news_link, title, content, news_date, digest)
+            registry.inc("news_articles_total", party=self.party, outcome="new")
 
-        return saved_files  # 返回保存的 md 文件路径列表
+        self.index.record(
+            news_link, self.party, news_date, title, digest,
+            response.headers.get("ETag"), response.headers.get("Last-Modified"), md_file
+        )
+        return md_file
 
-    def _fetch_and_save_full_news(self, news_link):
-        """使用 requests 和 BeautifulSoup 获取新闻的标题和正文并保存，返回生成的文件路径"""
-        response = requests.get(news_link, headers=self.headers)
-        if response.status_code == 403:
-            print(f"Access Forbidden for {news_link}")
+    def _safe_fetch_and_save(self, item):
+        """抓取单篇新闻（item 为 (链接, 日期)），出错时记录日志并返回 None，避免影响其他并发任务"""
+        news_link, news_date = item
+        try:
+            return self._fetch_and_save_full_news(news_link, news_date)
+        except Exception as e:
+            logging.error(f"Error fetching {news_link}: {e}")
+            self.index.mark_failed(news_link)
             return None
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        # 假设标题和正文的标签如下，实际情况需要根据页面的 HTML 结构调整
-        title = soup.find('div', class_='c-title').get_text(strip=True)
-        content = soup.find('div', class_='c-blog-description').get_text(strip=True)
+    def _fetch_all_news(self, items):
+        """并发抓取所有 (链接, 日期)，按输入顺序返回保存的 md 文件路径列表"""
+        ordered = self._interleave_by_host(items)
+        results = dict(zip(ordered, self.fetcher.map(self._safe_fetch_and_save, ordered)))
+        return [results[item] for item in items if results[item]]
+
+    def _news_file_exists(self, md_path):
+        return os.path.exists(md_path) or self.archive.has_path(md_path)
+
+    def _save_news(self, news_link, title, content, news_date, digest):
+        """将新闻追加到存档（并按配置保存为 Markdown 文件），返回文件路径，文件名格式为 日期_新闻稿标题_链接摘要.md"""
+        file_name = os.path.join(self.news_dir, markdown_file_name(news_date, title, news_link))
+        self.archive.append(news_link, self.party, news_date, title, content, digest, file_name)
+        if self.write_markdown:
+            with open(file_name, "w") as f:
+                f.write(f"# {title}\n\n")
+                f.write(content)
+            logging.info(f"Saved news to {file_name}")
+        self.search_index.safe_add_document(file_name, "news", self.party, news_date, title, content)
+        return file_name  # 返回 Markdown 文件路径，未写文件时作为存档中的键
+
+class DemocratNewsCrawler(NewsCrawler):
+    def __init__(self, config_manager, scheduler=None):
+        super().__init__(config_manager, "democrat", scheduler=scheduler)
 
-        # 保存为 Markdown 文件，并返回文件路径
-        return self._save_news_to_md(title, content) if title and content else None
+class RepublicanNewsCrawler(NewsCrawler):
+    def __init__(self, config_manager, scheduler=None):
+        super().__init__(config_manager, "republican", scheduler=scheduler)
 
 # 测试代码
 if __name__ == '__main__':
     config_manager = ConfigManager()
     
     democrat_crawler = DemocratNewsCrawler(config_manager)
-    democrat_crawler.today_str = '2024-09-04'
-    democrat_news = democrat_crawler.fetch_news()
+    democrat_news = democrat_crawler.fetch_news('2024-09-04')
     print(democrat_news)
 
     republican_crawler = RepublicanNewsCrawler(config_manager)
-    republican_crawler.today_str = '2024-09-04'
-    republican_news = republican_crawler.fetch_news()
+    republican_news = republican_crawler.fetch_news('2024-09-04')
     print(republican_news)
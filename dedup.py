@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+FINGERPRINT_BITS = 64
+BANDS = 4  # 4 段各 16 位：汉明距离不超过 3 时至少有一段完全相同
+BAND_BITS = FINGERPRINT_BITS // BANDS
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def simhash(text, shingle_size=3):
+    """计算文本的 64 位 SimHash 指纹，特征为连续 shingle_size 个词组成的片段"""
+    words = _WORD.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint):
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def _to_signed(value):
+    """SQLite 整数为有符号 64 位，存储前转换"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """持久化的 SimHash 指纹库，按分段索引查找候选，可跨天发现近似重复的新闻稿"""
+
+    def __init__(self, db_path="data/fingerprints.db", max_distance=3):
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BANDS))
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT PRIMARY KEY,
+                    party TEXT NOT NULL,
+                    news_date TEXT NOT NULL,
+                    fingerprint INTEGER NOT NULL,
+                    {band_columns}
+                )
+            """)
+            for i in range(BANDS):
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_fingerprints_band{i} ON fingerprints (party, band{i})"
+                )
+
+    def find_duplicate(self, path, party, fingerprint):
+        """查找同党派中与指纹近似的其他文章，返回 (原文路径, 汉明距离)，没有时返回 None"""
+        bands = _bands(fingerprint)
+        where = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT path, fingerprint FROM fingerprints WHERE party = ? AND path != ? AND ({where})",
+                [party, path] + bands
+            ).fetchall()
+
+        best = None
+        for other_path, other_fingerprint in rows:
+            distance = hamming_distance(fingerprint, _to_unsigned(other_fingerprint))
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (other_path, distance)
+        return best
+
+    def add(self, path, party, news_date, fingerprint):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO fingerprints (path, party, news_date, fingerprint, "
+                f"{', '.join(f'band{i}' for i in range(BANDS))}) VALUES (?, ?, ?, ?{', ?' * BANDS})",
+                [path, party, news_date, _to_signed(fingerprint)] + _bands(fingerprint)
+            )
+
+    def check(self, path, party, news_date, text):
+        """登记一篇文章的指纹，若与已有文章近似则返回 (原文路径, 汉明距离)"""
+        fingerprint = simhash(text)
+        duplicate = self.find_duplicate(path, party, fingerprint)
+        if duplicate is None:
+            self.add(path, party, news_date, fingerprint)
+        else:
+            logging.info(f"{path} is a near-duplicate of {duplicate[0]} (distance {duplicate[1]})")
+        return duplicate
+
+    def begin(self):
+        """开始一次报告生成：期间新文章的指纹只记在内存中，报告保存成功后 commit 才写入指纹库"""
+        return PendingFingerprints(self)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PendingFingerprints:
+    """一次报告生成中新登记的指纹。分析失败时直接丢弃，不会让尚未分析过的文章在下次运行时被判为重复"""
+
+    def __init__(self, index):
+        self.index = index
+        self.entries = []  # [(path, party, news_date, fingerprint)]
+
+    def _find_pending(self, path, party, fingerprint):
+        best = None
+        for other_path, other_party, _, other_fingerprint in self.entries:
+            if other_party != party or other_path == path:
+                continue
+            distance = hamming_distance(fingerprint, other_fingerprint)
+            if distance <= self.index.max_distance and (best is None or distance < best[1]):
+                best = (other_path, distance)
+        return best
+
+    def check(self, path, party, news_date, text):
+        """与 NearDuplicateIndex.check 相同，但同时比较本次已登记的文章，且新指纹暂不写入指纹库"""
+        fingerprint = simhash(text)
+        candidates = [
+            match for match in (self.index.find_duplicate(path, party, fingerprint),
+                                self._find_pending(path, party, fingerprint)) if match
+        ]
+        duplicate = min(candidates, key=lambda match: match[1]) if candidates else None
+        if duplicate is None:
+            self.entries.append((path, party, news_date, fingerprint))
+        else:
+            logging.info(f"{path} is a near-duplicate of {duplicate[0]} (distance {duplicate[1]})")
+        return duplicate
+
+    def commit(self):
+        """报告保存成功后把本次登记的指纹写入指纹库"""
+        for entry in self.entries:
+            self.index.add(*entry)
+        self.entries = []
@@ -4,7 +4,9 @@ from email.mime.multipart import MIMEMultipart
 import logging
 from config_manager import ConfigManager
 import os
-import markdown2
+import threading
+from collections import OrderedDict
+from metrics import registry
 
 
 class EmailNotifier:
@@ -13,34 +15,118 @@ class EmailNotifier:
         email_config = config_manager.config.get("email", {})
         self.smtp_server = email_config.get("smtp_server", "")
         self.smtp_port = email_config.get("smtp_port", 587)
+        self.use_ssl = email_config.get("use_ssl", True)  # False 时使用明文 SMTP（本地测试服务）
+        self.starttls = email_config.get("starttls", False)  # 明文连接后升级为 TLS（通常配合 587 端口）
         self.sender_email = email_config.get("sender_email", "")
         self.sender_password = os.getenv("SENDER_EMAIL_PASSWORD")  # 从环境变量中获取密码
-        self.recipient_email = email_config.get("recipient_email", "")
+        self.recipients = self._parse_recipients(
+            email_config.get("recipient_emails", email_config.get("recipient_email", ""))
+        )
+        self.digest = email_config.get("digest", False)  # True 时两党报告合并为一封摘要邮件
+        self._html_cache = OrderedDict()  # 报告路径 -> (mtime, 渲染后的 HTML)
+        self._html_cache_size = email_config.get("html_cache_size", 32)
+        self._html_cache_lock = threading.Lock()
         logging.info(f"EmailNotifier initialized with SMTP server: {self.smtp_server}")
 
+    @staticmethod
+    def _parse_recipients(value):
+        """收件人可以是列表，也可以是逗号分隔的字符串"""
+        if isinstance(value, str):
+            value = value.split(",")
+        return [address.strip() for address in value if address and address.strip()]
+
     def send(self, report_file):
         """发送带有报告的邮件"""
-        # 创建邮件
-        message = MIMEMultipart()
-        message["From"] = self.sender_email
-        message["To"] = self.recipient_email
-        message["Subject"] = "Daily Report"
+        return self.send_batch([report_file])
+
+    def send_batch(self, report_files, subject="Daily Report"):
+        """复用同一个已登录的 SMTP 连接，把每份报告作为一封邮件发送给所有收件人；
+        邮件在发送时逐封构造，内存中只保留正在发送的一封"""
+        try:
+            for report_file in report_files:
+                os.stat(report_file)  # 报告缺失时不建立连接
+        except Exception as e:
+            logging.error(f"Error preparing email: {e}")
+            return f"Error preparing email: {e}"
+        return self._deliver(
+            self._build_message(subject, self.render_html(report_file)) for report_file in report_files
+        )
+
+    def send_digest(self, report_files, subject="Daily Report Digest"):
+        """把多份报告（例如两党当天的报告）合并为一封摘要邮件发送"""
+        try:
+            sections = []
+            for report_file in report_files:
+                party = os.path.basename(os.path.dirname(report_file)).capitalize()
+                sections.append(f"<h2>{party}</h2>\n{self.render_html(report_file)}")
+            messages = [self._build_message(subject, "\n<hr>\n".join(sections))]
+        except Exception as e:
+            logging.error(f"Error preparing email: {e}")
+            return f"Error preparing email: {e}"
+        return self._deliver(messages)
+
+    def render_html(self, report_file):
+        """读取报告并将 Markdown 转换为 HTML，文件未修改时复用缓存结果"""
+        mtime = os.stat(report_file).st_mtime_ns
+        with self._html_cache_lock:
+            cached = self._html_cache.get(report_file)
+            if cached and cached[0] == mtime:
+                self._html_cache.move_to_end(report_file)
+                return cached[1]
 
         # 邮件正文
         with open(report_file, "r") as f:
             report_content = f.read()
 
-        # 将Markdown内容转换为HTML
+        # 将Markdown内容转换为HTML（markdown2 只在发送邮件时导入）
+        import markdown2
         html_report = markdown2.markdown(report_content)
+        with self._html_cache_lock:
+            self._html_cache[report_file] = (mtime, html_report)
+            while len(self._html_cache) > self._html_cache_size:
+                self._html_cache.popitem(last=False)
+        return html_report
 
+    def _build_message(self, subject, html_report):
+        message = MIMEMultipart()
+        message["From"] = self.sender_email
+        message["To"] = ", ".join(self.recipients)
+        message["Subject"] = subject
         message.attach(MIMEText(html_report, 'html'))
+        return message
+
+    def _connect(self):
+        """建立连接并登录，返回 SMTP 连接对象"""
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.smtp_server, self.smtp_port)
         try:
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
+            if self.starttls and not self.use_ssl:
+                server.starttls()
+            if self.sender_password:
                 logging.debug("登录SMTP服务器")
-                server.login(message['From'], self.sender_password)
-                server.sendmail(message['From'], message['To'], message.as_string())
-                logging.info("邮件发送成功！")
+                server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _deliver(self, messages):
+        """在一个连接内发送所有邮件（messages 可以是逐封构造的生成器），出错时返回错误信息"""
+        if not self.recipients:
+            logging.error("Error sending email: no recipients configured")
+            return "Error sending email: no recipients configured"
+        sent = 0
+        try:
+            with registry.timer("smtp_send_seconds"):
+                with self._connect() as server:
+                    for message in messages:
+                        server.sendmail(self.sender_email, self.recipients, message.as_string())
+                        sent += 1
+                        registry.inc("smtp_messages_total", outcome="sent")
+                        registry.inc("smtp_recipients_total", len(self.recipients))
+            logging.info(f"邮件发送成功！共 {sent} 封，收件人 {len(self.recipients)} 位")
         except Exception as e:
+            registry.inc("smtp_messages_total", outcome="error")
             logging.error(f"Error sending email: {e}")
             return f"Error sending email: {e}"
 
@@ -0,0 +1,201 @@
+import datetime
+import email.utils
+import logging
+
+import lxml.etree
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _text(element):
+    """提取元素下的全部文本并去除首尾空白"""
+    return element.text_content().strip() if element is not None else ""
+
+
+def _paragraphs(element):
+    """按文本块提取正文，去掉空白块后用空行连接"""
+    if element is None:
+        return ""
+    chunks = (chunk.strip() for chunk in element.itertext())
+    return "\n\n".join(chunk for chunk in chunks if chunk)
+
+
+def _newspaper_article(news_link, html_bytes):
+    """交给 newspaper3k 提取标题和正文，返回 (title, content)"""
+    # newspaper3k 会连带导入 nltk、PIL 等较重的依赖，只在需要时导入
+    from newspaper import Article
+
+    article = Article(news_link)
+    article.download(input_html=html_bytes)
+    article.parse()
+    return article.title, article.text
+
+
+class NewsExtractor:
+    """站点解析器接口：直接从原始字节解析列表页和文章页，只访问需要的元素"""
+
+    # 子类配置：列表项、链接、日期的 CSS 选择器，以及列表页日期格式
+    item_selector = None
+    link_selector = None
+    date_selector = None
+    date_format = None
+
+    def __init__(self):
+        self._item = CSSSelector(self.item_selector)
+        self._link = CSSSelector(self.link_selector)
+        self._date = CSSSelector(self.date_selector)
+
+    @staticmethod
+    def parse_html(html_bytes):
+        """用 lxml 从字节解析页面，编码由页面 meta 声明决定，跳过 requests 的字符集探测；
+        空响应或只有空白、注释的页面返回空的 <html> 元素，选择器在其上匹配不到任何内容"""
+        if not html_bytes or not html_bytes.strip():
+            return lxml.html.Element("html")
+        try:
+            return lxml.html.fromstring(html_bytes)
+        except lxml.etree.ParserError:
+            return lxml.html.Element("html")
+
+    def parse_listing(self, html_bytes):
+        """解析列表页，返回 [(新闻链接, YYYY-MM-DD 日期)]，缺失的字段为 None"""
+        tree = self.parse_html(html_bytes)
+        items = []
+        for item in self._item(tree):
+            links = self._link(item)
+            dates = self._date(item)
+            news_link = links[0].get("href") if links else None
+            news_date = self._parse_date(_text(dates[0])) if dates else None
+            items.append((news_link, news_date))
+        return items
+
+    def _parse_date(self, date_str):
+        try:
+            return datetime.datetime.strptime(date_str, self.date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            logging.warning(f"Unrecognized date format: {date_str!r}")
+            return None
+
+    def parse_article(self, news_link, html_bytes):
+        """子类实现文章页解析，返回 (title, content)"""
+        raise NotImplementedError("Subclasses must implement this method")
+
+
+class DemocratExtractor(NewsExtractor):
+    """democrats.org：列表项为 li.posts-list__item，日期格式 mm/dd/yyyy，正文交给 newspaper3k 提取"""
+
+    item_selector = "li.posts-list__item"
+    link_selector = "a"
+    date_selector = "span.posts-list__date"
+    date_format = "%m/%d/%Y"
+
+    def parse_article(self, news_link, html_bytes):
+        return _newspaper_article(news_link, html_bytes)
+
+
+class RepublicanExtractor(NewsExtractor):
+    """gop.com：列表项为 div.c-blog-item，日期格式 "Sep 05, 2024"，正文在 div.c-blog-description"""
+
+    item_selector = "div.c-blog-item"
+    link_selector = "h5.c-blog-title a"
+    date_selector = "span.c-publish-date"
+    date_format = "%b %d, %Y"
+
+    def __init__(self):
+        super().__init__()
+        self._title = CSSSelector("div.c-title")
+        self._content = CSSSelector("div.c-blog-description")
+
+    def parse_article(self, news_link, html_bytes):
+        tree = self.parse_html(html_bytes)
+        titles = self._title(tree)
+        contents = self._content(tree)
+        title = _text(titles[0]) if titles else ""
+        content = _paragraphs(contents[0]) if contents else ""
+        return title, content
+
+
+class ArticleSelectors:
+    """按配置解析文章页：{"title": 标题选择器, "content": 正文选择器}；未配置正文选择器时交给 newspaper3k"""
+
+    def __init__(self, article=None):
+        article = article or {}
+        self.use_newspaper = "content" not in article
+        if not self.use_newspaper:
+            self._title = CSSSelector(article.get("title", "h1"))
+            self._content = CSSSelector(article["content"])
+
+    def parse(self, news_link, html_bytes):
+        if self.use_newspaper:
+            return _newspaper_article(news_link, html_bytes)
+        tree = NewsExtractor.parse_html(html_bytes)
+        titles = self._title(tree)
+        contents = self._content(tree)
+        title = _text(titles[0]) if titles else ""
+        content = _paragraphs(contents[0]) if contents else ""
+        return title, content
+
+
+class ConfiguredExtractor(NewsExtractor):
+    """由配置声明的 HTML 站点：listing 为 {"item", "link", "date", "date_format"}，article 见 ArticleSelectors"""
+
+    def __init__(self, listing, article=None):
+        self.item_selector = listing["item"]
+        self.link_selector = listing["link"]
+        self.date_selector = listing["date"]
+        self.date_format = listing["date_format"]
+        super().__init__()
+        self._article = ArticleSelectors(article)
+
+    def parse_article(self, news_link, html_bytes):
+        return self._article.parse(news_link, html_bytes)
+
+
+class RssExtractor(NewsExtractor):
+    """RSS 2.0 / Atom 订阅源：列表项为 item 或 entry，日期取 pubDate、published 或 updated；
+    未指定 date_format 时按 RFC 822（RSS）或 ISO 8601（Atom）解析"""
+
+    def __init__(self, article=None, date_format=None):
+        # 不使用 CSS 选择器，不调用 NewsExtractor.__init__
+        self.date_format = date_format
+        self._article = ArticleSelectors(article)
+
+    def parse_listing(self, xml_bytes):
+        if not xml_bytes.strip():
+            return []
+        parser = lxml.etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+        root = lxml.etree.fromstring(xml_bytes, parser=parser)
+        if root is None:
+            return []
+        items = []
+        for item in root.iter("item", f"{ATOM}entry"):
+            news_link = (item.findtext("link") or "").strip()
+            if not news_link:
+                atom_link = item.find(f"{ATOM}link")
+                news_link = atom_link.get("href") if atom_link is not None else None
+            date_str = next(
+                (text.strip() for text in (
+                    item.findtext("pubDate"), item.findtext(f"{ATOM}published"), item.findtext(f"{ATOM}updated")
+                ) if text),
+                None
+            )
+            news_date = self._parse_date(date_str) if date_str else None
+            items.append((news_link or None, news_date))
+        return items
+
+    def _parse_date(self, date_str):
+        if self.date_format:
+            return super()._parse_date(date_str)
+        try:
+            return email.utils.parsedate_to_datetime(date_str).strftime("%Y-%m-%d")
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.datetime.fromisoformat(date_str).strftime("%Y-%m-%d")
+        except ValueError:
+            logging.warning(f"Unrecognized date format: {date_str!r}")
+            return None
+
+    def parse_article(self, news_link, html_bytes):
+        return self._article.parse(news_link, html_bytes)
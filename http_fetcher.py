@@ -0,0 +1,94 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import registry
+
+
+class HttpFetcher:
+    """共享连接池的 HTTP 抓取器，按主机限制并发数；传入 CrawlScheduler 时还遵守其域名限速、重试和 robots.txt 规则"""
+
+    def __init__(self, config_manager, headers=None, metric_labels=None, scheduler=None):
+        crawler_config = config_manager.config.get("crawler", {})
+        self.max_per_host = crawler_config.get("max_concurrency_per_host", 4)
+        self.max_workers = crawler_config.get("max_workers", 8)
+        # 超时为 (连接超时, 读取超时)，单位秒
+        self.timeout = (
+            crawler_config.get("connect_timeout", 5),
+            crawler_config.get("read_timeout", 30)
+        )
+
+        # 同一个 Session 复用 keep-alive 连接，连接池大小与单主机并发上限一致
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.metric_labels = metric_labels or {}  # 附加到请求指标上的标签，如 {"party": "democrat"}
+        self.scheduler = scheduler
+        self._host_limits = {}
+        self._lock = threading.Lock()
+        logging.info(
+            f"HttpFetcher initialized: {self.max_per_host} per host, {self.max_workers} workers, timeout {self.timeout}"
+        )
+
+    def _host_semaphore(self, url):
+        """获取指定主机的并发信号量"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def get(self, url, headers=None):
+        """发起 GET 请求；有调度器时由调度器安排时机和重试，robots.txt 禁止时抛出 CrawlError"""
+        if self.scheduler is None:
+            return self._send(url, headers)
+        user_agent = (headers or {}).get("User-Agent") or self.session.headers.get("User-Agent", "*")
+        return self.scheduler.request(url, self._send, headers, user_agent)
+
+    def _send(self, url, headers=None):
+        """在主机并发限制内发出一次 GET 请求，记录状态码、下载字节数和耗时"""
+        host = urlsplit(url).netloc
+        with self._host_semaphore(url):
+            try:
+                with registry.timer("http_request_seconds", host=host, **self.metric_labels):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                registry.inc("http_requests_total", host=host, status="error", **self.metric_labels)
+                raise
+        registry.inc("http_requests_total", host=host, status=response.status_code, **self.metric_labels)
+        registry.inc("http_response_bytes_total", len(response.content), host=host, **self.metric_labels)
+        return response
+
+    def map(self, func, items):
+        """并发执行 func(item)，结果按输入顺序返回"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def imap_unordered(self, func, items):
+        """并发执行 func(item)，按完成顺序逐个产出结果"""
+        items = list(items)
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # 调用方提前停止迭代时取消尚未开始的任务，只等待正在进行的请求
+                for future in futures:
+                    future.cancel()
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,140 @@
+import collections
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """后台任务：记录状态（queued/running/done/failed）和最新进度，供界面轮询或订阅"""
+
+    def __init__(self, job_id, key, claims=None):
+        self.id = job_id
+        self.key = key
+        self.claims = list(claims or [key])  # 任务占用的全部 key（含 key 本身），运行结束时一并释放
+        self.status = "queued"
+        self.progress = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0  # 每次状态或进度变化加一，订阅方据此判断是否有更新
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def _update(self, **fields):
+        with self._cond:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait_update(self, version, timeout=None):
+        """阻塞到任务版本号大于 version 或任务结束，返回当前版本号"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version or self.finished, timeout)
+            return self.version
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "id": self.id,
+                "key": self.key,
+                "status": self.status,
+                "progress": self.progress,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobQueue:
+    """进程内任务队列：线程池执行任务，相同 key（如 (party, date)）的未完成任务只运行一次"""
+
+    def __init__(self, config_manager):
+        job_config = config_manager.config.get("job_queue", {})
+        self.history = job_config.get("history", 100)
+        self._executor = ThreadPoolExecutor(max_workers=job_config.get("workers", 2), thread_name_prefix="job")
+        self._jobs = collections.OrderedDict()  # job_id -> Job，保留最近的任务供查询
+        self._active = {}  # key（含额外占用的 key）-> 未完成的 Job
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, *args, claims=None):
+        """提交任务并返回 Job；同 key 的任务仍在排队或运行时直接返回已有任务。
+        claims 为任务额外占用的 key（如两党合并任务同时占用两党的 (party, date)），其中任一 key 上已有未完成任务时返回该任务。
+        func 返回迭代器时逐项作为进度，最后一项即结果；否则返回值即结果"""
+        claims = [key] + [claim for claim in claims or () if claim != key]
+        with self._lock:
+            for claim in claims:
+                job = self._active.get(claim)
+                if job is not None:
+                    logging.info(f"Job {job.id} for {job.key} already {job.status}, reusing it for {key}")
+                    return job
+            job = Job(uuid.uuid4().hex[:12], key, claims)
+            self._jobs[job.id] = job
+            for claim in claims:
+                self._active[claim] = job
+            self._trim_history()
+        logging.info(f"Job {job.id} queued for {key}")
+        self._executor.submit(self._run, job, func, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def watch(self, job_id, poll_interval=1.0):
+        """订阅任务进度：每次有更新时产出一次快照，任务结束后停止"""
+        job = self.get(job_id)
+        if job is None:
+            return
+        version = -1
+        while True:
+            version = job.wait_update(version, poll_interval)
+            snapshot = job.snapshot()
+            yield snapshot
+            if snapshot["status"] in ("done", "failed"):
+                return
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, func, args):
+        job._update(status="running", started_at=time.time())
+        logging.info(f"Job {job.id} started for {job.key}")
+        final = {"status": "done"}
+        try:
+            result = func(*args)
+            if isinstance(result, Iterator):
+                for progress in result:
+                    job._update(progress=progress)
+                result = job.progress
+            else:
+                final["progress"] = "" if result is None else str(result)
+            final["result"] = result
+            logging.info(f"Job {job.id} finished for {job.key}")
+        except Exception as e:
+            logging.error(f"Job {job.id} failed for {job.key}: {e}")
+            final = {"status": "failed", "error": str(e)}
+        finally:
+            # 先移出活动表再标记结束，保证看到任务结束后再提交的同 key 任务会重新运行
+            with self._lock:
+                for claim in job.claims:
+                    if self._active.get(claim) is job:
+                        del self._active[claim]
+            job._update(finished_at=time.time(), **final)
+
+    def _trim_history(self):
+        """只保留最近 history 个任务，未完成的任务不会被移除"""
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
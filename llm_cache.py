@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+class ResponseCache:
+    """以 (模型, system prompt, 内容) 哈希为键的磁盘响应缓存，支持按容量和时间淘汰"""
+
+    def __init__(self, config_manager):
+        cache_config = config_manager.config.get("llm_cache", {})
+        self.enabled = cache_config.get("enabled", True)
+        self.cache_dir = cache_config.get("dir", "data/cache/llm")
+        self.max_entries = cache_config.get("max_entries", 5000)
+        self.max_bytes = cache_config.get("max_mb", 200) * 1024 * 1024
+        self.max_age = cache_config.get("max_age_days", 30) * 86400
+        self.evict_interval = cache_config.get("evict_interval", 50)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.evict()
+        logging.info(f"ResponseCache initialized at {self.cache_dir}, enabled={self.enabled}")
+
+    @staticmethod
+    def make_key(model, prompt, content):
+        """根据模型、system prompt 和内容计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (model, prompt, content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")  # 分隔符，避免不同拼接产生相同哈希
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """读取缓存，过期或不存在时返回 None"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r") as f:
+                response = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def set(self, key, model, response):
+        """写入缓存，先写临时文件再原子替换；每写入 evict_interval 次扫描淘汰一次"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": model, "created_at": time.time(), "response": response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_interval == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目；超出条目数或容量上限时按最旧优先删除"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    os.remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                total_bytes -= size
+                os.remove(path)
+                logging.debug(f"Evicted cached response {path}")
+
+    def stats(self):
+        """返回命中/未命中计数和命中率"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
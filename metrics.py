@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def _series_name(name, label_key):
+    if not label_key:
+        return name
+    escaped = (
+        (label, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for label, value in label_key
+    )
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    """进程内指标：计数器（如请求数、字节数、token 数）和耗时汇总（次数与总秒数），可导出为 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._counters = {}  # (name, labels) -> 累计值
+        self._summaries = {}  # (name, labels) -> [次数, 总和]
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    def total(self, name, **match):
+        """计数器 name 在所有包含给定标签值的序列上的累计值之和"""
+        wanted = set(_label_key(match))
+        with self._lock:
+            return sum(
+                value for (series, labels), value in self._counters.items()
+                if series == name and wanted <= set(labels)
+            )
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """记录代码块耗时（秒），异常退出时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self, **match):
+        """返回指标快照；传入标签时只保留包含这些标签值的序列，用于按党派生成单次运行的汇总"""
+        wanted = set(_label_key(match))
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = {key: list(value) for key, value in self._summaries.items()}
+        return {
+            "counters": {
+                _series_name(name, labels): value
+                for (name, labels), value in sorted(counters.items()) if wanted <= set(labels)
+            },
+            "summaries": {
+                _series_name(name, labels): {"count": count, "sum": total}
+                for (name, labels), (count, total) in sorted(summaries.items()) if wanted <= set(labels)
+            },
+        }
+
+    def render_prometheus(self):
+        """按 Prometheus 文本格式导出全部指标"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{_series_name(name, labels)} {value}")
+        for (name, labels), (count, total) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            lines.append(f"{_series_name(name + '_count', labels)} {count}")
+            lines.append(f"{_series_name(name + '_sum', labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def diff(before, after):
+    """两个快照之差，即这段时间内新增的计数和耗时"""
+    counters = {}
+    for series, value in after["counters"].items():
+        delta = value - before["counters"].get(series, 0)
+        if delta:
+            counters[series] = delta
+    summaries = {}
+    for series, value in after["summaries"].items():
+        previous = before["summaries"].get(series, {"count": 0, "sum": 0.0})
+        count = value["count"] - previous["count"]
+        if count:
+            summaries[series] = {"count": count, "sum": value["sum"] - previous["sum"]}
+    return {"counters": counters, "summaries": summaries}
+
+
+# 全进程共享的指标注册表
+registry = MetricsRegistry()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """在后台线程中提供 /metrics（Prometheus 文本格式）接口，返回 HTTP 服务对象"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logging.info(f"Metrics endpoint listening on http://{host}:{server.server_port}/metrics")
+    return server
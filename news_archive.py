@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# SQLite 单条语句的参数个数有上限，批量查询时分批
+_QUERY_BATCH = 500
+
+
+def markdown_file_name(news_date, title, url):
+    """新闻的 Markdown 文件名：日期_标题_链接摘要.md；标题中的路径分隔符等字符替换为下划线，
+    末尾的链接摘要避免同一天标题相同的新闻互相覆盖"""
+    slug = re.sub(r'[\s\\/:*?"<>|]+', "_", title).strip("_")[:120]
+    url_digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return f"{news_date}_{slug}_{url_digest}.md"
+
+
+def render_markdown(title, body):
+    """与原 Markdown 文件相同的正文格式"""
+    return f"# {title}\n\n{body}"
+
+
+class NewsArchive:
+    """只追加的新闻存档（SQLite），按党派和日期建索引；同一链接内容变化时追加新版本，读取时取最新版本"""
+
+    def __init__(self, db_path="data/news_archive.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    party TEXT NOT NULL,
+                    news_date TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    md_path TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    UNIQUE (url, content_hash)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_archive_party_date ON articles (party, news_date)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_md_path ON articles (md_path)")
+        logging.info(f"NewsArchive opened at {db_path}")
+
+    def append(self, url, party, news_date, title, body, digest, md_path):
+        """追加一篇新闻；同一链接的相同内容已存在时忽略"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO articles "
+                "(url, party, news_date, title, body, content_hash, md_path, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, party, news_date, title, body, digest, md_path, time.time())
+            )
+
+    def has_path(self, md_path):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM articles WHERE md_path = ? LIMIT 1", (md_path,)).fetchone()
+        return row is not None
+
+    def read_paths(self, md_paths):
+        """按 Markdown 路径批量读取新闻，返回 {路径: Markdown 内容}，不在存档中的路径不出现在结果里"""
+        md_paths = list(dict.fromkeys(md_paths))
+        contents = {}
+        for start in range(0, len(md_paths), _QUERY_BATCH):
+            batch = md_paths[start:start + _QUERY_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT md_path, title, body FROM articles WHERE id IN ("
+                    f"SELECT MAX(id) FROM articles WHERE md_path IN ({placeholders}) GROUP BY md_path)",
+                    batch
+                ).fetchall()
+            for md_path, title, body in rows:
+                contents[md_path] = render_markdown(title, body)
+        return contents
+
+    def export_markdown(self, party, start_date, end_date, news_dir=None):
+        """兼容导出：把日期范围内（含边界）的新闻写成原有的 data/news/<party>/ Markdown 文件，返回导出篇数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT md_path, title, body FROM articles WHERE id IN ("
+                "SELECT MAX(id) FROM articles WHERE party = ? AND news_date BETWEEN ? AND ? GROUP BY url)",
+                (party, start_date, end_date)
+            ).fetchall()
+        for md_path, title, body in rows:
+            if news_dir:
+                md_path = os.path.join(news_dir, os.path.basename(md_path))
+            os.makedirs(os.path.dirname(md_path) or ".", exist_ok=True)
+            with open(md_path, "w") as f:
+                f.write(render_markdown(title, body))
+        logging.info(f"Exported {len(rows)} {party} news files for {start_date}..{end_date}")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    # 把存档中的新闻导出为 Markdown 文件
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export archived news to the data/news Markdown layout")
+    parser.add_argument("--party", choices=["democrat", "republican"], required=True)
+    parser.add_argument("--start", required=True, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="last day, YYYY-MM-DD")
+    parser.add_argument("--db", default="data/news_archive.db")
+    parser.add_argument("--out", help="output directory (default: the original data/news/<party> paths)")
+    args = parser.parse_args()
+
+    archive = NewsArchive(args.db)
+    print(f"Exported {archive.export_markdown(args.party, args.start, args.end, args.out)} files")
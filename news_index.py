@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+def content_hash(text):
+    """计算正文内容的 SHA-256 摘要"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# 索引记录的状态：列表页发现即登记为 pending，抓取保存成功为 fetched，抓取失败为 failed
+PENDING = "pending"
+FETCHED = "fetched"
+FAILED = "failed"
+
+
+class NewsIndex:
+    """以文章 URL 为键的持久化索引，记录抓取状态、内容摘要、缓存校验头和 Markdown 路径"""
+
+    def __init__(self, db_path="data/news_index.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 爬虫在线程池中并发读写，使用同一连接并通过锁串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    url TEXT PRIMARY KEY,
+                    party TEXT NOT NULL,
+                    news_date TEXT NOT NULL,
+                    title TEXT,
+                    content_hash TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    md_path TEXT,
+                    fetched_at REAL,
+                    status TEXT NOT NULL DEFAULT 'fetched',
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # 旧版索引没有状态列，已有记录都是抓取成功的文章
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+            if "status" not in columns:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN status TEXT NOT NULL DEFAULT 'fetched'")
+            if "attempts" not in columns:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_articles_party_date ON articles (party, news_date)"
+            )
+        logging.info(f"NewsIndex opened at {db_path}")
+
+    def get(self, url):
+        """按 URL 查询索引记录，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, party, news_date, title, content_hash, etag, last_modified, md_path, status, attempts "
+                "FROM articles WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = (
+            "url", "party", "news_date", "title", "content_hash", "etag", "last_modified", "md_path",
+            "status", "attempts"
+        )
+        return dict(zip(keys, row))
+
+    def is_fetched(self, url):
+        """文章是否已成功抓取保存（pending、failed 的记录不算）"""
+        record = self.get(url)
+        return record is not None and record["status"] == FETCHED
+
+    def add_pending(self, party, items):
+        """登记列表页发现的 [(链接, 日期)]，状态为 pending；已有的记录保持不变"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO articles (url, party, news_date, fetched_at, status) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO NOTHING",
+                [(url, party, news_date, time.time(), PENDING) for url, news_date in items]
+            )
+
+    def mark_failed(self, url):
+        """记录一次抓取失败；已成功抓取过的文章（如条件请求出错）保持 fetched"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE articles SET status = ?, attempts = attempts + 1 WHERE url = ? AND status != ?",
+                (FAILED, url, FETCHED)
+            )
+
+    def urls_for_date(self, party, news_date, max_attempts=None):
+        """获取指定党派某一天已索引的文章 URL，按抓取顺序排列；给出 max_attempts 时不含已失败这么多次的文章"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM articles WHERE party = ? AND news_date = ? AND (status = ? OR attempts < ?) "
+                "ORDER BY fetched_at",
+                (party, news_date, FETCHED, max_attempts if max_attempts is not None else float("inf"))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def record(self, url, party, news_date, title, digest, etag, last_modified, md_path):
+        """记录一篇抓取保存成功的文章（新增或更新，状态置为 fetched）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO articles "
+                "(url, party, news_date, title, content_hash, etag, last_modified, md_path, fetched_at, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET "
+                "title = excluded.title, content_hash = excluded.content_hash, etag = excluded.etag, "
+                "last_modified = excluded.last_modified, md_path = excluded.md_path, status = excluded.status",
+                (url, party, news_date, title, digest, etag, last_modified, md_path, time.time(), FETCHED)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,98 @@
+import logging
+from urllib.parse import urlsplit
+
+from html_extract import ConfiguredExtractor, DemocratExtractor, RepublicanExtractor, RssExtractor
+
+# 内置站点解析器，来源配置中以 "extractor" 引用
+BUILTIN_EXTRACTORS = {
+    "democrat": DemocratExtractor,
+    "republican": RepublicanExtractor,
+}
+
+# 模拟浏览器请求头，gop.com 会拒绝默认的 requests User-Agent
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class NewsSource:
+    """一个新闻来源：列表页地址、解析规则和分页规则。
+
+    url 中的 {} 为页码占位符；没有占位符的来源（如 RSS 订阅源）只有一页。
+    pagination 为 {"start": 起始页码, "max_pages": 最多遍历的页数}。
+    """
+
+    def __init__(self, name, party, url, extractor, headers=None, start_page=1, max_pages=50):
+        self.name = name
+        self.party = party
+        self.url = url
+        self.extractor = extractor
+        self.headers = headers or {}
+        self.start_page = start_page
+        self.max_pages = max_pages
+        self.paginated = "{}" in url
+        self.host = urlsplit(url).netloc
+
+    def page_url(self, page):
+        return self.url.format(page) if self.paginated else self.url
+
+    def __repr__(self):
+        return f"NewsSource({self.name!r}, party={self.party!r}, url={self.url!r})"
+
+
+def build_source(config):
+    """按一条来源配置构造 NewsSource，缺少必填字段时抛出 ValueError"""
+    name = config.get("name") or config.get("url")
+    for field in ("party", "url"):
+        if not config.get(field):
+            raise ValueError(f"News source {name!r} is missing {field!r}")
+
+    kind = config.get("type", "html")
+    if "extractor" in config:
+        if config["extractor"] not in BUILTIN_EXTRACTORS:
+            raise ValueError(f"News source {name!r} uses unknown extractor {config['extractor']!r}")
+        extractor = BUILTIN_EXTRACTORS[config["extractor"]]()
+    elif kind == "rss":
+        extractor = RssExtractor(config.get("article"), config.get("listing", {}).get("date_format"))
+    elif kind == "html":
+        listing = config.get("listing", {})
+        missing = [key for key in ("item", "link", "date", "date_format") if not listing.get(key)]
+        if missing:
+            raise ValueError(f"News source {name!r} listing is missing {missing}")
+        extractor = ConfiguredExtractor(listing, config.get("article"))
+    else:
+        raise ValueError(f"News source {name!r} has unknown type {kind!r}")
+
+    pagination = config.get("pagination", {})
+    return NewsSource(
+        name, config["party"], config["url"], extractor,
+        headers=config.get("headers"),
+        start_page=pagination.get("start", 1),
+        max_pages=pagination.get("max_pages", 50)
+    )
+
+
+class SourceRegistry:
+    """从配置的 sources 列表加载全部新闻来源；未配置 sources 时按 urls 使用两党官网的内置解析器"""
+
+    def __init__(self, config_manager):
+        configs = config_manager.config.get("sources")
+        if configs is None:
+            configs = [
+                {
+                    "name": party, "party": party, "url": url, "extractor": party,
+                    "headers": BROWSER_HEADERS if party == "republican" else None
+                }
+                for party, url in config_manager.config.get("urls", {}).items()
+                if party in BUILTIN_EXTRACTORS
+            ]
+        self.sources = [build_source(config) for config in configs if config.get("enabled", True)]
+
+        names = [source.name for source in self.sources]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Duplicate news source names: {sorted(duplicates)}")
+        logging.info(f"Loaded {len(self.sources)} news sources: {names}")
+
+    def for_party(self, party):
+        return [source for source in self.sources if source.party == party]
@@ -0,0 +1,343 @@
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from metrics import registry
+from report_generation import SectionSpool
+
+# 爬虫线程结束时放入队列的哨兵
+_CRAWL_DONE = object()
+
+
+class StageTimer:
+    """记录流水线各阶段的起止时间，结束时同时计入 pipeline_stage_seconds 指标"""
+
+    def __init__(self, party=None):
+        self.party = party
+        self.started = {}
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def start(self, stage):
+        with self._lock:
+            self.started.setdefault(stage, time.monotonic())
+
+    def stop(self, stage):
+        with self._lock:
+            if stage not in self.started or stage in self.durations:
+                return
+            self.durations[stage] = time.monotonic() - self.started[stage]
+        registry.observe("pipeline_stage_seconds", self.durations[stage], party=self.party, stage=stage)
+
+    def summary(self):
+        return ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in self.durations.items())
+
+
+class RunRecorder:
+    """单次党派运行的指标汇总：开始时记录快照，结束后把增量写成报告旁的 <date>.metrics.json"""
+
+    # 汇总中单独列出的关键计数：(名称, 指标, 标签)
+    TOTALS = (
+        ("estimated_prompt_tokens", "openai_estimated_prompt_tokens_total", {}),
+        ("prompt_tokens", "openai_tokens_total", {"kind": "prompt"}),
+        ("cached_prompt_tokens", "openai_tokens_total", {"kind": "cached_prompt"}),
+        ("completion_tokens", "openai_tokens_total", {"kind": "completion"}),
+        ("openai_requests", "openai_requests_total", {"outcome": "ok"}),
+        ("cache_hits", "llm_cache_lookups_total", {"result": "hit"}),
+        ("cache_misses", "llm_cache_lookups_total", {"result": "miss"}),
+        ("http_bytes", "http_response_bytes_total", {}),
+        ("dedup_tokens_saved", "dedup_tokens_saved_total", {}),
+    )
+
+    def __init__(self, party, timer):
+        self.party = party
+        self.timer = timer
+        self.started_at = time.time()
+        self._snapshot = registry.snapshot(party=party)
+        self._totals = self._read_totals()
+
+    def _read_totals(self):
+        return {
+            key: registry.total(name, party=self.party, **labels) for key, name, labels in self.TOTALS
+        }
+
+    def summary(self, report_file=None):
+        totals = self._read_totals()
+        totals = {key: value - self._totals[key] for key, value in totals.items()}
+        lookups = totals["cache_hits"] + totals["cache_misses"]
+        totals["cache_hit_rate"] = totals["cache_hits"] / lookups if lookups else 0.0
+        return {
+            "party": self.party,
+            "report": report_file,
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "stages": dict(self.timer.durations),
+            "totals": totals,
+            "metrics": metrics.diff(self._snapshot, registry.snapshot(party=self.party)),
+        }
+
+    def write(self, report_file):
+        """把本次运行的指标汇总写到报告旁，返回汇总文件路径；失败时只记录日志"""
+        summary_file = os.path.splitext(report_file)[0] + ".metrics.json"
+        summary = self.summary(report_file)
+        totals = summary["totals"]
+        logging.info(
+            f"Token usage for {self.party} report: estimated prompt {totals['estimated_prompt_tokens']}, "
+            f"actual prompt {totals['prompt_tokens']} (cached {totals['cached_prompt_tokens']}), "
+            f"completion {totals['completion_tokens']}"
+        )
+        try:
+            with open(summary_file, "w") as f:
+                json.dump(summary, f, indent=2)
+        except Exception as e:
+            logging.error(f"Error writing run summary: {e}")
+            return None
+        logging.info(f"Run summary written to {summary_file}")
+        return summary_file
+
+
+class PipelineRunner:
+    """并行运行两党流水线；map_reduce 模式下爬取与分析通过有界队列重叠执行"""
+
+    def __init__(self, config_manager, crawlers, report_gens, email_notifier):
+        self.crawlers = crawlers
+        self.report_gens = report_gens
+        self.email_notifier = email_notifier
+        pipeline_config = config_manager.config.get("pipeline", {})
+        self.queue_size = pipeline_config.get("queue_size", 16)
+        self.analysis_workers = pipeline_config.get("analysis_workers", 4)
+
+    def run_all(self, parties=("democrat", "republican")):
+        """同时运行多个党派的流水线，返回 {party: 结果信息}；各党派报告生成后在同一个 SMTP 连接内统一发送，
+        配置了摘要邮件时合并为一封"""
+        with ThreadPoolExecutor(max_workers=len(parties)) as executor:
+            futures = {
+                party: executor.submit(self._run_party, party, False) for party in parties
+            }
+            results = {party: future.result() for party, future in futures.items()}
+
+        report_files = [report_file for _, report_file in results.values() if report_file]
+        if not report_files:
+            return {party: message for party, (message, _) in results.items()}
+
+        if self.email_notifier.digest:
+            email_result = self.email_notifier.send_digest(report_files)
+        else:
+            email_result = self.email_notifier.send_batch(report_files)
+        if email_result:
+            logging.error(f"Error in sending email: {email_result}")
+            return {party: message for party, (message, _) in results.items()}
+
+        logging.info(f"Email sent successfully for {len(report_files)} reports.")
+        return {
+            party: f"{party.capitalize()} report generated and emailed." if report_file else message
+            for party, (message, report_file) in results.items()
+        }
+
+    def run_party(self, party):
+        """运行单个党派的 抓取 → 分析 → 报告 → 邮件 流程"""
+        message, _ = self._run_party(party, send_email=True)
+        return message
+
+    def _run_party(self, party, send_email):
+        """运行单个党派流程，返回 (结果信息, 报告路径)；send_email=False 时由调用方统一发送邮件"""
+        logging.info(f"Starting {party.capitalize()} data acquisition job.")
+        timer = StageTimer(party)
+        timer.start("total")
+        recorder = RunRecorder(party, timer)
+        report_file = None
+        try:
+            report_gen = self.report_gens[party]
+            # 日期在每次运行开始时确定，跨午夜的运行仍使用同一天
+            news_date = datetime.date.today().strftime("%Y-%m-%d")
+            if report_gen.mode == "map_reduce":
+                news, report_file = self._run_streaming(party, report_gen, timer, news_date)
+            else:
+                news, report_file = self._run_sequential(party, report_gen, timer, news_date)
+
+            if not news:
+                logging.info(f"No news available for {party.capitalize()} today.")
+                return f"No news available for {party.capitalize()} today.", None
+            if not os.path.isfile(report_file):
+                # ReportGenerator 出错时返回错误信息而不是文件路径
+                return f"Error during job execution for {party.capitalize()}: {report_file}", None
+            logging.info(f"Report generated for {party.capitalize()}: {report_file}")
+            if not send_email:
+                return f"{party.capitalize()} report generated.", report_file
+
+            # 发送报告邮件
+            timer.start("email")
+            email_result = self.email_notifier.send(report_file)
+            timer.stop("email")
+            if email_result:
+                logging.error(f"Error in sending email: {email_result}")
+            else:
+                logging.info(f"Email sent successfully for {party.capitalize()}.")
+
+            return f"{party.capitalize()} report generated and emailed.", report_file
+
+        except Exception as e:
+            logging.error(f"Error during job execution for {party.capitalize()}: {e}")
+            return f"Error during job execution for {party.capitalize()}: {e}", None
+        finally:
+            timer.stop("total")
+            logging.info(f"Pipeline timings for {party}: {timer.summary()}")
+            if report_file and os.path.isfile(report_file):
+                recorder.write(report_file)
+
+    def run_party_stream(self, party):
+        """流式运行单个党派流程，逐步产出供界面展示的 Markdown（抓取进度和逐 token 生成的报告）"""
+        name = party.capitalize()
+        logging.info(f"Starting {name} streaming job.")
+        timer = StageTimer(party)
+        timer.start("total")
+        recorder = RunRecorder(party, timer)
+        report_file = None
+        try:
+            news_date = datetime.date.today().strftime("%Y-%m-%d")
+            yield f"_Fetching {name} news..._"
+            timer.start("crawl")
+            news = []
+            for md_file in self.crawlers[party].iter_news(news_date):
+                news.append(md_file)
+                yield f"_Fetched {len(news)} {name} news articles..._"
+            timer.stop("crawl")
+
+            if not news:
+                logging.info(f"No news available for {name} today.")
+                yield f"No news available for {name} today."
+                return
+
+            timer.start("analysis")
+            report_content, report_file = "", None
+            for report_content, report_file in self.report_gens[party].generate_stream(news, news_date):
+                yield report_content
+            timer.stop("analysis")
+            if not (report_file and os.path.isfile(report_file)):
+                yield f"Error during job execution for {name}: {report_file}"
+                return
+            logging.info(f"Report generated for {name}: {report_file}")
+
+            timer.start("email")
+            email_result = self.email_notifier.send(report_file)
+            timer.stop("email")
+            if email_result:
+                logging.error(f"Error in sending email: {email_result}")
+                yield f"{report_content}\n\n---\n_{email_result}_"
+            else:
+                logging.info(f"Email sent successfully for {name}.")
+
+        except Exception as e:
+            logging.error(f"Error during job execution for {name}: {e}")
+            yield f"Error during job execution for {name}: {e}"
+        finally:
+            timer.stop("total")
+            logging.info(f"Pipeline timings for {party}: {timer.summary()}")
+            if report_file and os.path.isfile(report_file):
+                recorder.write(report_file)
+
+    def _run_sequential(self, party, report_gen, timer, news_date):
+        """先抓取全部新闻，再一次性生成报告"""
+        timer.start("crawl")
+        news = self.crawlers[party].fetch_news(news_date)
+        timer.stop("crawl")
+        if not news:
+            return news, None
+
+        timer.start("analysis")
+        report_file = report_gen.generate(news, news_date)
+        timer.stop("analysis")
+        return news, report_file
+
+    def _run_streaming(self, party, report_gen, timer, news_date):
+        """爬虫线程把新闻放入有界队列，分析线程池边取边分析，最后统一汇总"""
+        prompt = report_gen.load_prompt()
+        news_queue = queue.Queue(maxsize=self.queue_size)
+        crawl_errors = []
+        stop = threading.Event()  # 分析出错时通知爬虫线程停止，避免其阻塞在已满的队列上
+
+        def put(item):
+            """放入队列，队列已满时等待；收到停止通知时放弃并返回 False"""
+            while not stop.is_set():
+                try:
+                    news_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def crawl():
+            timer.start("crawl")
+            news_iter = self.crawlers[party].iter_news(news_date)
+            try:
+                for md_file in news_iter:
+                    if not put(md_file):
+                        break
+            except Exception as e:
+                crawl_errors.append(e)
+            finally:
+                try:
+                    news_iter.close()  # 提前停止时立即结束抓取并释放抓取线程池
+                finally:
+                    timer.stop("crawl")
+                    put(_CRAWL_DONE)
+
+        crawler_thread = threading.Thread(target=crawl, name=f"crawl-{party}", daemon=True)
+        crawler_thread.start()
+
+        news = []
+
+        def crawled():
+            """逐篇取出爬虫放入队列的新闻，作为 map 阶段的输入"""
+            while True:
+                md_file = news_queue.get()
+                if md_file is _CRAWL_DONE:
+                    return
+                timer.start("map")
+                news.append(md_file)
+                yield md_file
+
+        try:
+            duplicates, analysed = [], []
+            fingerprints = report_gen.begin_dedup()  # 报告保存成功后才提交，失败的运行不会把新闻登记为已分析
+            with SectionSpool(report_gen.analyzer.model) as spool:
+                # 与 ReportGenerator.generate 共用 map 阶段：近似重复过滤、有界在途窗口、摘要按序写入临时文件
+                for _ in report_gen._map_sections(
+                    prompt, crawled(), duplicates, analysed, spool, fingerprints,
+                    max_concurrency=self.analysis_workers, batch_size=1
+                ):
+                    pass
+                timer.stop("map")
+                crawler_thread.join()
+
+                if crawl_errors:
+                    raise crawl_errors[0]
+                if not news:
+                    return news, None
+                if not analysed:
+                    # 全部为近似重复时报告只列出重复项；全部读取失败时抛出 AnalysisError
+                    report_gen._no_news_to_analyse(duplicates)
+                    return news, report_gen.save_report(report_gen.all_duplicates_note(), duplicates, news_date, fingerprints)
+
+                timer.start("reduce")
+                analysis = report_gen.reduce_sections(spool)
+                timer.stop("reduce")
+            report_file = report_gen.save_report(analysis, duplicates, news_date, fingerprints)
+            if os.path.isfile(report_file):
+                report_gen.update_article_store(analysed, news_date)
+            return news, report_file
+        finally:
+            # 正常结束时爬虫线程已退出；出错时通知其停止并清空队列，确保线程和抓取线程池不会泄漏
+            stop.set()
+            while True:
+                try:
+                    news_queue.get_nowait()
+                except queue.Empty:
+                    break
+            crawler_thread.join()
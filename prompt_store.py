@@ -0,0 +1,29 @@
+import logging
+import os
+import threading
+
+
+class PromptStore:
+    """按路径缓存 prompt 文件内容，只在文件修改时间变化时重新读取"""
+
+    def __init__(self):
+        self._cache = {}  # path -> (mtime_ns, 内容)
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r") as f:
+            prompt = f.read().strip()
+        with self._lock:
+            self._cache[path] = (mtime, prompt)
+        logging.info(f"Prompt loaded successfully from {path}")
+        return prompt
+
+
+# 进程内共享，所有报告生成器复用同一份已加载的 prompt
+prompt_store = PromptStore()
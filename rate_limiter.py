@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+class TokenBucket:
+    """按分钟速率补充的令牌桶；预留式扣减，返回需要等待的秒数，同步和异步调用方共用"""
+
+    def __init__(self, rate_per_minute, clock=time.monotonic):
+        self.capacity = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """扣除 amount 个令牌（允许透支），返回调用方应等待的秒数"""
+        amount = min(float(amount), self.capacity)  # 单次请求超过桶容量时按满桶处理，避免永远等待
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+            self.updated_at = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.fill_rate
+
+
+class RateLimitScheduler:
+    """同时遵守每分钟请求数 (RPM) 和每分钟 token 数 (TPM) 的调度器"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute, clock=time.monotonic):
+        self.request_bucket = TokenBucket(requests_per_minute, clock)
+        self.token_bucket = TokenBucket(tokens_per_minute, clock)
+        self.clock = clock
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(tokens))
+        with self._lock:
+            pause = self._paused_until - self.clock()
+        return max(wait, pause, 0.0)
+
+    def pause(self, seconds):
+        """收到 429 等限流响应时暂停所有后续请求一段时间"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+        logging.warning(f"Rate limited, pausing requests for {seconds:.1f}s")
+
+    def acquire(self, tokens):
+        """同步获取发送一次请求的配额，必要时阻塞等待"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            logging.debug(f"Rate limiter waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        """异步获取发送一次请求的配额，等待期间不阻塞事件循环"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            logging.debug(f"Rate limiter waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
@@ -1,54 +1,185 @@
 # Description: 生成报告的主要逻辑
 import os
+import json
 import logging
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
-from ai_analysis import AINewsAnalyzer
+from itertools import islice
+from ai_analysis import AINewsAnalyzer, AnalysisError
+from article_analysis import ArticleAnalysisStore, parse_structured
+from dedup import NearDuplicateIndex
+from metrics import registry
+from news_archive import NewsArchive
+from news_index import content_hash
+from prompt_store import prompt_store
+from search_index import SearchIndex
+from token_counter import count_message_tokens, count_tokens, split_by_tokens, token_limits, truncate_to_tokens
+
+class SectionSpool:
+    """map 阶段的摘要段落按输入顺序写入临时文件，内存中只保留各段的 token 数；reduce 阶段再逐段读回"""
+
+    def __init__(self, model):
+        self.model = model
+        self.tokens = []  # 每段摘要的 token 数，reduce 阶段据此分组
+        self._file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self._waiting = {}  # 先完成、尚未轮到写入的 {序号: 段落列表}
+        self._next = 0
+
+    def put(self, index, sections):
+        """登记第 index 篇新闻的摘要段落；按序号顺序写入，保证汇总顺序（及缓存键）与完成顺序无关"""
+        self._waiting[index] = sections
+        while self._next in self._waiting:
+            for section in self._waiting.pop(self._next):
+                self._file.write(json.dumps(section, ensure_ascii=False) + "\n")
+                self.tokens.append(count_tokens(section, self.model))
+            self._next += 1
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __iter__(self):
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 class ReportGenerator:
-    def __init__(self, config_manager, party):
-        self.analyzer = AINewsAnalyzer(config_manager)
+    def __init__(self, config_manager, party, analyzer=None):
+        # 传入 analyzer 时与其他组件共享同一个 OpenAI 客户端和限流器
+        self.analyzer = analyzer or AINewsAnalyzer(config_manager)
         self.party = party  # 存储党派信息
+        self.metric_labels = {"party": party}  # AI 调用指标按党派区分
         self.report_dir = f"data/reports/{self.party}"
         os.makedirs(self.report_dir, exist_ok=True)  # 创建党派对应的报告目录
 
-    def generate(self, news_files):
-        """读取所有新闻文件，调用 AI 分析，综合生成报告"""
-        report_content = ""
-        today_str = datetime.today().strftime('%Y-%m-%d')
+        # 分析模式："single" 为所有新闻合并后一次分析，"map_reduce" 为逐篇分析后再汇总
+        analysis_config = config_manager.config.get("analysis", {})
+        self.mode = analysis_config.get("mode", "single")
+        self.max_concurrency = analysis_config.get("max_concurrency", 4)
+        self.max_request_tokens = analysis_config.get("max_request_tokens", 6000)
+        self.read_batch_size = analysis_config.get("read_batch_size", 50)  # 每次从存档读取的新闻篇数
+        self.prompt_file = analysis_config.get("prompt_file", "prompt/openai_prompt.txt")
+        self.reduce_prompt_file = analysis_config.get("reduce_prompt_file", "prompt/reduce_prompt.txt")
+        self.search_index = SearchIndex(config_manager.config.get("search_index_path", "data/search_index.db"))
+        self.archive = NewsArchive(config_manager.config.get("archive", {}).get("path", "data/news_archive.db"))
+
+        # 近似重复过滤：与已分析过的新闻稿（含往日）高度相似的文件不再发送给模型
+        dedup_config = config_manager.config.get("dedup", {})
+        self.dedup = None
+        if dedup_config.get("enabled", True):
+            self.dedup = NearDuplicateIndex(
+                dedup_config.get("db_path", "data/fingerprints.db"), dedup_config.get("max_distance", 3)
+            )
 
+        # 逐篇结构化分析（议题、姿态、涉华程度）及其日/周/月汇总，供趋势报告使用
+        structured_config = config_manager.config.get("structured_analysis", {})
+        self.structured_prompt_file = structured_config.get("prompt_file", "prompt/structured_prompt.txt")
+        self.article_store = None
+        if structured_config.get("enabled", False):
+            self.article_store = ArticleAnalysisStore(structured_config.get("db_path", "data/article_analysis.db"))
+
+    def generate(self, news_files, report_date=None):
+        """按批次读取新闻文件，调用 AI 分析，综合生成指定日期（默认当天，YYYY-MM-DD）的报告；
+        新闻逐批读取、逐篇处理，内存占用不随新闻篇数增长"""
+        report_date = report_date or self._today()
         # 读取 prompt 内容
         try:
-            with open("prompt/openai_prompt.txt", 'r') as f:
-                prompt = f.read().strip()
-                logging.info("Prompt loaded successfully from /prompt/openai_prompt.txt")
+            prompt = self.load_prompt()
         except Exception as e:
             logging.error(f"Error reading prompt file: {e}")
             return f"Error reading prompt file: {e}"
 
-        # 综合处理每个新闻文件
-        combined_content = ""
-        for news_file in news_files:
-            try:
-                with open(news_file, 'r') as f:
-                    content = f.read()
-                    logging.info(f"Reading content from {news_file}")
-                    
-                combined_content += f"\n\n### {os.path.basename(news_file)}\n\n{content}\n"
-            except Exception as e:
-                logging.error(f"Error processing {news_file}: {e}")
-                combined_content += f"Error processing {news_file}: {e}\n"
-
-        # 调用 AI 分析整个综合内容
+        # 调用 AI 分析新闻内容
+        duplicates, analysed = [], []
+        fingerprints = self.begin_dedup()
         try:
-            analysis = self.analyzer.analyse_news(prompt, combined_content)
-            report_content += f"### AI Analysis Report for {today_str}\n\n"
-            report_content += analysis
+            if self.mode == "map_reduce":
+                analysis = self._map_reduce(prompt, news_files, duplicates, analysed, fingerprints)
+            else:
+                analysis = self._analyse_combined(prompt, news_files, duplicates, analysed, fingerprints)
         except Exception as e:
             logging.error(f"Error during AI analysis: {e}")
             return f"Error during AI analysis: {e}"
+        if analysis is None:
+            return self.save_report(self.all_duplicates_note(), duplicates, report_date, fingerprints)
+
+        # 保存生成的报告；结构化分析在报告保存成功后再进行，出错或耗时较长都不影响当日报告
+        report_file = self.save_report(analysis, duplicates, report_date, fingerprints)
+        if os.path.isfile(report_file):
+            self.update_article_store(analysed, report_date)
+        return report_file
+
+    def generate_stream(self, news_files, report_date=None):
+        """流式生成报告：逐步产出 (当前报告内容, None)，完成后产出 (完整报告内容, 报告路径)"""
+        report_date = report_date or self._today()
+        prompt = self.load_prompt()
+        header = self._report_header(report_date)
+
+        duplicates, analysed = [], []
+        fingerprints = self.begin_dedup()
+        with SectionSpool(self.analyzer.model) as spool:
+            if self.mode == "map_reduce":
+                # map 阶段并发逐篇分析并汇报进度，reduce 阶段的最终汇总流式输出
+                for done in self._map_sections(prompt, news_files, duplicates, analysed, spool, fingerprints):
+                    yield f"{header}_Analysed {done} news files..._\n", None
+                request = self._prepare_reduce(spool) if analysed else self._no_news_to_analyse(duplicates)
+            else:
+                content = self._combine_news_files(prompt, news_files, duplicates, analysed, fingerprints)
+                request = (prompt, content) if content is not None else None
+
+        if request is None:
+            analysis = self.all_duplicates_note()
+            report_file = self.save_report(analysis, duplicates, report_date, fingerprints)
+            yield header + analysis + self._duplicates_note(duplicates), report_file
+            return
+
+        analysis = ""
+        for delta in self.analyzer.analyse_news_stream(*request, labels=self.metric_labels):
+            analysis += delta
+            yield header + analysis, None
+
+        report_file = self.save_report(analysis, duplicates, report_date, fingerprints)
+        yield header + analysis + self._duplicates_note(duplicates), report_file
+        # 报告先交给调用方，再逐篇提取结构化分析
+        if os.path.isfile(report_file):
+            self.update_article_store(analysed, report_date)
 
-        # 保存生成的报告
-        report_file = os.path.join(self.report_dir, f"{today_str}.md")
+    def load_prompt(self):
+        """读取分析用的 system prompt，文件未修改时直接复用已加载的内容"""
+        return prompt_store.load(self.prompt_file)
+
+    @staticmethod
+    def _today():
+        return datetime.today().strftime('%Y-%m-%d')
+
+    def _report_header(self, report_date):
+        return f"### AI Analysis Report for {report_date}\n\n"
+
+    def save_report(self, analysis, duplicates=(), report_date=None, fingerprints=None):
+        """把分析结果写入 data/reports/<party>/<date>.md，返回报告路径或错误信息；duplicates 为跳过分析的近似重复新闻。
+        fingerprints 为本次登记的近似重复指纹（begin_dedup 的返回值），报告写入成功后才提交到指纹库"""
+        report_date = report_date or self._today()
+        report_content = self._report_header(report_date)
+        report_content += analysis
+        report_content += self._duplicates_note(duplicates)
+
+        report_file = os.path.join(self.report_dir, f"{report_date}.md")
         try:
             with open(report_file, 'w') as f:
                 f.write(report_content)
@@ -56,9 +187,325 @@ class ReportGenerator:
         except Exception as e:
             logging.error(f"Error saving report: {e}")
             return f"Error saving report: {e}"
+        if fingerprints is not None:
+            fingerprints.commit()
+
+        title = f"{self.party.capitalize()} AI Analysis Report for {report_date}"
+        self.search_index.safe_add_document(report_file, "report", self.party, report_date, title, report_content)
 
         return report_file
 
+    def read_news(self, news_files):
+        """批量读取新闻内容，返回 {路径: Markdown 内容}：先用一次查询从存档读取，存档中没有的再读文件；读取失败的不出现在结果里"""
+        contents = self.archive.read_paths(news_files)
+        for news_file in news_files:
+            if news_file in contents:
+                continue
+            try:
+                with open(news_file, 'r') as f:
+                    contents[news_file] = f.read()
+            except Exception as e:
+                logging.error(f"Error processing {news_file}: {e}")
+        logging.info(f"Read {len(contents)} of {len(news_files)} news files")
+        return contents
+
+    def iter_news(self, news_files, batch_size=None):
+        """按批次（默认 analysis.read_batch_size 篇）读取新闻，按输入顺序逐篇产出 (路径, Markdown 内容)；
+        内存中最多保留一批正文，读取失败的文件跳过。news_files 也可以是边抓取边产出路径的迭代器，
+        此时通常取 batch_size=1，每篇到达后立即读取"""
+        news_files = iter(news_files)
+        while True:
+            batch = list(islice(news_files, batch_size or self.read_batch_size))
+            if not batch:
+                return
+            contents = self.read_news(batch)
+            for news_file in batch:
+                if news_file in contents:
+                    yield news_file, contents.pop(news_file)
+
+    def begin_dedup(self):
+        """开始一次报告生成的近似重复检测，返回传给 check_duplicate 和 save_report 的待提交指纹；未启用时返回 None"""
+        return self.dedup.begin() if self.dedup is not None else None
+
+    def check_duplicate(self, news_file, content=None, fingerprints=None):
+        """登记一篇新闻的指纹；与已分析的新闻近似时返回 (新闻路径, 原文路径, 汉明距离, 节省的 token 数)，否则返回 None。
+        传入 fingerprints 时指纹暂存其中，由 save_report 在报告保存成功后提交；否则直接写入指纹库"""
+        if self.dedup is None:
+            return None
+        if content is None:
+            content = self.read_news([news_file]).get(news_file)
+        if content is None:
+            return None
+        # 文件名以抓取日期开头：YYYY-MM-DD_<title>.md
+        news_date = os.path.basename(news_file)[:10]
+        duplicate = (fingerprints or self.dedup).check(news_file, self.party, news_date, content)
+        if duplicate is None:
+            return None
+        original, distance = duplicate
+        tokens = count_tokens(content, self.analyzer.model)
+        registry.inc("dedup_skipped_total", party=self.party)
+        registry.inc("dedup_tokens_saved_total", tokens, party=self.party)
+        return news_file, original, distance, tokens
+
+    def _iter_unique(self, news_files, duplicates, fingerprints=None, batch_size=None):
+        """按批次读取新闻并逐篇检查近似重复，产出需要分析的 (路径, 内容)；重复项追加到 duplicates"""
+        for news_file, content in self.iter_news(news_files, batch_size):
+            duplicate = self.check_duplicate(news_file, content, fingerprints)
+            if duplicate is None:
+                yield news_file, content
+            else:
+                duplicates.append(duplicate)
+        if duplicates:
+            saved = sum(tokens for *_, tokens in duplicates)
+            logging.info(
+                f"Skipped {len(duplicates)} near-duplicate news files for {self.party}, saving ~{saved} tokens"
+            )
+
+    def _no_news_to_analyse(self, duplicates):
+        """没有需要分析的新闻：全部为近似重复时返回 None（报告只列出重复项），全部读取失败时抛出 AnalysisError"""
+        if not duplicates:
+            raise AnalysisError(f"No readable news files for {self.party}")
+        return None
+
+    def _duplicates_note(self, duplicates):
+        """报告末尾的近似重复新闻列表，注明与哪篇已分析新闻重复"""
+        if not duplicates:
+            return ""
+        saved = sum(tokens for *_, tokens in duplicates)
+        lines = [f"\n\n#### Near-duplicate news (not re-analysed, ~{saved} tokens saved)\n"]
+        for news_file, original, distance, _ in duplicates:
+            lines.append(f"- {os.path.basename(news_file)} ≈ {os.path.basename(original)} (distance {distance})")
+        return "\n".join(lines) + "\n"
+
+    def all_duplicates_note(self):
+        return "_All news for this day are near-duplicates of previously analysed releases._"
+
+    def update_article_store(self, news_files, news_date):
+        """逐篇提取结构化分析并更新日/周/月汇总，返回新分析的篇数；已用当前 prompt 分析过的文章（按内容摘要）直接复用。
+        新闻按批次读取和分析，出错时只记录日志，不影响当日报告"""
+        if self.article_store is None or not news_files:
+            return 0
+        try:
+            prompt = prompt_store.load(self.structured_prompt_file)
+            prompt_hash = content_hash(prompt)
+            articles = {}  # 内容摘要 -> 文件，同一内容只分析一次
+            for news_file, content in self.iter_news(news_files):
+                articles.setdefault(content_hash(content), news_file)
+            known = self.article_store.known_hashes(articles, prompt_hash)
+            registry.inc("article_analyses_total", len(known), outcome="reused", **self.metric_labels)
+            pending = [(digest, news_file) for digest, news_file in articles.items() if digest not in known]
+            if not pending:
+                return 0
+
+            budget = self._content_budget(prompt)
+            days = set()
+            analysed = 0
+            for start in range(0, len(pending), self.read_batch_size):
+                batch = pending[start:start + self.read_batch_size]
+                contents = self.read_news([news_file for _, news_file in batch])
+                batch = [(digest, news_file) for digest, news_file in batch if news_file in contents]
+                results = self.analyzer.analyse_batch(
+                    prompt,
+                    [truncate_to_tokens(contents.pop(news_file), budget, self.analyzer.model) for _, news_file in batch],
+                    max_concurrency=self.max_concurrency, return_exceptions=True, labels=self.metric_labels
+                )
+                for (digest, news_file), result in zip(batch, results):
+                    try:
+                        if isinstance(result, Exception):
+                            raise result
+                        structured = parse_structured(result)
+                    except Exception as e:
+                        logging.warning(f"Structured analysis failed for {news_file}: {e}")
+                        registry.inc("article_analyses_total", outcome="failed", **self.metric_labels)
+                        continue
+                    days.add(self.article_store.add(digest, prompt_hash, self.party, news_date, news_file, structured))
+                    analysed += 1
+            registry.inc("article_analyses_total", analysed, outcome="new", **self.metric_labels)
+            for party, day in days:
+                self.article_store.update_rollups(party, day)
+            logging.info(f"Stored structured analyses for {self.party}: {analysed} analysed, {len(known)} reused")
+            return analysed
+        except Exception as e:
+            logging.error(f"Error updating article analysis store: {e}")
+            return 0
+
+    def _analyse_combined(self, prompt, news_files, duplicates, analysed, fingerprints=None):
+        """将所有新闻合并后一次性调用 AI 分析；全部为近似重复时返回 None"""
+        content = self._combine_news_files(prompt, news_files, duplicates, analysed, fingerprints)
+        if content is None:
+            return None
+        return self.analyzer.analyse_news(prompt, content, labels=self.metric_labels)
+
+    def _combine_news_files(self, prompt, news_files, duplicates, analysed, fingerprints=None):
+        """把新闻拼接为一段分析内容；总长超出单次请求预算时按篇均分预算截断过长的正文。
+
+        分两遍按批次读取：第一遍过滤近似重复并统计各篇 token 数，第二遍按各篇上限截断后拼接，
+        内存中只保留各篇的 token 数和不超过预算的请求内容。需要分析的文件追加到 analysed，
+        重复项追加到 duplicates；全部为近似重复时返回 None。
+        """
+        counts = []
+        for news_file, content in self._iter_unique(news_files, duplicates, fingerprints):
+            analysed.append(news_file)
+            counts.append(count_tokens(content, self.analyzer.model))
+        if not analysed:
+            return self._no_news_to_analyse(duplicates)
+
+        headers = [f"\n\n### {os.path.basename(news_file)}\n\n" for news_file in analysed]
+        # 预算扣除 system prompt、消息格式开销和各篇标题
+        budget = self.max_request_tokens - count_message_tokens(
+            self.analyzer.build_messages(prompt, "".join(headers)), self.analyzer.model
+        ) - len(analysed)  # 每篇末尾的换行
+        limits = token_limits(counts, max(budget, 0))
+
+        positions = {news_file: i for i, news_file in enumerate(analysed)}
+        parts = []
+        for news_file, content in self.iter_news(analysed):
+            i = positions[news_file]
+            body = content if limits[i] >= counts[i] else truncate_to_tokens(content, limits[i], self.analyzer.model)
+            parts.append(f"{headers[i]}{body}\n" if body else headers[i])
+        return "".join(parts)
+
+    def _map_reduce(self, prompt, news_files, duplicates, analysed, fingerprints=None):
+        """逐篇并发分析新闻（map），再把各篇摘要汇总为当日报告（reduce）；全部为近似重复时返回 None"""
+        with SectionSpool(self.analyzer.model) as spool:
+            for _ in self._map_sections(prompt, news_files, duplicates, analysed, spool, fingerprints):
+                pass
+            if not analysed:
+                return self._no_news_to_analyse(duplicates)
+            logging.info(f"Map stage: {len(spool)} summaries from {len(analysed)} news files")
+            return self.reduce_sections(spool)
+
+    def _map_sections(self, prompt, news_files, duplicates, analysed, spool, fingerprints=None, max_concurrency=None,
+                      batch_size=None):
+        """map 阶段：按批次读取新闻并过滤近似重复，逐篇并发分析，摘要按输入顺序写入 spool，每完成一篇产出已完成篇数。
+        在途（含已完成但尚未轮到写入）的新闻不超过并发数的两倍，内存中只保留这些新闻的正文。
+        流水线传入边抓取边产出的迭代器，并以 max_concurrency、batch_size 覆盖配置中的并发数和读取批次"""
+        max_concurrency = max_concurrency or self.max_concurrency
+        window = max_concurrency * 2
+        pending = {}  # future -> 新闻序号
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            for news_file, content in self._iter_unique(news_files, duplicates, fingerprints, batch_size):
+                pending[executor.submit(self.analyse_news_file, prompt, news_file, content)] = len(analysed)
+                analysed.append(news_file)
+                while pending and len(pending) + spool.waiting >= window:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        spool.put(pending.pop(future), future.result())
+                        done += 1
+                        yield done
+            for future in as_completed(list(pending)):
+                spool.put(pending.pop(future), future.result())
+                done += 1
+                yield done
+
+    def analyse_news_file(self, prompt, news_file, content=None):
+        """map 阶段的单篇入口：分析一篇新闻，返回其摘要段落列表（供流水线逐篇调用）"""
+        if content is None:
+            content = self.read_news([news_file]).get(news_file)
+        chunks = self._chunk_news_file(prompt, news_file, content)
+        summaries = []
+        for label, piece in chunks:
+            try:
+                summaries.append(self.analyzer.analyse_news(prompt, piece, labels=self.metric_labels))
+            except AnalysisError as e:
+                summaries.append(e)
+        return self._collect_sections(chunks, summaries)
+
+    def reduce_sections(self, sections):
+        """reduce 阶段：把各篇摘要（列表或 SectionSpool）汇总为当日报告"""
+        reduce_prompt, content = self._prepare_reduce(sections)
+        return self.analyzer.analyse_news(reduce_prompt, content, labels=self.metric_labels)
+
+    def _prepare_reduce(self, sections):
+        """摘要总量超出预算时分组汇总，逐层归并直到能在一次请求内完成，返回最终请求的 (prompt, 内容)。
+        分组只依据各段 token 数，摘要逐组读取拼接，不需要同时持有全部摘要"""
+        if not len(sections):
+            raise AnalysisError("All news analyses failed")
+
+        reduce_prompt = prompt_store.load(self.reduce_prompt_file)
+
+        reduce_budget = self._content_budget(reduce_prompt)
+        while True:
+            if isinstance(sections, SectionSpool):
+                tokens = sections.tokens
+            else:
+                tokens = [count_tokens(section, self.analyzer.model) for section in sections]
+            sizes = self._group_sizes(tokens, reduce_budget)
+            if len(sizes) == 1:
+                content = "\n\n".join(sections)
+                if sum(tokens) > reduce_budget:  # 只剩一段且本身超出预算
+                    content = truncate_to_tokens(content, reduce_budget, self.analyzer.model)
+                return reduce_prompt, content
+            if len(sizes) == len(tokens):
+                # 每段摘要都超过半个预算时分组无法减少段数：把过长的段截断到半个预算，保证每轮至少两两归并
+                half = max(reduce_budget // 2 - 1, 1)
+                sections = [
+                    section if count <= half else truncate_to_tokens(section, half, self.analyzer.model)
+                    for section, count in zip(sections, tokens)
+                ]
+                sizes = [2] * (len(sections) // 2) + [1] * (len(sections) % 2)
+            logging.info(f"Reduce stage: merging {len(tokens)} summaries in {len(sizes)} groups")
+            groups = self._iter_groups(sections, sizes)
+            merged = []
+            while True:
+                # 每次只读取并提交一个窗口的分组
+                window = list(islice(groups, self.max_concurrency * 2))
+                if not window:
+                    break
+                merged.extend(self.analyzer.analyse_batch(
+                    reduce_prompt, window, self.max_concurrency, labels=self.metric_labels
+                ))
+            sections = [f"#### Part {i}\n\n{summary}" for i, summary in enumerate(merged, 1)]
+
+    def _chunk_news_file(self, prompt, news_file, content):
+        """按 token 预算切分一篇新闻，保证单次请求不超过上限，返回 (label, piece) 列表；内容缺失时返回空列表"""
+        if content is None:
+            return []
+        name = os.path.basename(news_file)
+        pieces = split_by_tokens(content, self._content_budget(prompt), self.analyzer.model)
+        if len(pieces) == 1:
+            return [(name, pieces[0])]
+        return [(f"{name} ({i}/{len(pieces)})", piece) for i, piece in enumerate(pieces, 1)]
+
+    def _collect_sections(self, chunks, summaries):
+        """把摘要拼成带标题的段落；单篇分析失败时跳过该篇，避免错误信息混入报告"""
+        sections = []
+        for (label, _), summary in zip(chunks, summaries):
+            if isinstance(summary, Exception):
+                logging.error(f"Skipping {label}: {summary}")
+                continue
+            sections.append(f"#### {label}\n\n{summary}")
+        return sections
+
+    def _content_budget(self, prompt):
+        """单次请求中留给正文的 token 数（扣除 system prompt 和消息格式开销）"""
+        overhead = count_message_tokens(self.analyzer.build_messages(prompt, ""), self.analyzer.model)
+        return max(self.max_request_tokens - overhead, 1)
+
+    @staticmethod
+    def _group_sizes(tokens, budget):
+        """按 token 预算把相邻的摘要分组，返回每组的段数，每组至少包含一段"""
+        sizes = []
+        current = 0
+        current_tokens = 0
+        for section_tokens in tokens:
+            if current and current_tokens + section_tokens > budget:
+                sizes.append(current)
+                current = 0
+                current_tokens = 0
+            current += 1
+            current_tokens += section_tokens
+        sizes.append(current)
+        return sizes
+
+    @staticmethod
+    def _iter_groups(sections, sizes):
+        """按分组段数逐组读取并拼接摘要"""
+        sections = iter(sections)
+        for size in sizes:
+            yield "\n\n".join(islice(sections, size))
+
 
 
 
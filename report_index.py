@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class ReportIndex:
+    """内存中的报告索引：按日期倒序缓存报告列表（目录 mtime 变化时失效），并用 LRU 缓存报告正文"""
+
+    def __init__(self, base_dir="data/reports", cache_size=64):
+        self.base_dir = base_dir
+        self.cache_size = cache_size
+        self._listings = {}  # party -> (目录 mtime, 按日期倒序的文件名列表)
+        self._bodies = OrderedDict()  # 报告路径 -> (文件 mtime, 内容)
+        self._lock = threading.Lock()
+
+    def _report_dir(self, party):
+        return os.path.join(self.base_dir, party)
+
+    def list_reports(self, party):
+        """返回指定党派的报告文件名，按日期倒序；仅在目录发生变化时重新扫描"""
+        report_dir = self._report_dir(party)
+        try:
+            dir_mtime = os.stat(report_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            cached = self._listings.get(party)
+            if cached and cached[0] == dir_mtime:
+                return cached[1]
+
+        # 文件名格式为 YYYY-MM-DD.md，按字符串倒序即为日期倒序
+        names = sorted((f for f in os.listdir(report_dir) if f.endswith('.md')), reverse=True)
+        with self._lock:
+            self._listings[party] = (dir_mtime, names)
+        logging.debug(f"Indexed {len(names)} reports for {party}")
+        return names
+
+    def query(self, party, start_date=None, end_date=None, page=1, page_size=50):
+        """按日期范围（YYYY-MM-DD，含边界）过滤并分页，返回 (当前页文件名, 总页数)"""
+        names = self.list_reports(party)
+        if start_date:
+            names = [name for name in names if name[:10] >= start_date]
+        if end_date:
+            names = [name for name in names if name[:10] <= end_date]
+
+        total_pages = max((len(names) + page_size - 1) // page_size, 1)
+        page = min(max(int(page), 1), total_pages)
+        start = (page - 1) * page_size
+        return names[start:start + page_size], total_pages
+
+    def read(self, party, name):
+        """读取报告正文，文件未修改时直接返回缓存内容；报告不存在时返回 None"""
+        report_file = os.path.join(self._report_dir(party), name)
+        try:
+            mtime = os.stat(report_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._bodies.get(report_file)
+            if cached and cached[0] == mtime:
+                self._bodies.move_to_end(report_file)
+                return cached[1]
+
+        with open(report_file, 'r') as f:
+            content = f.read()
+
+        with self._lock:
+            self._bodies[report_file] = (mtime, content)
+            self._bodies.move_to_end(report_file)
+            while len(self._bodies) > self.cache_size:
+                self._bodies.popitem(last=False)
+        return content
+
+    def invalidate(self, party=None):
+        """清除报告列表缓存，生成新报告后调用"""
+        with self._lock:
+            if party is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(party, None)
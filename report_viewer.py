@@ -1,48 +1,120 @@
 import gradio as gr
 import os
+from report_index import ReportIndex
+from search_index import SearchIndex
 
 class ReportViewerUI:
-    def __init__(self, bipartisan_insight):
+    def __init__(self, config_manager, bipartisan_insight, page_size=50):
         self.bipartisan_insight = bipartisan_insight  # 传入主业务逻辑类实例
+        self.report_index = ReportIndex("data/reports")  # 报告列表和正文的内存缓存
+        self.page_size = page_size
+        # 新闻和报告的全文索引，与抓取器、报告生成器写入的是同一个库
+        self.search_index = SearchIndex(config_manager.config.get("search_index_path", "data/search_index.db"))
 
-    def get_report_list(self, party):
-        """获取指定党派的报告列表"""
-        report_dir = f"data/reports/{party}"
-        return [f for f in os.listdir(report_dir) if f.endswith('.md')] if os.path.exists(report_dir) else []
+    def get_report_list(self, party, start_date=None, end_date=None, page=1):
+        """获取指定党派的报告列表（按日期倒序，支持日期范围过滤和分页）"""
+        names, _ = self.report_index.query(party, start_date or None, end_date or None, page or 1, self.page_size)
+        return names
 
-    def generate_report(self, party):
-        """生成指定党派的当天新闻报告并展示内容"""
-        return self.bipartisan_insight.job(party)
+    def refresh_report_list(self, party, start_date, end_date, page):
+        """根据过滤条件刷新下拉框选项和分页信息"""
+        names, total_pages = self.report_index.query(party, start_date or None, end_date or None, page or 1, self.page_size)
+        page = min(max(int(page or 1), 1), total_pages)
+        return gr.update(choices=names), f"Page {page} / {total_pages}"
+
+    def generate_report(self, party, start_date="", end_date="", page=1):
+        """提交指定党派当天的后台任务并订阅其进度；同一党派已有任务在运行时直接跟随该任务，完成后刷新下拉框"""
+        job = self.bipartisan_insight.submit_job(party)
+        snapshot = job.snapshot()
+        for snapshot in self.bipartisan_insight.jobs.watch(job.id):
+            yield snapshot["progress"], gr.update(), gr.update(), self._job_info(snapshot)
+        if snapshot["status"] == "failed":
+            yield f"Error during job execution for {party.capitalize()}: {snapshot['error']}", gr.update(), gr.update(), self._job_info(snapshot)
+            return
+        self.report_index.invalidate(party)
+        dropdown_update, page_info = self.refresh_report_list(party, start_date, end_date, page)
+        yield snapshot["progress"], dropdown_update, page_info, self._job_info(snapshot)
+
+    def _job_info(self, snapshot):
+        return f"_Job {snapshot['id']}: {snapshot['status']}_"
 
     def display_report(self, party, selected_report):
         """根据选中的报告展示其内容"""
-        report_file = f"data/reports/{party}/{selected_report}"
-        if os.path.exists(report_file):
-            with open(report_file, 'r') as f:
-                return f.read()
-        return "Report not found."
+        if not selected_report:
+            return ""
+        content = self.report_index.read(party, os.path.basename(selected_report))
+        return content if content is not None else "Report not found."
+
+    def search(self, query, party, kind, start_date, end_date):
+        """全文检索新闻和报告，返回 Markdown 格式的结果列表"""
+        results = self.search_index.search(
+            query,
+            party=None if party == "All" else party,
+            kind=None if kind == "All" else kind,
+            start_date=start_date or None,
+            end_date=end_date or None,
+            limit=50
+        )
+        if not results:
+            return "No results."
+        lines = []
+        for result in results:
+            lines.append(f"**{result['title']}** — {result['party']} {result['kind']}, {result['date']}  ")
+            lines.append(f"`{result['path']}`  ")
+            lines.append(f"{result['snippet']}\n")
+        return "\n".join(lines)
+
+    def create_search_tab(self):
+        """创建全文检索Tab，支持按党派、类型和日期过滤"""
+        with gr.TabItem("Search"):
+            with gr.Row():
+                query = gr.Textbox(label="Query (at least 3 characters)")
+                party = gr.Dropdown(choices=["All", "democrat", "republican"], value="All", label="Party")
+                kind = gr.Dropdown(choices=["All", "news", "report"], value="All", label="Type")
+            with gr.Row():
+                start_date = gr.Textbox(label="From (YYYY-MM-DD)")
+                end_date = gr.Textbox(label="To (YYYY-MM-DD)")
+                search_button = gr.Button("Search")
+
+            results_display = gr.Markdown()
+            inputs = [query, party, kind, start_date, end_date]
+            search_button.click(self.search, inputs=inputs, outputs=results_display)
+            query.submit(self.search, inputs=inputs, outputs=results_display)
 
     def create_party_tab(self, party):
-        """创建指定党派的Tab，包括生成报告按钮和下拉框"""
+        """创建指定党派的Tab，包括生成报告按钮、过滤条件和下拉框"""
         with gr.TabItem(party.capitalize()):
+            with gr.Row():
+                start_date = gr.Textbox(label="From (YYYY-MM-DD)")
+                end_date = gr.Textbox(label="To (YYYY-MM-DD)")
+                page = gr.Number(value=1, minimum=1, precision=0, label="Page")
+                page_info = gr.Markdown(self.refresh_report_list(party, "", "", 1)[1])
             with gr.Row():
                 report_dropdown = gr.Dropdown(choices=self.get_report_list(party), label=f"Select {party.capitalize()} Report")
                 generate_button = gr.Button(f"Generate {party.capitalize()} Report")
+                job_info = gr.Markdown()
 
             report_display = gr.Markdown()
+            party_state = gr.State(party)
+            filters = [party_state, start_date, end_date, page]
+
+            # Filter actions to refresh the dropdown
+            for component in (start_date, end_date):
+                component.submit(self.refresh_report_list, inputs=filters, outputs=[report_dropdown, page_info])
+            page.change(self.refresh_report_list, inputs=filters, outputs=[report_dropdown, page_info])
 
             # Dropdown action to display the selected report
             report_dropdown.change(
                 self.display_report, 
-                inputs=[gr.State(party), report_dropdown], 
+                inputs=[party_state, report_dropdown], 
                 outputs=report_display
             )
 
-            # Button action to generate today's report and update dropdown
+            # Button action to queue today's report job, follow its progress and update dropdown
             generate_button.click(
                 self.generate_report, 
-                inputs=[gr.State(party)], 
-                outputs=[report_display, report_dropdown]
+                inputs=filters, 
+                outputs=[report_display, report_dropdown, page_info, job_info]
             )
 
     def launch(self):
@@ -52,4 +124,5 @@ class ReportViewerUI:
             with gr.Tabs():
                 self.create_party_tab("democrat")
                 self.create_party_tab("republican")
+                self.create_search_tab()
             app.launch()
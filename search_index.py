@@ -0,0 +1,132 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+
+class SearchIndex:
+    """基于 SQLite FTS5 的增量全文索引，覆盖 data/news 下的新闻和 data/reports 下的报告"""
+
+    def __init__(self, db_path="data/search_index.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 爬虫线程和报告生成可能同时写入，同一进程内用锁串行化，跨进程依赖 SQLite 的锁等待
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    kind TEXT NOT NULL,
+                    party TEXT NOT NULL,
+                    doc_date TEXT NOT NULL,
+                    title TEXT
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_filter ON documents (kind, party, doc_date)"
+            )
+            # trigram 分词支持中英文子串检索；较老的 SQLite 不支持时退回 unicode61
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, tokenize='trigram')"
+                )
+            except sqlite3.OperationalError:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body)"
+                )
+        logging.info(f"SearchIndex opened at {db_path}")
+
+    def add_document(self, path, kind, party, doc_date, title, body):
+        """新增或更新一篇文档（kind 为 "news" 或 "report"），路径相同时覆盖旧内容"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+            if row:
+                doc_id = row[0]
+                self._conn.execute(
+                    "UPDATE documents SET kind = ?, party = ?, doc_date = ?, title = ? WHERE id = ?",
+                    (kind, party, doc_date, title, doc_id)
+                )
+                self._conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self._conn.execute(
+                    "INSERT INTO documents (path, kind, party, doc_date, title) VALUES (?, ?, ?, ?, ?)",
+                    (path, kind, party, doc_date, title)
+                ).lastrowid
+            self._conn.execute(
+                "INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title, body)
+            )
+
+    def safe_add_document(self, path, kind, party, doc_date, title, body):
+        """写入索引失败时只记录日志，不影响抓取和报告生成的主流程"""
+        try:
+            self.add_document(path, kind, party, doc_date, title, body)
+        except Exception as e:
+            logging.error(f"Error indexing {path}: {e}")
+
+    def search(self, query, party=None, kind=None, start_date=None, end_date=None, limit=20):
+        """全文检索，可按党派、类型和日期范围（YYYY-MM-DD，含边界）过滤，按相关度排序"""
+        query = (query or "").strip()
+        if not query:
+            return []
+
+        # 整体作为短语匹配，避免用户输入被解析为 FTS5 查询语法
+        match = '"' + query.replace('"', '""') + '"'
+        sql = (
+            "SELECT d.path, d.kind, d.party, d.doc_date, d.title, "
+            "snippet(documents_fts, 1, '**', '**', '…', 16) "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?"
+        )
+        params = [match]
+        for column, operator, value in (
+            ("d.party", "=", party), ("d.kind", "=", kind),
+            ("d.doc_date", ">=", start_date), ("d.doc_date", "<=", end_date)
+        ):
+            if value:
+                sql += f" AND {column} {operator} ?"
+                params.append(value)
+        sql += " ORDER BY bm25(documents_fts) LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ("path", "kind", "party", "date", "title", "snippet")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def rebuild(self, base_dir="data"):
+        """扫描已有的新闻和报告文件建立索引，仅用于首次启用索引时导入历史数据"""
+        count = 0
+        for kind, sub_dir in (("news", "news"), ("report", "reports")):
+            root = os.path.join(base_dir, sub_dir)
+            if not os.path.isdir(root):
+                continue
+            for party in os.listdir(root):
+                party_dir = os.path.join(root, party)
+                if not os.path.isdir(party_dir):
+                    continue
+                for name in os.listdir(party_dir):
+                    if not name.endswith(".md"):
+                        continue
+                    path = os.path.join(party_dir, name)
+                    with open(path, "r") as f:
+                        body = f.read()
+                    match = re.match(r"\d{4}-\d{2}-\d{2}", name)
+                    doc_date = match.group(0) if match else ""
+                    title = body.split("\n", 1)[0].lstrip("# ").strip()
+                    self.add_document(path, kind, party, doc_date, title, body)
+                    count += 1
+        logging.info(f"Rebuilt search index with {count} documents")
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    # 为已有的新闻和报告文件建立索引
+    index = SearchIndex()
+    print(f"Indexed {index.rebuild()} documents")
@@ -0,0 +1,15 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_config(tmp_path, monkeypatch):
+    """切换到临时工作目录（data/ 下的数据库都写在这里），返回按 dict 构造配置对象的函数"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    return lambda config=None: SimpleNamespace(config=dict(config or {}))
@@ -0,0 +1,164 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import ai_analysis
+from ai_analysis import AINewsAnalyzer, AnalysisError
+from rate_limiter import RateLimitScheduler
+
+
+def api_error(status, retry_after=None):
+    """构造与 OpenAI SDK 抛出的相同类型的状态码错误"""
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "http://test/v1/chat"))
+    error_class = {400: openai.BadRequestError, 429: openai.RateLimitError}.get(status, openai.InternalServerError)
+    return error_class(f"HTTP {status}", response=response, body=None)
+
+
+class FakeAsyncClient:
+    """模拟 AsyncOpenAI：按 script 依次抛出错误，之后返回 "reply:<内容>"；delays 为按内容指定的响应耗时"""
+
+    def __init__(self, script=(), delays=None):
+        self.script = list(script)
+        self.delays = delays or {}
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages):
+        content = messages[-1]["content"]
+        self.calls.append(content)
+        if self.script:
+            raise self.script.pop(0)
+        if self.delays.get(content):
+            await asyncio.sleep(self.delays[content])
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None)
+        message = SimpleNamespace(content=f"reply:{content}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def make_analyzer(make_config):
+    def make(async_client, **limits):
+        limits = dict({"max_retries": 3, "backoff_base": 1.0, "backoff_max": 8.0}, **limits)
+        config_manager = make_config({"llm_cache": {"enabled": False}, "openai_limits": limits})
+        return AINewsAnalyzer(config_manager, client=SimpleNamespace(), async_client=async_client)
+    return make
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录 asyncio.sleep 的等待秒数，不真正等待"""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        recorded.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def test_request_and_token_buckets_throttle():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(requests_per_minute=2, tokens_per_minute=1200, clock=clock)
+
+    assert scheduler._reserve(100) == 0
+    assert scheduler._reserve(100) == 0
+    assert scheduler._reserve(100) == pytest.approx(30.0)  # RPM 用尽：每 30 秒补充一个请求
+
+    clock.now = 600  # 两个桶都已补满
+    assert scheduler._reserve(1000) == 0
+    assert scheduler._reserve(600) == pytest.approx(20.0)  # TPM 透支 400 个，每秒补充 20 个
+
+
+def test_async_requests_wait_for_rate_limiter(make_analyzer, sleeps):
+    analyzer = make_analyzer(FakeAsyncClient(), requests_per_minute=2, completion_token_estimate=0)
+    analyzer.scheduler = RateLimitScheduler(2, 100000, clock=FakeClock())
+
+    results = analyzer.analyse_batch("prompt", ["a", "b", "c", "d"], max_concurrency=1)
+
+    assert results == ["reply:a", "reply:b", "reply:c", "reply:d"]
+    # 时钟不前进：前两个请求用满 RPM 桶，之后每个请求多等 30 秒
+    assert sleeps == [pytest.approx(30.0), pytest.approx(60.0)]
+
+
+def test_retries_429_and_5xx_with_jittered_backoff(make_analyzer, sleeps, monkeypatch):
+    client = FakeAsyncClient(script=[api_error(429), api_error(503)])
+    analyzer = make_analyzer(client)
+    bounds = []
+    monkeypatch.setattr(random, "uniform", lambda low, high: bounds.append((low, high)) or high / 2)
+
+    assert analyzer.analyse_batch("prompt", ["a"]) == ["reply:a"]
+
+    assert len(client.calls) == 3
+    assert bounds == [(0, 1.0), (0, 2.0)]  # full jitter，上限按指数增长
+    assert 0.5 in sleeps and 1.0 in sleeps
+
+
+def test_retry_after_header_sets_minimum_delay_and_pauses_scheduler(make_analyzer, sleeps):
+    analyzer = make_analyzer(FakeAsyncClient(script=[api_error(429, retry_after=7)]))
+
+    assert analyzer.analyse_batch("prompt", ["a"]) == ["reply:a"]
+
+    assert 7.0 in sleeps
+    assert analyzer.scheduler._paused_until > 0
+
+
+def test_non_retryable_error_raises_analysis_error(make_analyzer, sleeps):
+    client = FakeAsyncClient(script=[api_error(400)])
+    analyzer = make_analyzer(client)
+
+    with pytest.raises(AnalysisError):
+        analyzer.analyse_batch("prompt", ["a"])
+    assert len(client.calls) == 1
+
+
+def test_exhausted_retries_raise_analysis_error(make_analyzer, sleeps):
+    client = FakeAsyncClient(script=[api_error(500)] * 4)
+    analyzer = make_analyzer(client, max_retries=3)
+
+    results = analyzer.analyse_batch("prompt", ["a"], return_exceptions=True)
+
+    assert isinstance(results[0], AnalysisError)
+    assert len(client.calls) == 4
+
+
+def test_batch_results_follow_input_order(make_analyzer):
+    contents = [f"item-{i}" for i in range(8)]
+    # 先提交的请求响应更慢，完成顺序与输入顺序相反
+    client = FakeAsyncClient(delays={content: 0.01 * (len(contents) - i) for i, content in enumerate(contents)})
+    analyzer = make_analyzer(client)
+
+    assert analyzer.analyse_batch("prompt", contents, max_concurrency=8) == [f"reply:{c}" for c in contents]
+
+
+def test_sync_path_shares_retry_handling(make_analyzer, monkeypatch):
+    errors = [api_error(502)]
+    calls = []
+
+    def create(model, messages):
+        calls.append(messages)
+        if errors:
+            raise errors.pop(0)
+        usage = SimpleNamespace(prompt_tokens=1, completion_tokens=1, prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+
+    analyzer = make_analyzer(None)
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_analysis.time, "sleep", lambda delay: None)
+
+    assert analyzer.analyse_news("prompt", "a") == "ok"
+    assert len(calls) == 2
@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import pytest
+
+from article_analysis import ArticleAnalysisStore, _apply, _empty_rollup, parse_structured, period_key
+from report_generation import ReportGenerator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def result(topics, stance="attack", relevance="none", impact="neutral"):
+    return {"topics": topics, "stance": stance, "china_relevance": relevance, "china_impact": impact, "summary": "s"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleAnalysisStore(str(tmp_path / "article_analysis.db"))
+    yield store
+    store.close()
+
+
+def test_parse_structured_normalises_fields():
+    text = '```json\n{"topics": ["经济", "unknown", "经济"], "stance": "shout", "china_relevance": "none", ' \
+           '"china_impact": "negative", "summary": " s "}\n```'
+    assert parse_structured(text) == {
+        "topics": ["经济", "其他"],
+        "stance": "other",
+        "china_relevance": "none",
+        "china_impact": "neutral",  # 与中国无关时不计影响
+        "summary": "s",
+    }
+    assert parse_structured('{"topics": "中国", "china_relevance": "direct", "china_impact": "negative"}')["topics"] == ["中国"]
+    with pytest.raises(ValueError):
+        parse_structured("no json here")
+
+
+def test_apply_adds_and_subtracts_and_drops_zero_counts():
+    delta = {"articles": 2, "topics": {"经济": 2}, "stance": {"attack": 2}, "china_relevance": {"none": 2}, "china_impact": {}}
+    rollup = _apply(_empty_rollup(), delta)
+    assert rollup["topics"] == {"经济": 2}
+    assert _apply(rollup, delta, -1) == _empty_rollup()
+
+
+def test_rerunning_a_day_does_not_double_count(store):
+    for _ in range(2):
+        store.add("a", "p1", "democrat", "2024-09-02", "a.md", result(["经济"]))
+        store.add("b", "p1", "democrat", "2024-09-02", "b.md", result(["经济", "移民"]))
+        store.update_rollups("democrat", "2024-09-02")
+
+    week = store.rollup("democrat", "week", period_key("week", "2024-09-02"))
+    assert week["articles"] == 2
+    assert week["topics"] == {"经济": 2, "移民": 1}
+    assert store.rollup("democrat", "month", "2024-09") == week
+
+
+def test_prompt_change_replaces_counts_in_week_and_month(store):
+    store.add("a", "p1", "democrat", "2024-09-02", "a.md", result(["经济"]))
+    store.update_rollups("democrat", "2024-09-02")
+    store.add("c", "p1", "democrat", "2024-09-03", "c.md", result(["外交"], relevance="direct", impact="negative"))
+    store.update_rollups("democrat", "2024-09-03")
+
+    # prompt 变化后重新分析同一内容：结果覆盖旧的分析，日期保持首次登记的日期
+    party, news_date = store.add("a", "p2", "democrat", "2024-09-05", "a.md", result(["中国"], stance="policy"))
+    assert (party, news_date) == ("democrat", "2024-09-02")
+    store.update_rollups(party, news_date)
+
+    week = store.rollup("democrat", "week", "2024-W36")
+    assert week["articles"] == 2
+    assert week["topics"] == {"中国": 1, "外交": 1}
+    assert week["stance"] == {"policy": 1, "attack": 1}
+    assert week["china_impact"] == {"negative": 1}
+    assert store.rollup("democrat", "month", "2024-09") == week
+    assert store.known_hashes(["a", "c"], "p2") == {"a"}
+
+
+
+class StubAnalyzer:
+    model = "gpt-4"
+
+    def build_messages(self, prompt, content):
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": content}]
+
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        return "analysis"
+
+
+def test_report_generator_updates_store_only_after_saving_the_report(make_config, monkeypatch):
+    shutil.copytree(os.path.join(REPO_DIR, "prompt"), "prompt")
+    config_manager = make_config({"dedup": {"enabled": False}, "structured_analysis": {"enabled": True}})
+    generator = ReportGenerator(config_manager, "democrat", analyzer=StubAnalyzer())
+    calls = []
+    monkeypatch.setattr(generator, "update_article_store", lambda news_files, news_date: calls.append(news_files))
+    os.makedirs("data/news/democrat", exist_ok=True)
+    news_file = "data/news/democrat/2024-09-04_a.md"
+    with open(news_file, "w") as f:
+        f.write("# a\n\nbody")
+
+    report_dir = generator.report_dir
+    generator.report_dir = "missing/dir"
+    assert generator.generate([news_file], "2024-09-04").startswith("Error saving report")
+    assert calls == []
+
+    generator.report_dir = report_dir
+    assert os.path.isfile(generator.generate([news_file], "2024-09-04"))
+    assert calls == [[news_file]]
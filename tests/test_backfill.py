@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from backfill import BackfillRunner
+from crawl_scheduler import CrawlError
+
+START, END = "2024-09-02", "2024-09-03"
+
+
+class PagedCrawler:
+    """pages: {页码: {日期: [链接]}}；记录请求过的列表页和抓取过的文章，failing 中的页或文章会失败"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.failing = set()
+        self.listed = []
+        self.fetched = []
+
+    def collect_news_range(self, start_date, end_date, start_pages=None, on_page=None, strict=False):
+        page = (start_pages or {}).get("test", 1)
+        while page is not None:
+            self.listed.append(page)
+            if page in self.failing:
+                raise CrawlError(f"listing page {page} failed")
+            done = page == max(self.pages)
+            on_page("test", page, self.pages[page], done)
+            page = None if done else page + 1
+
+    def iter_articles(self, items):
+        for news_link, news_date in items:
+            self.fetched.append(news_link)
+            md_file = None if news_link in self.failing else f"data/news/democrat/{news_date}_{news_link}.md"
+            yield (news_link, news_date), md_file
+
+
+class RecordingReportGenerator:
+    """记录每次生成报告的日期和新闻；failing 中的日期返回错误信息"""
+
+    def __init__(self):
+        self.failing = set()
+        self.calls = []
+
+    def generate(self, news_files, news_date):
+        self.calls.append((news_date, news_files))
+        if news_date in self.failing:
+            return f"Error during AI analysis for {news_date}"
+        os.makedirs("data/reports/democrat", exist_ok=True)
+        report_file = f"data/reports/democrat/{news_date}.md"
+        with open(report_file, "w") as f:
+            f.write("report")
+        return report_file
+
+
+def test_resumed_backfill_skips_listed_pages_fetched_articles_and_reported_dates(make_config):
+    crawler = PagedCrawler({1: {START: ["a"]}, 2: {END: ["b", "c"]}})
+    report_gen = RecordingReportGenerator()
+    runner = BackfillRunner(make_config(), {"democrat": crawler}, {"democrat": report_gen})
+
+    # 第一次运行在第 2 页中断
+    crawler.failing = {2}
+    with pytest.raises(CrawlError):
+        runner.run("democrat", START, END)
+    assert crawler.listed == [1, 2]
+    assert crawler.fetched == []
+
+    # 第二次运行从第 2 页继续；文章 c 抓取失败，END 的报告生成失败
+    crawler.failing = {"c"}
+    report_gen.failing = {END}
+    crawler.listed.clear()
+    assert runner.run("democrat", START, END) == {START: f"data/reports/democrat/{START}.md"}
+    assert crawler.listed == [2]
+    assert crawler.fetched == ["a", "b", "c"]
+
+    # 第三次运行：列表页已遍历完不再请求，只重试 c，已有报告的日期不再生成
+    crawler.failing = set()
+    report_gen.failing = set()
+    crawler.listed.clear()
+    crawler.fetched.clear()
+    report_gen.calls.clear()
+    reports = runner.run("democrat", START, END)
+    assert crawler.listed == []
+    assert crawler.fetched == ["c"]
+    assert report_gen.calls == [(END, [f"data/news/democrat/{END}_b.md", f"data/news/democrat/{END}_c.md"])]
+    assert reports == {START: f"data/reports/democrat/{START}.md", END: f"data/reports/democrat/{END}.md"}
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crawl_scheduler import CrawlError, CrawlScheduler
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (test browser)"}
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+
+class FakeSite:
+    """按 URL 依次返回脚本中的状态码，记录每次请求的 URL 和请求头"""
+
+    def __init__(self, robots_statuses):
+        self.robots_statuses = list(robots_statuses)
+        self.requests = []
+
+    def send(self, url, headers=None):
+        self.requests.append((url, headers))
+        if url.endswith("/robots.txt"):
+            status = self.robots_statuses.pop(0) if len(self.robots_statuses) > 1 else self.robots_statuses[0]
+            return SimpleNamespace(status_code=status, text=ROBOTS if status == 200 else "", headers={})
+        return SimpleNamespace(status_code=200, text="page", headers={})
+
+
+def make_scheduler(make_config):
+    return CrawlScheduler(make_config({
+        "crawler": {
+            "min_interval": 0,
+            "max_retries": 3,
+            "backoff_base": 0.001,
+            "domains": {"gop.com": {"retry_statuses": [403, 429, 500, 502, 503, 504]}},
+        }
+    }))
+
+
+def test_robots_fetch_uses_source_headers_and_retries_403(make_config):
+    site = FakeSite([403, 403, 200])
+    scheduler = make_scheduler(make_config)
+
+    response = scheduler.request("https://gop.com/press-releases/?page=1", site.send, HEADERS, HEADERS["User-Agent"])
+
+    assert response.text == "page"
+    robots_requests = [request for request in site.requests if request[0].endswith("/robots.txt")]
+    assert len(robots_requests) == 3
+    assert all(headers == HEADERS for _, headers in robots_requests)
+    # 重试后取到的规则仍然生效
+    with pytest.raises(CrawlError):
+        scheduler.request("https://gop.com/private/page", site.send, HEADERS, HEADERS["User-Agent"])
+
+
+def test_persistent_403_on_robots_does_not_block_the_site(make_config):
+    site = FakeSite([403])
+    scheduler = make_scheduler(make_config)
+
+    response = scheduler.request("https://gop.com/press-releases/?page=1", site.send, HEADERS, HEADERS["User-Agent"])
+
+    assert response.status_code == 200
+    assert len([url for url, _ in site.requests if url.endswith("/robots.txt")]) == 4  # 首次请求加 3 次重试
+
+
+def test_403_is_not_retried_for_domains_without_it(make_config):
+    site = FakeSite([403])
+    scheduler = make_scheduler(make_config)
+
+    assert scheduler.allowed("https://democrats.org/news/page/1/", site.send, "*", HEADERS)
+    assert len(site.requests) == 1
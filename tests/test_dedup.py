@@ -0,0 +1,63 @@
+import os
+import shutil
+
+from ai_analysis import AnalysisError
+from report_generation import ReportGenerator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT = " ".join(f"word{i}" for i in range(200))
+
+
+class FlakyAnalyzer:
+    """failures 次调用失败后正常返回"""
+    model = "gpt-4"
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.requests = []
+
+    def build_messages(self, prompt, content):
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": content}]
+
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        self.requests.append(content)
+        if self.failures:
+            self.failures -= 1
+            raise AnalysisError("Error in AI analysis: 503")
+        return "analysis"
+
+
+def make_generator(make_config, analyzer):
+    shutil.copytree(os.path.join(REPO_DIR, "prompt"), "prompt")
+    return ReportGenerator(make_config({"dedup": {"db_path": "data/fingerprints.db"}}), "democrat", analyzer=analyzer)
+
+
+def write_news(name, text=TEXT):
+    os.makedirs("data/news/democrat", exist_ok=True)
+    path = f"data/news/democrat/2024-09-04_{name}.md"
+    with open(path, "w") as f:
+        f.write(f"# {name}\n\n{text}")
+    return path
+
+
+def test_failed_report_does_not_register_fingerprints(make_config):
+    analyzer = FlakyAnalyzer(failures=1)
+    generator = make_generator(make_config, analyzer)
+    assert generator.generate([write_news("a")], "2024-09-04").startswith("Error during AI analysis")
+
+    # 之后重新抓取到的同一篇新闻仍需分析，不能被判为与从未分析过的文章重复
+    report_file = generator.generate([write_news("a_recrawled")], "2024-09-04")
+    assert os.path.isfile(report_file)
+    assert len(analyzer.requests) == 2
+    assert "Near-duplicate" not in open(report_file).read()
+
+
+def test_fingerprints_are_committed_after_the_report_is_saved(make_config):
+    analyzer = FlakyAnalyzer()
+    generator = make_generator(make_config, analyzer)
+    first, copy = write_news("a"), write_news("a_copy")
+
+    # 同一次运行中的近似重复仍能被发现
+    report_file = generator.generate([first, copy], "2024-09-04")
+    assert "a_copy.md ≈ 2024-09-04_a.md" in open(report_file).read()
+    assert generator.check_duplicate(write_news("later")) is not None
@@ -0,0 +1,151 @@
+import email
+
+import pytest
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from email_notification import EmailNotifier
+from pipeline import PipelineRunner
+
+RECIPIENTS = ["a@localhost", "b@localhost", "c@localhost"]
+
+
+@pytest.fixture
+def smtp():
+    server = FakeSMTPServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_notifier(make_config, smtp, monkeypatch):
+    monkeypatch.setenv("SENDER_EMAIL_PASSWORD", "secret")
+
+    def make(**email_config):
+        host, port = smtp.address
+        config = {
+            "smtp_server": host,
+            "smtp_port": port,
+            "use_ssl": False,
+            "sender_email": "bot@localhost",
+            "recipient_emails": RECIPIENTS,
+        }
+        config.update(email_config)
+        return EmailNotifier(make_config({"email": config}))
+
+    return make
+
+
+def write_reports(tmp_path):
+    report_files = []
+    for party in ("democrat", "republican"):
+        report_dir = tmp_path / "data" / "reports" / party
+        report_dir.mkdir(parents=True)
+        report_file = report_dir / "2024-09-04.md"
+        report_file.write_text(f"### {party} report\n\nSome *analysis*.\n")
+        report_files.append(str(report_file))
+    return report_files
+
+
+def html_body(raw_message):
+    message = email.message_from_bytes(raw_message)
+    return next(part for part in message.walk() if part.get_content_type() == "text/html").get_payload(decode=True).decode()
+
+
+def test_batch_logs_in_once_and_sends_each_report_to_all_recipients(make_notifier, smtp, tmp_path):
+    report_files = write_reports(tmp_path)
+
+    assert make_notifier().send_batch(report_files) is None
+
+    assert smtp.connections == 1
+    assert smtp.logins == 1
+    assert len(smtp.messages) == 2
+    for sender, recipients, _ in smtp.messages:
+        assert sender == "bot@localhost"
+        assert recipients == RECIPIENTS
+    assert "democrat report" in html_body(smtp.messages[0][2])
+    assert "republican report" in html_body(smtp.messages[1][2])
+
+
+def test_comma_separated_recipients(make_notifier, smtp, tmp_path):
+    report_file = write_reports(tmp_path)[0]
+
+    assert make_notifier(recipient_emails="x@localhost, y@localhost,").send(report_file) is None
+
+    assert smtp.messages[0][1] == ["x@localhost", "y@localhost"]
+
+
+def test_digest_merges_reports_into_one_message(make_notifier, smtp, tmp_path):
+    report_files = write_reports(tmp_path)
+
+    assert make_notifier(digest=True).send_digest(report_files) is None
+
+    assert smtp.logins == 1
+    assert len(smtp.messages) == 1
+    body = html_body(smtp.messages[0][2])
+    assert "<h2>Democrat</h2>" in body and "<h2>Republican</h2>" in body
+
+
+def test_missing_report_does_not_connect(make_notifier, smtp, tmp_path):
+    result = make_notifier().send_batch([str(tmp_path / "missing.md")])
+
+    assert result.startswith("Error preparing email")
+    assert smtp.connections == 0
+
+
+def test_html_is_rendered_once_until_the_report_changes(make_notifier, tmp_path, monkeypatch):
+    import markdown2
+
+    calls = []
+    render = markdown2.markdown
+    monkeypatch.setattr(markdown2, "markdown", lambda text: calls.append(text) or render(text))
+    notifier = make_notifier()
+    report_file = write_reports(tmp_path)[0]
+
+    first = notifier.render_html(report_file)
+    assert notifier.render_html(report_file) == first
+    assert len(calls) == 1
+
+    with open(report_file, "a") as f:
+        f.write("\nMore.\n")
+    assert "More." in notifier.render_html(report_file)
+    assert len(calls) == 2
+
+
+class StubCrawler:
+    def fetch_news(self, news_date):
+        return ["news.md"]
+
+
+class StubReportGenerator:
+    mode = "single"
+
+    def __init__(self, report_file):
+        self.report_file = report_file
+
+    def generate(self, news_files, news_date):
+        return self.report_file
+
+
+@pytest.mark.parametrize("digest", [False, True])
+def test_run_all_sends_both_reports_over_one_connection(make_config, make_notifier, smtp, tmp_path, digest):
+    democrat_report, republican_report = write_reports(tmp_path)
+    runner = PipelineRunner(
+        make_config(),
+        crawlers={"democrat": StubCrawler(), "republican": StubCrawler()},
+        report_gens={
+            "democrat": StubReportGenerator(democrat_report),
+            "republican": StubReportGenerator(republican_report),
+        },
+        email_notifier=make_notifier(digest=digest),
+    )
+
+    results = runner.run_all()
+
+    assert results == {
+        "democrat": "Democrat report generated and emailed.",
+        "republican": "Republican report generated and emailed.",
+    }
+    assert smtp.connections == 1
+    assert smtp.logins == 1
+    assert len(smtp.messages) == (1 if digest else 2)
+
@@ -0,0 +1,21 @@
+import pytest
+
+from html_extract import ArticleSelectors, DemocratExtractor, NewsExtractor, RepublicanExtractor, RssExtractor
+
+
+@pytest.mark.parametrize("html_bytes", [b"", b"  \n\t", b"<!-- empty -->"])
+def test_empty_pages_parse_to_nothing(html_bytes):
+    assert len(NewsExtractor.parse_html(html_bytes)) == 0
+    assert DemocratExtractor().parse_listing(html_bytes) == []
+    assert RssExtractor().parse_listing(html_bytes) == []
+    assert RepublicanExtractor().parse_article("https://gop.com/a", html_bytes) == ("", "")
+    selectors = ArticleSelectors({"title": "h1", "content": "div.body"})
+    assert selectors.parse("https://example.org/a", html_bytes) == ("", "")
+
+
+def test_listing_still_parses():
+    html_bytes = (
+        b'<ul><li class="posts-list__item"><a href="https://democrats.org/a">A</a>'
+        b'<span class="posts-list__date">09/04/2024</span></li></ul>'
+    )
+    assert DemocratExtractor().parse_listing(html_bytes) == [("https://democrats.org/a", "2024-09-04")]
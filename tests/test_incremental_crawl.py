@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+from data_acquisition import NewsCrawler
+from news_sources import NewsSource
+
+TODAY = "2024-09-04"
+
+
+class PageExtractor:
+    """列表页内容为 "链接 链接 ..."，文章页内容即正文"""
+
+    def parse_listing(self, content):
+        return [(link, TODAY) for link in content.decode().split()]
+
+    def parse_article(self, news_link, content):
+        return news_link.rsplit("/", 1)[-1], content.decode()
+
+
+def make_crawler(make_config, listing_pages, articles):
+    """listing_pages: {页码: [链接]}；articles: {链接: 状态码}，每次运行前可修改"""
+    config_manager = make_config({"crawler": {"respect_robots": False, "min_interval": 0}})
+    source = NewsSource("test", "democrat", "https://example.org/news/page/{}/", PageExtractor(), max_pages=5)
+    crawler = NewsCrawler(config_manager, "democrat", sources=[source])
+
+    def get(url, headers=None):
+        if "/news/page/" in url:
+            page = int(url.rstrip("/").rsplit("/", 1)[-1])
+            if page not in listing_pages:
+                return SimpleNamespace(status_code=404, content=b"", headers={})
+            return SimpleNamespace(status_code=200, content=" ".join(listing_pages[page]).encode(), headers={})
+        status = articles[url]
+        return SimpleNamespace(status_code=status, content=f"Body of {url}".encode(), headers={})
+
+    crawler.fetcher.get = get
+    return crawler
+
+
+def test_failed_article_is_retried_after_newer_article_is_indexed(make_config):
+    old, new, newest = (f"https://example.org/a/{name}" for name in ("old", "new", "newest"))
+    listing_pages = {1: [new, old]}
+    articles = {new: 200, old: 500}
+    crawler = make_crawler(make_config, listing_pages, articles)
+
+    assert len(crawler.fetch_news(TODAY)) == 1
+    assert crawler.index.get(old)["status"] == "failed"
+    assert crawler.index.is_fetched(new)
+
+    # 第二次运行：列表页在已抓取的 new 处停止翻页，old 不在本次列表中，但仍从索引中重试
+    listing_pages.clear()
+    listing_pages.update({1: [newest, new], 2: [old]})
+    articles[old] = 200
+    articles[newest] = 200
+    second = crawler.fetch_news(TODAY)
+
+    assert crawler.index.is_fetched(old)
+    assert crawler.index.is_fetched(newest)
+    assert len(second) == 3
+
+
+def test_unfetched_articles_give_up_after_max_attempts(make_config):
+    broken = "https://example.org/a/broken"
+    listing_pages = {1: [broken]}
+    crawler = make_crawler(make_config, listing_pages, {broken: 500})
+    crawler.max_fetch_attempts = 2
+
+    assert crawler.fetch_news(TODAY) == []
+    listing_pages.clear()  # 之后的运行中列表页不再出现该文章，只能从索引中重试
+    for _ in range(3):
+        assert crawler.fetch_news(TODAY) == []
+    assert crawler.index.get(broken)["attempts"] == 2
+    assert crawler.index.urls_for_date("democrat", TODAY, 2) == []
+
+
+
+def test_other_dates_in_the_index_do_not_join_the_daily_run(make_config):
+    old, new = "https://example.org/a/old", "https://example.org/a/new"
+    crawler = make_crawler(make_config, {1: [new]}, {new: 200, old: 200})
+    # 回填遍历列表页后中断：索引中留有其他日期的 pending 记录
+    crawler.index.add_pending("democrat", [(old, "2024-06-01")])
+
+    news = crawler.fetch_news(TODAY)
+
+    assert len(news) == 1 and news[0].startswith(f"data/news/democrat/{TODAY}_")
+    assert crawler.index.get(old)["status"] == "pending"
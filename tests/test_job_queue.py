@@ -0,0 +1,49 @@
+import threading
+
+from job_queue import JobQueue
+
+TODAY = "2024-09-04"
+PARTY_KEYS = [("democrat", TODAY), ("republican", TODAY)]
+
+
+def blocking_job(release, result):
+    def run():
+        release.wait(5)
+        return result
+    return run
+
+
+def test_all_job_claims_both_party_keys(make_config):
+    jobs = JobQueue(make_config({"job_queue": {"workers": 2}}))
+    release = threading.Event()
+    try:
+        all_job = jobs.submit(("all", TODAY), blocking_job(release, "all"), claims=PARTY_KEYS)
+
+        # 合并任务运行期间，界面提交的单党派任务和再次提交的合并任务都复用它
+        assert jobs.submit(("democrat", TODAY), blocking_job(release, "democrat")) is all_job
+        assert jobs.submit(("republican", TODAY), blocking_job(release, "republican")) is all_job
+        assert jobs.submit(("all", TODAY), blocking_job(release, "all"), claims=PARTY_KEYS) is all_job
+    finally:
+        release.set()
+    list(jobs.watch(all_job.id, poll_interval=0.1))
+
+    # 结束后释放全部 key
+    later = jobs.submit(("democrat", TODAY), lambda: "democrat")
+    assert later is not all_job
+    list(jobs.watch(later.id, poll_interval=0.1))
+    assert later.result == "democrat"
+    jobs.shutdown()
+
+
+def test_all_job_reuses_a_running_party_job(make_config):
+    jobs = JobQueue(make_config({"job_queue": {"workers": 2}}))
+    release = threading.Event()
+    try:
+        party_job = jobs.submit(("republican", TODAY), blocking_job(release, "republican"))
+        assert jobs.submit(("all", TODAY), blocking_job(release, "all"), claims=PARTY_KEYS) is party_job
+        # 冲突时合并任务不占用任何 key，另一党派仍可单独提交
+        democrat_job = jobs.submit(("democrat", TODAY), blocking_job(release, "democrat"))
+        assert democrat_job.key == ("democrat", TODAY)
+    finally:
+        release.set()
+    jobs.shutdown()
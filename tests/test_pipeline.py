@@ -0,0 +1,101 @@
+import os
+import shutil
+import threading
+
+from dedup import NearDuplicateIndex
+from pipeline import PipelineRunner, StageTimer
+from report_generation import ReportGenerator
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TODAY = "2024-09-04"
+
+
+class EndlessCrawler:
+    """不断产出新闻文件，记录抓取是否被关闭"""
+
+    def __init__(self, count=200):
+        self.count = count
+        self.closed = threading.Event()
+
+    def iter_news(self, news_date):
+        os.makedirs("data/news/democrat", exist_ok=True)
+        try:
+            for i in range(self.count):
+                path = f"data/news/democrat/{news_date}_news-{i}.md"
+                with open(path, "w") as f:
+                    f.write(f"# News {i}\n\n" + " ".join(f"w{i}-{j}" for j in range(50)))
+                yield path
+        finally:
+            self.closed.set()
+
+
+class BrokenAnalyzer:
+    model = "gpt-4"
+
+    def build_messages(self, prompt, content):
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": content}]
+
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        raise RuntimeError("analysis crashed")
+
+
+def make_runner(make_config, crawler, analyzer):
+    shutil.copytree(os.path.join(REPO_DIR, "prompt"), "prompt")
+    config_manager = make_config({
+        "analysis": {"mode": "map_reduce", "max_concurrency": 2},
+        "dedup": {"enabled": False},
+        "pipeline": {"queue_size": 2, "analysis_workers": 2},
+    })
+    report_gen = ReportGenerator(config_manager, "democrat", analyzer=analyzer)
+    return PipelineRunner(config_manager, {"democrat": crawler}, {"democrat": report_gen}, email_notifier=None)
+
+
+def test_failed_analysis_stops_the_crawler_thread(make_config):
+    crawler = EndlessCrawler()
+    runner = make_runner(make_config, crawler, BrokenAnalyzer())
+
+    message = runner.run_party("democrat")
+
+    assert message.startswith("Error during job execution for Democrat: analysis crashed")
+    assert crawler.closed.is_set()
+    assert not [thread for thread in threading.enumerate() if thread.name == "crawl-democrat"]
+
+
+class ListCrawler:
+    def __init__(self, paths):
+        self.paths = paths
+
+    def iter_news(self, news_date):
+        yield from self.paths
+
+
+class StubAnalyzer(BrokenAnalyzer):
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        return "summary"
+
+
+def test_unreadable_news_is_an_error_not_a_duplicates_report(make_config):
+    runner = make_runner(make_config, ListCrawler(["data/news/democrat/missing.md"]), StubAnalyzer())
+
+    message = runner.run_party("democrat")
+
+    assert message == "Error during job execution for Democrat: No readable news files for democrat"
+    assert not os.path.exists(f"data/reports/democrat/{TODAY}.md")
+
+
+def test_streaming_run_lists_near_duplicates_and_reduces_the_rest(make_config):
+    crawler = EndlessCrawler(count=3)
+    runner = make_runner(make_config, crawler, StubAnalyzer())
+    report_gen = runner.report_gens["democrat"]
+    report_gen.dedup = NearDuplicateIndex("data/fingerprints.db")
+    paths = list(crawler.iter_news(TODAY))
+    copy = paths[0].replace("news-0", "news-0-copy")
+    shutil.copy(paths[0], copy)
+    runner.crawlers["democrat"] = ListCrawler(paths + [copy])
+
+    news, report_file = runner._run_streaming("democrat", report_gen, StageTimer("democrat"), TODAY)
+
+    assert len(news) == 4
+    report = open(report_file).read()
+    assert "summary" in report
+    assert "news-0-copy.md ≈" in report
@@ -0,0 +1,51 @@
+import os
+import shutil
+
+from report_generation import ReportGenerator
+from token_counter import count_tokens
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class EchoAnalyzer:
+    """每次调用返回固定长度的摘要，记录每次请求的内容"""
+    model = "gpt-4"
+
+    def __init__(self, reply_words):
+        self.reply = " ".join(["summary"] * reply_words)
+        self.requests = []
+
+    def build_messages(self, prompt, content):
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": content}]
+
+    def analyse_news(self, prompt, content, use_cache=True, labels=None):
+        self.requests.append(content)
+        return self.reply
+
+    def analyse_batch(self, prompt, contents, max_concurrency=None, return_exceptions=False, labels=None):
+        return [self.analyse_news(prompt, content) for content in contents]
+
+
+def make_generator(make_config, analyzer, max_request_tokens):
+    shutil.copytree(os.path.join(REPO_DIR, "prompt"), "prompt")
+    config_manager = make_config({
+        "analysis": {"mode": "map_reduce", "max_request_tokens": max_request_tokens},
+        "dedup": {"enabled": False},
+    })
+    return ReportGenerator(config_manager, "democrat", analyzer=analyzer)
+
+
+def test_reduce_terminates_when_every_summary_exceeds_half_the_budget(make_config):
+    # 每段摘要和每次归并的结果都超过半个预算，分组本身无法减少段数
+    analyzer = EchoAnalyzer(reply_words=2000)
+    generator = make_generator(make_config, analyzer, max_request_tokens=3000)
+    sections = [f"#### news {i}\n\n{analyzer.reply}" for i in range(40)]
+
+    prompt, content = generator._prepare_reduce(sections)
+
+    budget = generator._content_budget(prompt)
+    # 每轮至少两两归并：40 段约需 40 次归并请求
+    assert 0 < len(analyzer.requests) < 2 * len(sections)
+    for request in analyzer.requests + [content]:
+        assert "summary" in request  # 截断后仍保留内容，而不是只剩分隔符
+        assert count_tokens(request) <= budget * 1.05
@@ -0,0 +1,115 @@
+import logging
+
+try:
+    import tiktoken
+except ImportError:  # 未安装 tiktoken 时退化为按字符估算
+    tiktoken = None
+
+_encodings = {}
+
+# Chat 格式中每条消息和整个回复的固定开销（与 OpenAI 文档中的计算方式一致）
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+TRUNCATION_MARKER = "\n\n[...]"
+
+
+def _get_encoding(model):
+    """获取模型对应的 tiktoken 编码，结果缓存复用"""
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # 编码文件首次使用时需要联网下载，离线环境下退化为估算
+            logging.warning(f"tiktoken encoding unavailable for {model}, falling back to estimation: {e}")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model="gpt-4"):
+    """统计文本的 token 数；没有 tiktoken 时按英文约 4 字符、中文约 1 字符一个 token 估算"""
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_message_tokens(messages, model="gpt-4"):
+    """统计 Chat 请求中所有消息的输入 token 数"""
+    return sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model) for message in messages
+    ) + TOKENS_PER_REPLY
+
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4"):
+    """按段落保留开头部分，使文本不超过 max_tokens，被截断时末尾加上省略标记"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER, model)
+    if budget <= 0:
+        return ""
+    kept = []
+    used = 0
+    for paragraph in _split_units(text, budget, model):
+        paragraph_tokens = count_tokens(paragraph, model) + (1 if kept else 0)  # 段落间的空行
+        if used + paragraph_tokens > budget:
+            break
+        kept.append(paragraph)
+        used += paragraph_tokens
+    return "\n\n".join(kept) + TRUNCATION_MARKER
+
+
+def token_limits(counts, budget):
+    """按各段 token 数计算每段的上限，使总数不超过 budget：短的保持完整，剩余预算平均分给长的。
+    只需要 token 数，调用方可以先统计、再逐段读取并截断，不必同时持有全部文本"""
+    if sum(counts) <= budget:
+        return list(counts)
+    limits = {}
+    remaining = budget
+    for i in sorted(range(len(counts)), key=counts.__getitem__):
+        share = remaining // (len(counts) - len(limits))
+        limits[i] = min(counts[i], share)
+        remaining -= limits[i]
+    logging.info(f"Trimmed {sum(1 for i in limits if limits[i] < counts[i])} of {len(counts)} texts "
+                 f"from {sum(counts)} to at most {budget} tokens")
+    return [limits[i] for i in range(len(counts))]
+
+
+def split_by_tokens(text, max_tokens, model="gpt-4"):
+    """按段落把文本切分为不超过 max_tokens 的若干块，单个超长段落再按行/字符硬切"""
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in _split_units(text, max_tokens, model):
+        paragraph_tokens = count_tokens(paragraph, model)
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(paragraph)
+        current_tokens += paragraph_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    logging.debug(f"Split text into {len(chunks)} chunks of at most {max_tokens} tokens")
+    return chunks
+
+
+def _split_units(text, max_tokens, model):
+    """把文本拆成每个都不超过 max_tokens 的段落单元"""
+    for paragraph in text.split("\n\n"):
+        if count_tokens(paragraph, model) <= max_tokens:
+            yield paragraph
+            continue
+        # 段落过长时按固定字符数硬切，字符数按当前估算比例折算
+        ratio = max(len(paragraph) // max(count_tokens(paragraph, model), 1), 1)
+        step = max(max_tokens * ratio, 1)
+        for start in range(0, len(paragraph), step):
+            yield paragraph[start:start + step]
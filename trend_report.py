@@ -0,0 +1,102 @@
+import datetime
+import logging
+import os
+
+from ai_analysis import AINewsAnalyzer
+from article_analysis import ArticleAnalysisStore, period_key, previous_period_key
+from prompt_store import prompt_store
+
+PARTY_NAMES = {"democrat": "民主党", "republican": "共和党"}
+STANCE_NAMES = {"attack": "攻击对手", "defend": "回应辩护", "policy": "政策主张", "mobilize": "动员活动", "other": "其他"}
+CHINA_RELEVANCE_NAMES = {"direct": "直接涉华", "indirect": "间接相关", "none": "无关"}
+CHINA_IMPACT_NAMES = {"positive": "积极", "negative": "消极", "neutral": "中性"}
+
+
+def _format_counts(current, previous, names=None, limit=None):
+    """把计数渲染为“名称 数量 (变化)”列表，按当前数量降序"""
+    items = sorted(current.items(), key=lambda item: -item[1])
+    if limit:
+        items = items[:limit]
+    parts = []
+    for name, count in items:
+        change = count - previous.get(name, 0)
+        label = names.get(name, name) if names else name
+        parts.append(f"{label} {count} ({change:+d})")
+    return "、".join(parts) or "无"
+
+
+class TrendReportGenerator:
+    """基于逐篇结构化分析的周/月汇总生成两党趋势报告，发送给模型的只有汇总数据，不含新闻原文"""
+
+    def __init__(self, config_manager, analyzer=None, parties=("democrat", "republican")):
+        self.analyzer = analyzer or AINewsAnalyzer(config_manager)
+        self.parties = parties
+        structured_config = config_manager.config.get("structured_analysis", {})
+        self.store = ArticleAnalysisStore(structured_config.get("db_path", "data/article_analysis.db"))
+        self.prompt_file = structured_config.get("trend_prompt_file", "prompt/trend_prompt.txt")
+        self.report_dir = "data/reports/trends"
+        os.makedirs(self.report_dir, exist_ok=True)
+
+    def build_view(self, period, key):
+        """两党在该周期的汇总数据（Markdown），括号内为与上一周期相比的变化；返回 (内容, 本期文章总数)"""
+        previous_key = previous_period_key(period, key)
+        lines = [f"## {key}（上一周期 {previous_key}）"]
+        total = 0
+        for party in self.parties:
+            current = self.store.rollup(party, period, key)
+            previous = self.store.rollup(party, period, previous_key)
+            total += current["articles"]
+            change = current["articles"] - previous["articles"]
+            lines.append(f"\n### {PARTY_NAMES.get(party, party)}")
+            lines.append(f"- 文章数：{current['articles']} ({change:+d})")
+            lines.append(f"- 议题：{_format_counts(current['topics'], previous['topics'], limit=8)}")
+            lines.append(f"- 姿态：{_format_counts(current['stance'], previous['stance'], STANCE_NAMES)}")
+            lines.append(
+                f"- 涉华程度：{_format_counts(current['china_relevance'], previous['china_relevance'], CHINA_RELEVANCE_NAMES)}"
+            )
+            lines.append(
+                f"- 涉华影响：{_format_counts(current['china_impact'], previous['china_impact'], CHINA_IMPACT_NAMES)}"
+            )
+        return "\n".join(lines) + "\n", total
+
+    def generate(self, period="week", key=None):
+        """生成 period（week 或 month）周期的趋势报告，key 默认为当前周期；返回报告路径或错误信息"""
+        key = key or period_key(period, datetime.date.today().isoformat())
+        try:
+            view, total = self.build_view(period, key)
+        except ValueError as e:
+            logging.error(f"Invalid trend period {period} {key}: {e}")
+            return f"Invalid trend period {period} {key}: {e}"
+        if not total:
+            logging.info(f"No analysed articles for {period} {key}, skipping trend report")
+            return f"No analysed articles for {period} {key}"
+
+        try:
+            prompt = prompt_store.load(self.prompt_file)
+            analysis = self.analyzer.analyse_news(prompt, view, labels={"party": "all"})
+        except Exception as e:
+            logging.error(f"Error during trend analysis: {e}")
+            return f"Error during trend analysis: {e}"
+
+        report_file = os.path.join(self.report_dir, f"{period}-{key}.md")
+        try:
+            with open(report_file, "w") as f:
+                f.write(f"### AI Trend Report for {key}\n\n{analysis}\n\n---\n\n{view}")
+            logging.info(f"Trend report saved to {report_file}")
+        except Exception as e:
+            logging.error(f"Error saving trend report: {e}")
+            return f"Error saving trend report: {e}"
+        return report_file
+
+
+if __name__ == "__main__":
+    import argparse
+    from config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="Generate a weekly or monthly trend report from stored rollups")
+    parser.add_argument("--period", choices=["week", "month"], default="week")
+    parser.add_argument("--key", help="period key, e.g. 2024-W36 or 2024-09 (default: current period)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(TrendReportGenerator(ConfigManager()).generate(args.period, args.key))